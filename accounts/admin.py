@@ -1,21 +1,33 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import actions as admin_actions
+from django.contrib.admin.options import IS_POPUP_VAR
+from django.contrib.admin.templatetags.admin_urls import add_preserved_filters
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+from chaoscompany.db_router import ReplicaChangeListMixin
+from .deletion import cancel_account_deletion, request_account_deletion
+from .models import CustomUser, UserStats
 from .forms import CustomUserCreationForm, CustomUserChangeForm
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ReplicaChangeListMixin, UserAdmin):
     add_form = CustomUserCreationForm
     form = CustomUserChangeForm
     model = CustomUser
     
-    list_display = ('email', 'username', 'first_name', 'last_name', 'membership_type', 'is_staff', 'is_active')
-    list_filter = ('membership_type', 'is_staff', 'is_active')
+    list_display = ('email', 'username', 'first_name', 'last_name', 'membership_type', 'completed_orders', 'lifetime_spend', 'is_staff', 'is_active')
+    # UserStats por LEFT JOIN en la misma consulta del listado
+    list_select_related = ('stats',)
+    list_filter = ('membership_type', 'is_staff', 'is_active', ('deletion_requested_at', admin.EmptyFieldListFilter))
+    readonly_fields = ('deletion_requested_at', 'completed_orders', 'lifetime_spend', 'last_purchase_at')
     
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
         ('Información personal', {'fields': ('first_name', 'last_name', 'email', 'membership_type')}),
+        ('Compras', {'fields': ('completed_orders', 'lifetime_spend', 'last_purchase_at')}),
         ('Permisos', {'fields': ('is_staff', 'is_active', 'is_superuser', 'groups', 'user_permissions')}),
-        ('Fechas importantes', {'fields': ('last_login', 'date_joined')}),
+        ('Fechas importantes', {'fields': ('last_login', 'date_joined', 'deletion_requested_at')}),
     )
     
     add_fieldsets = (
@@ -27,5 +39,73 @@ class CustomUserAdmin(UserAdmin):
     
     search_fields = ('email', 'username', 'first_name', 'last_name')
     ordering = ('email',)
+    actions = ('delete_selected', 'cancel_deletion')
+
+    def _stats(self, obj):
+        try:
+            return obj.stats
+        except UserStats.DoesNotExist:
+            return UserStats(user_id=obj.pk)
+
+    @admin.display(description='Compras', ordering='stats__completed_orders')
+    def completed_orders(self, obj):
+        return self._stats(obj).completed_orders
+
+    @admin.display(description='Total invertido', ordering='stats__lifetime_spend')
+    def lifetime_spend(self, obj):
+        return self._stats(obj).lifetime_spend
+
+    @admin.display(description='Última compra')
+    def last_purchase_at(self, obj):
+        return self._stats(obj).last_purchase_at
+
+    # Borrar desde el admin solo marca la baja: purge_deleted_accounts borra las órdenes por
+    # lotes en segundo plano en lugar de un DELETE en cascada dentro de la petición.
+    def get_deleted_objects(self, objs, request):
+        # La confirmación no recorre las órdenes relacionadas (pueden ser miles)
+        users = list(objs)
+        perms_needed = set() if self.has_delete_permission(request) else {self.opts.verbose_name}
+        return [str(user) for user in users], {self.opts.verbose_name_plural: len(users)}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, CustomUser.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        marked = request_account_deletion(queryset)
+        self.message_user(
+            request,
+            f'{marked} cuentas desactivadas; sus datos se borrarán en segundo plano.',
+            messages.INFO,
+        )
+
+    def response_delete(self, request, obj_display, obj_id):
+        # Igual que la de Django pero sin su "eliminado correctamente": delete_model ya avisó
+        if IS_POPUP_VAR in request.POST:
+            return super().response_delete(request, obj_display, obj_id)
+        if self.has_change_permission(request, None):
+            post_url = reverse(f'admin:{self.opts.app_label}_{self.opts.model_name}_changelist',
+                               current_app=self.admin_site.name)
+            post_url = add_preserved_filters(
+                {'preserved_filters': self.get_preserved_filters(request), 'opts': self.opts}, post_url
+            )
+        else:
+            post_url = reverse('admin:index', current_app=self.admin_site.name)
+        return HttpResponseRedirect(post_url)
+
+    # Sustituye a la acción global del mismo nombre (su plantilla de confirmación vuelve a
+    # enviar action=delete_selected) para no añadir "eliminados correctamente" tras la baja
+    @admin.action(permissions=['delete'], description='Dar de baja las cuentas seleccionadas')
+    def delete_selected(self, request, queryset):
+        if not request.POST.get('post'):
+            return admin_actions.delete_selected(self, request, queryset)
+        if not self.has_delete_permission(request):
+            raise PermissionDenied
+        self.log_deletions(request, queryset)
+        self.delete_queryset(request, queryset)
+
+    @admin.action(permissions=['change'], description='Cancelar la baja de las cuentas seleccionadas')
+    def cancel_deletion(self, request, queryset):
+        restored = cancel_account_deletion(queryset)
+        self.message_user(request, f'{restored} bajas canceladas; las cuentas vuelven a estar activas.', messages.SUCCESS)
 
 admin.site.register(CustomUser, CustomUserAdmin)
\ No newline at end of file
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        # Registra la generación de recibos al completarse una orden
+        from . import receipts  # noqa: F401
+        # Y la actualización de UserStats
+        from . import stats  # noqa: F401
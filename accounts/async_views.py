@@ -0,0 +1,188 @@
+# accounts/async_views.py
+"""
+Versiones asíncronas de las vistas de mayor tráfico de accounts (perfil, carrito y pago).
+
+Se enrutan en lugar de las de accounts/views.py cuando settings.ASYNC_VIEWS está activo
+(por defecto al arrancar con chaoscompany.asgi). Usan el ORM, la sesión y la
+autenticación asíncronos de Django, así que bajo uvicorn no pasan por el puente
+sync_to_async en cada petición. Las plantillas se siguen renderizando de forma
+síncrona, por eso todo lo que necesita la base de datos se resuelve antes de render().
+"""
+from django.http import Http404
+from django.shortcuts import render, redirect
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from asgiref.sync import sync_to_async
+from .checkout import charge_order, checkout_not_completed, fail_order, finish_order, start_order
+from .gateways import PaymentError
+from .models import PaymentOrder
+from .receipts import receipt_response
+from .stats import aget_user_stats
+from .views import cart_context, payment_context
+from chaoscompany.db_router import use_replicas
+import logging
+
+# Configuración de logger
+logger = logging.getLogger(__name__)
+
+# =========================================================================
+# UTILITIES
+# =========================================================================
+
+async def aget_request_user(request):
+    """
+    Carga el usuario con request.auser() y lo deja fijado en request.user.
+
+    El context processor de auth y las plantillas leen request.user; si quedara el
+    SimpleLazyObject original, su primera evaluación consultaría la base de datos en
+    el event loop y Django lanzaría SynchronousOnlyOperation.
+    """
+    user = await request.auser()
+    request.user = user
+    return user
+
+# =========================================================================
+# VISTAS DE PERFIL
+# =========================================================================
+
+@login_required
+@use_replicas
+async def profile_view(request):
+    logger.info("👤 Vista profile llamada (async)")
+    user = await aget_request_user(request)
+
+    # Obtener el historial de pagos (últimos 5), evaluado aquí y no en la plantilla
+    try:
+        payment_history = [
+            order async for order in
+            PaymentOrder.objects.filter(user=user).order_by('-created_at')[:5]
+        ]
+    except Exception:
+        payment_history = []
+
+    return render(request, 'accounts/profile.html', {
+        'payment_history': payment_history,
+        # Totales de compra precalculados: una lectura por clave primaria
+        'purchase_stats': await aget_user_stats(user),
+        'title': 'Mi Perfil'
+    })
+
+# =========================================================================
+# VISTAS DE CARRITO Y COMPRA
+# =========================================================================
+
+@login_required
+async def cart_view(request):
+    logger.info("🛒 Vista cart_view llamada (async)")
+    await aget_request_user(request)
+    cart_items = await request.session.aget('cart', [])
+    return render(request, 'main/carrito.html', cart_context(cart_items))
+
+
+@login_required
+async def add_to_cart(request):
+    logger.info("➕ add_to_cart llamada (async)")
+    await aget_request_user(request)
+    if request.method == 'POST':
+        plan_type = request.POST.get('plan_type')
+        price = request.POST.get('price')
+
+        cart_item = {
+            'plan_type': plan_type,
+            'price': float(price),
+            'name': f'Plan {plan_type.title()}'
+        }
+
+        # Solo permite un ítem de plan a la vez
+        await request.session.aset('cart', [cart_item])
+
+        messages.success(request, f'Plan {plan_type.title()} agregado al carrito.')
+    return redirect('cart')
+
+
+@login_required
+async def remove_from_cart(request):
+    logger.info("➖ remove_from_cart llamada (async)")
+    await aget_request_user(request)
+    if request.method == 'POST':
+        plan_type_to_remove = request.POST.get('plan_type')
+        cart_items = await request.session.aget('cart')
+
+        if cart_items is not None:
+            await request.session.aset('cart', [
+                item for item in cart_items
+                if item.get('plan_type') != plan_type_to_remove
+            ])
+            messages.info(request, 'Plan removido del carrito.')
+
+    return redirect('cart')
+
+# --- Lógica de Pago ---
+
+@login_required
+async def payment_page(request):
+    logger.info("💰 Vista payment_page llamada (async)")
+    await aget_request_user(request)
+    cart_items = await request.session.aget('cart', [])
+    if not cart_items:
+        messages.error(request, 'No hay items en el carrito')
+        return redirect('cart')
+
+    return render(request, 'main/payment.html', payment_context(cart_items[0]))
+
+
+@login_required
+async def process_payment(request):
+    logger.info("⚙️ process_payment llamada (async)")
+    user = await aget_request_user(request)
+
+    if request.method == 'POST':
+        try:
+            # Obtener datos del formulario (simulados)
+            plan_type = request.POST.get('plan_type')
+            amount_str = request.POST.get('amount', '0').replace(',', '.')
+            amount = float(amount_str)
+            card_number = request.POST.get('card_number', '0000')
+            email = request.POST.get('email', user.email)
+
+            # Orden pendiente, cobro y membresía (accounts/checkout.py). El cobro bloquea un
+            # hilo propio, no el bucle de eventos; la transacción final va en un solo hilo
+            order = await sync_to_async(start_order)(user, plan_type, amount, card_number[-4:], email)
+            charge = await sync_to_async(charge_order, thread_sensitive=False)(order)
+            order = await sync_to_async(finish_order)(order, charge, user)
+            if order.status != 'completed':
+                return checkout_not_completed(request, order)
+
+            # Limpiar carrito
+            await request.session.aset('cart', [])
+
+            messages.success(request, f'¡Pago exitoso! Tu suscripción {plan_type.title()} ha sido activada.')
+            return redirect('payment_success', order_id=order.id)
+
+        except PaymentError as e:
+            logger.warning("💳 Pago no completado: %s", e)
+            await sync_to_async(fail_order)(order, e)
+            messages.error(request, str(e))
+            return redirect('payment_page')
+        except Exception as e:
+            logger.error("💥 Error procesando el pago: %s", e)
+            messages.error(request, f'Error procesando el pago: {str(e)}')
+            return redirect('payment_page')
+
+    return redirect('cart')
+
+
+@login_required
+@use_replicas
+async def payment_success(request, order_id):
+    logger.info("🎉 Vista payment_success llamada (async) - Orden: %s", order_id)
+    user = await aget_request_user(request)
+    orders = PaymentOrder.objects.filter(id=order_id, user=user, status='completed')
+    transaction_id = await orders.values_list('transaction_id', flat=True).afirst()
+    if transaction_id is None:
+        raise Http404('Orden no encontrada')
+
+    # El recibo ya confirma el pago: el mensaje de éxito no debe aparecer en la siguiente página
+    messages.get_messages(request).used = True
+    # Solo lee un archivo (o genera el recibo si falta): en un hilo aparte del bucle
+    return await sync_to_async(receipt_response)(request, user.pk, transaction_id, 'html', orders.first)
@@ -0,0 +1,63 @@
+# accounts/avatars.py
+"""
+Registro de avatares del sistema.
+
+Las imágenes originales viven en static/assets/. El comando `build_avatar_sprite` genera a
+partir de ellas una sola hoja de sprites para el selector de edit_profile y miniaturas
+cuadradas en static/assets/avatars/ para mostrar el avatar elegido.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from django.templatetags.static import static
+
+SystemAvatar = namedtuple('SystemAvatar', ['file', 'label', 'sprite_position'])
+
+DEFAULT_AVATAR = 'avatar_default.jpg'
+
+# (archivo en static/assets/, etiqueta visible). El orden es el del selector y el del sprite.
+_AVATARS = [
+    (DEFAULT_AVATAR, 'Predeterminado'),
+    ('Calavera.jpg', 'Calavera'),
+    ('Halo.jpg', 'MasterChief'),
+    ('Crepper.jpg', 'Creeper'),
+    ('Conejo.jpg', 'Conejo'),
+    ('Dragon.jpg', 'Dragón'),
+    ('Panda.jpg', 'Panda'),
+    ('Chango.jpg', 'Chango'),
+]
+
+SOURCE_DIR = 'assets/'
+THUMBNAIL_DIR = 'assets/avatars/'
+SPRITE_NAME = 'assets/avatars/sprite.jpg'
+SPRITE_CELL_SIZE = 160    # Celdas del sprite: 2x los 80px del selector
+THUMBNAIL_SIZE = 256      # Miniaturas: suficiente para el avatar de 120px del perfil en pantallas 2x
+
+# Posición horizontal (en %) de cada avatar dentro del sprite, para `background-position`
+SYSTEM_AVATARS = [
+    SystemAvatar(file, label, index * 100 / (len(_AVATARS) - 1))
+    for index, (file, label) in enumerate(_AVATARS)
+]
+_AVATAR_FILES = frozenset(avatar.file for avatar in SYSTEM_AVATARS)
+
+
+def is_valid_avatar(name):
+    """Verifica que `name` sea uno de los avatares del sistema."""
+    return name in _AVATAR_FILES
+
+
+@lru_cache(maxsize=None)
+def avatar_urls():
+    """URLs de las miniaturas de cada avatar, calculadas una sola vez por proceso."""
+    return {avatar.file: static(THUMBNAIL_DIR + avatar.file) for avatar in SYSTEM_AVATARS}
+
+
+def avatar_url(name):
+    """URL de la miniatura de un avatar; valores desconocidos usan el predeterminado."""
+    urls = avatar_urls()
+    return urls.get(name) or urls[DEFAULT_AVATAR]
+
+
+@lru_cache(maxsize=None)
+def sprite_url():
+    return static(SPRITE_NAME)
@@ -0,0 +1,87 @@
+# accounts/checkout.py
+"""
+Cobro del checkout, común a los tres process_payment (accounts/views.py, main/views.py y
+accounts/async_views.py).
+
+1. start_order crea la PaymentOrder en 'pending' con una Idempotency-Key nueva y la
+   confirma antes de llamar a la pasarela: si el proceso muere a mitad del cobro queda
+   constancia del intento, y repetir el cargo con esa clave no cobra dos veces.
+2. charge_order cobra con esa clave, fuera de cualquier transacción (no se retienen
+   bloqueos mientras la pasarela responde) y sin tocar la base de datos. Si falla, la
+   vista llama a fail_order: un rechazo deja la orden en 'failed'; si la pasarela no
+   respondió sigue 'pending', porque el cargo pudo llegar a hacerse.
+3. finish_order guarda el estado que devolvió la pasarela y solo activa la membresía si
+   es 'completed'. Orden, estadísticas (UPDATE ... F()) y membresía se escriben en una
+   sola transacción: o se aplican las tres o ninguna.
+"""
+import uuid
+
+from django.contrib import messages
+from django.db import transaction
+from django.shortcuts import redirect
+from django.utils import timezone
+
+from .gateways import GatewayUnavailable, get_gateway
+from .models import PaymentOrder
+from .stats import record_status_changes
+
+MEMBERSHIP_FIELDS = ['membership_type', 'is_active_member', 'membership_start', 'membership_expiry']
+
+
+def start_order(user, plan_type, amount, card_last_four, email):
+    key = uuid.uuid4().hex
+    return PaymentOrder.objects.create(
+        user=user,
+        plan_type=plan_type,
+        amount=amount,
+        status='pending',
+        # Provisional (transaction_id es único) hasta que la pasarela devuelva el suyo
+        transaction_id=key,
+        idempotency_key=key,
+        payment_method='credit_card', # Hardcodeado para simulación
+        card_last_four=card_last_four,
+        customer_email=email,
+    )
+
+
+def charge_order(order):
+    """Cobra `order` con su Idempotency-Key; devuelve el ChargeResult o lanza PaymentError."""
+    return get_gateway().charge(order.amount, order.plan_type, order.customer_email,
+                                order.card_last_four, idempotency_key=order.idempotency_key)
+
+
+def fail_order(order, exc):
+    """Marca `order` como fallida tras el PaymentError `exc` del cobro, salvo si no hubo respuesta."""
+    if isinstance(exc, GatewayUnavailable):
+        return
+    order.status = 'failed'
+    PaymentOrder.objects.filter(pk=order.pk, status='pending').update(status='failed', updated_at=timezone.now())
+
+
+def finish_order(order, charge, user):
+    """Aplica el resultado del cobro a la orden y, si se completó, a la membresía de `user`."""
+    status = charge.status if charge.status in dict(PaymentOrder.STATUS_CHOICES) else 'pending'
+    with transaction.atomic():
+        order.transaction_id = charge.transaction_id
+        order.status = status
+        # El .save() fija paid_at y las fechas de suscripción al completarse
+        order.save()
+        # Las transiciones no pasan por la señal post_save de stats (solo las altas)
+        record_status_changes([(order, 'pending')])
+        if status == 'completed':
+            # Mismas fechas que la orden: así los webhooks saben qué orden respalda la membresía
+            user.membership_type = order.plan_type
+            user.is_active_member = True
+            user.membership_start = order.subscription_start
+            user.membership_expiry = order.subscription_end
+            user.save(update_fields=MEMBERSHIP_FIELDS)
+    return order
+
+
+def checkout_not_completed(request, order):
+    """Respuesta de process_payment cuando la pasarela no devolvió el cobro como completado."""
+    if order.status == 'pending':
+        messages.info(request, 'Tu pago está pendiente de confirmación. Activaremos tu suscripción en cuanto se complete.')
+        return redirect('profile')
+    messages.error(request, 'El pago no se completó. Puedes intentarlo nuevamente.')
+    return redirect('payment_page')
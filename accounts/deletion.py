@@ -0,0 +1,99 @@
+# accounts/deletion.py
+"""
+Baja de cuentas en dos fases, sin un DELETE en cascada dentro de la petición.
+
+1. request_account_deletion (admin) desactiva la cuenta y anota deletion_requested_at con
+   un único UPDATE: el usuario deja de poder iniciar sesión (ModelBackend rechaza a los
+   inactivos, también en las sesiones abiertas) y sale de las renovaciones automáticas.
+2. purge_deleted_accounts llama a purge_account, que borra las PaymentOrder del usuario en
+   lotes pequeños, cada uno en su propia transacción. Así los bloqueos sobre
+   accounts_paymentorder duran lo que un lote y los checkouts concurrentes no esperan a
+   que termine una cuenta con miles de órdenes. Cuando ya no quedan dependientes, el borrado
+   del usuario es barato. Los archivos (recibos y foto de perfil) se quitan al final, cuando
+   ninguna fila los referencia.
+
+Es reanudable: si el proceso muere a mitad, la cuenta sigue marcada y la siguiente
+ejecución continúa con las órdenes que queden. Solo se purgan las cuentas marcadas que
+siguen inactivas: cancel_account_deletion (admin) quita la marca y las reactiva; si llega a
+mitad de una purga, las órdenes ya borradas no vuelven pero el usuario se conserva.
+"""
+import logging
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, When
+from django.utils import timezone
+
+from .models import CustomUser, PaymentOrder
+
+logger = logging.getLogger(__name__)
+
+
+def request_account_deletion(users):
+    """Marca para borrar y desactiva los usuarios de `users` (queryset). Devuelve cuántos."""
+    return users.filter(deletion_requested_at__isnull=True).update(
+        deletion_requested_at=timezone.now(),
+        is_active=False,
+        is_active_member=False,
+    )
+
+
+def cancel_account_deletion(users):
+    """Anula la baja pendiente de los usuarios de `users` (queryset) y los reactiva. Devuelve cuántos."""
+    return users.filter(deletion_requested_at__isnull=False).update(
+        deletion_requested_at=None,
+        is_active=True,
+        # Vuelve a ser miembro solo si la suscripción no ha caducado mientras tanto
+        is_active_member=Case(When(membership_expiry__gt=timezone.now(), then=True), default=False),
+    )
+
+
+def pending_deletions(requested_before):
+    return CustomUser.objects.filter(
+        deletion_requested_at__isnull=False,
+        is_active=False,
+        deletion_requested_at__lte=requested_before,
+    ).order_by('deletion_requested_at', 'id')
+
+
+def purge_account(user, batch_size=500, pause=0.0):
+    """Borra las órdenes de `user` por lotes, luego el usuario y sus archivos. Devuelve las órdenes borradas."""
+    orders = 0
+    while True:
+        with transaction.atomic():
+            ids = list(PaymentOrder.objects.filter(user_id=user.pk).order_by('pk')
+                       .values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            # Sin señales de borrado en PaymentOrder: DELETE ... WHERE id IN (...) directo
+            deleted, _ = PaymentOrder.objects.filter(pk__in=ids).delete()
+        orders += deleted
+        if pause:
+            # Deja huecos entre lotes para las escrituras del checkout
+            time.sleep(pause)
+
+    with transaction.atomic():
+        # La cascada restante (grupos, permisos, historial del admin) es pequeña
+        deleted, _ = CustomUser.objects.filter(
+            pk=user.pk, deletion_requested_at__isnull=False, is_active=False,
+        ).delete()
+    if not deleted:
+        # Baja cancelada (o cuenta reactivada) durante la purga: se conservan usuario y archivos
+        logger.warning("⚠️ Baja de la cuenta %s cancelada a mitad de la purga (%s órdenes borradas)", user.pk, orders)
+        return orders
+
+    remove_account_files(user)
+    logger.info("🗑️ Cuenta %s borrada (%s órdenes)", user.pk, orders)
+    return orders
+
+
+def remove_account_files(user):
+    shutil.rmtree(os.path.join(settings.RECEIPTS_ROOT, str(user.pk)), ignore_errors=True)
+
+    name = user.profile_picture.name if user.profile_picture else None
+    # Con almacenamiento por contenido otro usuario puede tener la misma imagen
+    if name and not CustomUser.objects.filter(profile_picture=name).exists():
+        user.profile_picture.storage.delete(name)
@@ -0,0 +1,154 @@
+# accounts/entitlements.py
+"""
+Tokens de derechos (entitlements) firmados y sin estado para los servidores de juego.
+
+Django los emite (vista `entitlement_token` y game_session); un servidor de juego los
+verifica sin consultar la base de datos ni llamar a Django: basta con este archivo y las
+claves compartidas. El módulo solo usa la biblioteca estándar a propósito, para poder
+copiarlo tal cual a los servidores de juego; lo que depende de Django (settings, usuario)
+está en las funciones del final, que lo importan al llamarse.
+
+Formato (ASCII, apto para cabeceras y URLs):
+
+    v1.<kid>.<user_id>.<tier>.<exp>.<firma>
+
+firma = HMAC-SHA256(clave[kid], "v1.<kid>.<user_id>.<tier>.<exp>") en base64url sin relleno,
+exp = instante Unix de caducidad. Los tokens viven poco (ENTITLEMENT_TTL) y nunca más que
+la membresía que los respalda, así que no hace falta revocarlos.
+
+Rotación de claves, con `ENTITLEMENT_KEYS` = {kid: secreto} y `ENTITLEMENT_ACTIVE_KEY`:
+1. Se añade la clave nueva a los verificadores (servidores de juego) y a ENTITLEMENT_KEYS.
+2. Se cambia ENTITLEMENT_ACTIVE_KEY a la nueva: Django firma con ella.
+3. Pasado un ENTITLEMENT_TTL, ningún token vigente usa la antigua y se puede retirar.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from collections import namedtuple
+
+VERSION = 'v1'
+TIERS = ('free', 'standard', 'ultimate')
+TIER_RANK = {tier: rank for rank, tier in enumerate(TIERS)}
+
+Entitlement = namedtuple('Entitlement', 'user_id tier expires_at key_id')
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _encode_keys(keys):
+    if not keys:
+        raise ValueError('Se necesita al menos una clave de firma')
+    for kid in keys:
+        if not kid or '.' in kid:
+            raise ValueError(f'Identificador de clave no válido: {kid!r}')
+    # El HMAC con la clave ya procesada se copia en cada firma en lugar de recalcularlo
+    return {
+        kid: hmac.new(secret.encode() if isinstance(secret, str) else secret, digestmod=hashlib.sha256)
+        for kid, secret in keys.items()
+    }
+
+
+class Signer:
+    """Emite tokens con la clave `active_key` de `keys` ({kid: secreto})."""
+
+    def __init__(self, keys, active_key):
+        if active_key not in keys:
+            raise ValueError(f'La clave activa {active_key!r} no está entre las claves')
+        self.key_id = active_key
+        self._mac = _encode_keys({active_key: keys[active_key]})[active_key]
+
+    def sign(self, user_id, tier, expires_at):
+        if tier not in TIER_RANK:
+            raise ValueError(f'Nivel desconocido: {tier!r}')
+        message = f'{VERSION}.{self.key_id}.{int(user_id)}.{tier}.{int(expires_at)}'
+        mac = self._mac.copy()
+        mac.update(message.encode('ascii'))
+        return f'{message}.{_b64(mac.digest())}'
+
+
+class Verifier:
+    """
+    Comprueba tokens firmados con cualquiera de las claves de `keys`, sin estado ni E/S.
+    `leeway` tolera en segundos la diferencia de reloj entre Django y el servidor de juego.
+    """
+
+    def __init__(self, keys, leeway=5):
+        self._macs = _encode_keys(keys)
+        self.leeway = leeway
+
+    def verify(self, token, now=None):
+        """Devuelve el Entitlement del token o lanza InvalidToken."""
+        try:
+            message, signature = token.rsplit('.', 1)
+            version, kid, user_id, tier, expires_at = message.split('.')
+        except (AttributeError, ValueError):
+            raise InvalidToken('Token mal formado')
+        if version != VERSION:
+            raise InvalidToken(f'Versión de token no soportada: {version}')
+        mac = self._macs.get(kid)
+        if mac is None:
+            raise InvalidToken(f'Clave desconocida: {kid}')
+        mac = mac.copy()
+        mac.update(message.encode('ascii', 'replace'))
+        if not hmac.compare_digest(_b64(mac.digest()), signature):
+            raise InvalidToken('Firma no válida')
+
+        # Ya firmado por nosotros: los campos tienen el formato que escribió Signer
+        expires_at = int(expires_at)
+        if expires_at + self.leeway < (time.time() if now is None else now):
+            raise InvalidToken('Token caducado')
+        return Entitlement(int(user_id), tier, expires_at, kid)
+
+    def allows(self, token, required_tier, now=None):
+        """True si el token es válido y su nivel es al menos `required_tier`."""
+        try:
+            entitlement = self.verify(token, now)
+        except InvalidToken:
+            return False
+        return TIER_RANK[entitlement.tier] >= TIER_RANK[required_tier]
+
+
+# =========================================================================
+# EMISIÓN DESDE DJANGO
+# =========================================================================
+
+_signer = (None, None)
+
+
+def get_signer():
+    """Signer de ENTITLEMENT_KEYS / ENTITLEMENT_ACTIVE_KEY, o None si no hay claves."""
+    global _signer
+    from django.conf import settings
+    if not settings.ENTITLEMENT_KEYS:
+        return None
+    # Se rehace si cambia la configuración (rotación en caliente, override_settings)
+    config = (settings.ENTITLEMENT_ACTIVE_KEY, tuple(settings.ENTITLEMENT_KEYS.items()))
+    if _signer[0] != config:
+        _signer = (config, Signer(settings.ENTITLEMENT_KEYS, settings.ENTITLEMENT_ACTIVE_KEY))
+    return _signer[1]
+
+
+def issue_for_user(user, now=None):
+    """
+    (Entitlement, token) del nivel actual de `user`, o None si no hay claves configuradas.
+    Caduca a los ENTITLEMENT_TTL segundos o al vencer la membresía, lo que ocurra antes.
+    """
+    from django.conf import settings
+    signer = get_signer()
+    if signer is None:
+        return None
+    now = time.time() if now is None else now
+    expires_at = now + settings.ENTITLEMENT_TTL
+    tier = 'free'
+    if user.membership_type != 'free' and user.is_membership_active:
+        tier = user.membership_type
+        if user.membership_expiry:
+            expires_at = min(expires_at, user.membership_expiry.timestamp())
+    return Entitlement(user.pk, tier, int(expires_at), signer.key_id), signer.sign(user.pk, tier, expires_at)
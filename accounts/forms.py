@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm, AuthenticationForm
 from django.core.exceptions import ValidationError
+from .avatars import is_valid_avatar
 from .models import CustomUser
+from .uploadhandlers import PROFILE_PICTURE_MAX_SIZE
 
 # =========================================================================
 # FORMULARIO DE INICIO DE SESIÓN
@@ -84,20 +86,20 @@ class SignupForm(UserCreationForm):
         super().__init__(*args, **kwargs)
         
         # Configurar campos de contraseña
-        self.fields['password_1'].widget.attrs.update({
+        self.fields['password1'].widget.attrs.update({
             'class': 'form-input-field', 
             'placeholder': 'Contraseña',
             'required': 'true'
         })
-        self.fields['password_2'].widget.attrs.update({
+        self.fields['password2'].widget.attrs.update({
             'class': 'form-input-field', 
             'placeholder': 'Confirmar contraseña',
             'required': 'true'
         })
         
         # Remover textos de ayuda
-        self.fields['password_1'].help_text = ''
-        self.fields['password_2'].help_text = ''
+        self.fields['password1'].help_text = ''
+        self.fields['password2'].help_text = ''
         if 'username' in self.fields:
             self.fields['username'].help_text = ''
 
@@ -156,6 +158,9 @@ class CustomUserChangeForm(UserChangeForm):
         widget=forms.DateInput(attrs={'class': 'form-input-field', 'type': 'date'})
     )
     
+    # Avatar del sistema elegido en el selector (se valida contra accounts/avatars.py)
+    selected_avatar = forms.CharField(required=False, widget=forms.HiddenInput)
+    
     class Meta:
         model = CustomUser
         # Incluye todos los campos que quieres que sean editables en el formulario
@@ -208,6 +213,13 @@ class CustomUserChangeForm(UserChangeForm):
             raise ValidationError('Este nombre de usuario ya está registrado. Por favor elige otro.')
         return username
     
+    # VALIDACIÓN DEL AVATAR DEL SISTEMA (solo se aceptan los del registro)
+    def clean_selected_avatar(self):
+        selected_avatar = self.cleaned_data.get('selected_avatar', '')
+        if selected_avatar and not is_valid_avatar(selected_avatar):
+            raise ValidationError('El avatar seleccionado no es válido.')
+        return selected_avatar
+    
     # =======================================================================================
     # V A L I D A C I Ó N   C O R R E G I D A   P A R A   L A   I M A G E N   D E   P E R F I L
     # =======================================================================================
@@ -218,7 +230,7 @@ class CustomUserChangeForm(UserChangeForm):
             try:
                 # Validar tamaño del archivo (máximo 5MB)
                 # FIX: try/except para capturar FileNotFoundError (tu error original)
-                if profile_picture.size > 5 * 1024 * 1024:
+                if profile_picture.size > PROFILE_PICTURE_MAX_SIZE:
                     raise ValidationError('La imagen debe ser menor a 5MB.')
             
             except FileNotFoundError:
@@ -0,0 +1,292 @@
+# accounts/gateways.py
+"""
+Capa de pasarelas de pago usada por process_payment.
+
+settings.PAYMENT_GATEWAY elige el backend:
+- SimulatedGateway: aprueba al instante con un transaction_id aleatorio (comportamiento
+  histórico, sin red). Es el valor por defecto mientras no haya PAYMENT_GATEWAY_URL.
+- HttpGateway: POST JSON a {URL}/v1/charges con:
+    * timeouts separados de conexión (CONNECT_TIMEOUT) y de lectura (READ_TIMEOUT);
+    * conexiones HTTP keep-alive reutilizadas entre peticiones (hasta POOL_SIZE libres);
+    * un bulkhead: como mucho MAX_CONCURRENT cargos en vuelo por proceso; si no hay hueco
+      en BULKHEAD_TIMEOUT segundos se rechaza en lugar de encolar más workers;
+    * un circuit breaker: tras FAILURE_THRESHOLD fallos seguidos (timeouts, 5xx, errores
+      de red) se deja de llamar a la pasarela durante RESET_TIMEOUT segundos y luego se
+      deja pasar un único cargo de prueba.
+  Un cargo rechazado por la pasarela (402) no cuenta como fallo para el breaker.
+
+Cada cargo lleva una Idempotency-Key, así que el único reintento (cuando una conexión
+keep-alive reutilizada resulta estar cerrada por el servidor) no puede cobrar dos veces.
+
+Para probar la degradación en local: `python manage.py fake_gateway --latency-ms 800
+--error-rate 0.2` y arrancar la web con PAYMENT_GATEWAY_URL=http://127.0.0.1:8099.
+"""
+import http.client
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GATEWAY_OPTIONS = {
+    'BACKEND': 'accounts.gateways.SimulatedGateway',
+    'URL': '',
+    'API_KEY': '',
+    'CONNECT_TIMEOUT': 1.0,
+    'READ_TIMEOUT': 5.0,
+    'POOL_SIZE': 10,
+    'MAX_CONCURRENT': 20,
+    'BULKHEAD_TIMEOUT': 0.1,
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 30.0,
+}
+
+ChargeResult = namedtuple('ChargeResult', ['transaction_id', 'status'])
+
+
+class PaymentError(Exception):
+    """Error base de la capa de pasarelas."""
+
+
+class PaymentDeclined(PaymentError):
+    """La pasarela rechazó el cargo (fondos, tarjeta...). Reintentar no sirve."""
+
+
+class GatewayUnavailable(PaymentError):
+    """La pasarela no respondió a tiempo, falló, o el breaker/bulkhead cortó la llamada."""
+
+
+# =========================================================================
+# CIRCUIT BREAKER Y BULKHEAD
+# =========================================================================
+
+class CircuitBreaker:
+    """Breaker por proceso: closed -> open (tras N fallos seguidos) -> half_open -> closed."""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self):
+        """True si se puede llamar; en half_open solo se deja pasar una llamada de prueba."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("✅ Pasarela de pago recuperada, circuito cerrado")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("⛔ Pasarela de pago: circuito abierto tras %s fallos", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class Bulkhead:
+    """Límite de cargos simultáneos para que una pasarela lenta no ocupe todos los workers."""
+
+    def __init__(self, max_concurrent=20, timeout=0.1):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self.rejected = 0
+
+    def __enter__(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            self.rejected += 1
+            raise GatewayUnavailable('Demasiados pagos en curso, inténtalo de nuevo en unos segundos')
+        return self
+
+    def __exit__(self, *exc_info):
+        self._slots.release()
+
+
+# =========================================================================
+# PASARELAS
+# =========================================================================
+
+class BaseGateway:
+
+    def __init__(self, options):
+        self.options = options
+
+    def charge(self, amount, plan_type, email, card_last_four, idempotency_key=None):
+        """Cobra `amount`; devuelve ChargeResult o lanza PaymentDeclined / GatewayUnavailable."""
+        raise NotImplementedError
+
+    def new_idempotency_key(self):
+        return uuid.uuid4().hex
+
+
+class SimulatedGateway(BaseGateway):
+    """Aprueba todos los cargos sin salir del proceso."""
+
+    def charge(self, amount, plan_type, email, card_last_four, idempotency_key=None):
+        return ChargeResult(str(uuid.uuid4())[:10].upper(), 'completed')
+
+
+class HttpGateway(BaseGateway):
+
+    def __init__(self, options):
+        super().__init__(options)
+        url = urlsplit(options['URL'])
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise ValueError(f'PAYMENT_GATEWAY URL inválida: {options["URL"]!r}')
+        self.connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self.host = url.hostname
+        self.port = url.port
+        self.charge_path = url.path.rstrip('/') + '/v1/charges'
+        self.connect_timeout = options['CONNECT_TIMEOUT']
+        self.read_timeout = options['READ_TIMEOUT']
+        self.pool_size = options['POOL_SIZE']
+        self.breaker = CircuitBreaker(options['FAILURE_THRESHOLD'], options['RESET_TIMEOUT'])
+        self.bulkhead = Bulkhead(options['MAX_CONCURRENT'], options['BULKHEAD_TIMEOUT'])
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    # ------------------------------------------------------------------
+    # Conexiones keep-alive
+    # ------------------------------------------------------------------
+
+    def _checkout(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Tras un fork los sockets del padre no se comparten
+                self._idle, self._pid = [], os.getpid()
+            if self._idle:
+                return self._idle.pop(), True
+        connection = self.connection_class(self.host, self.port, timeout=self.connect_timeout)
+        connection.connect()
+        connection.sock.settimeout(self.read_timeout)
+        return connection, False
+
+    def _checkin(self, connection):
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def _post(self, body, idempotency_key):
+        headers = {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': idempotency_key,
+        }
+        if self.options['API_KEY']:
+            headers['Authorization'] = f'Bearer {self.options["API_KEY"]}'
+
+        for attempt in range(2):
+            connection, reused = self._checkout()
+            try:
+                connection.request('POST', self.charge_path, body=body, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                # El servidor cerró una conexión keep-alive inactiva: se repite una vez con una nueva
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._checkin(connection)
+            return response.status, payload
+
+    # ------------------------------------------------------------------
+    # Cargo
+    # ------------------------------------------------------------------
+
+    def charge(self, amount, plan_type, email, card_last_four, idempotency_key=None):
+        body = json.dumps({
+            'amount': str(amount),
+            'plan_type': plan_type,
+            'email': email,
+            'card_last_four': card_last_four,
+        })
+        # Primero el bulkhead: si rechaza, no se consume la llamada de prueba del breaker
+        with self.bulkhead:
+            if not self.breaker.allow():
+                raise GatewayUnavailable('El procesador de pagos no está disponible, inténtalo en unos minutos')
+            started = time.monotonic()
+            try:
+                status, payload = self._post(body, idempotency_key or self.new_idempotency_key())
+            except (OSError, http.client.HTTPException) as exc:
+                self.breaker.record_failure()
+                logger.warning("⏱️ Pasarela de pago sin respuesta tras %.0f ms: %r",
+                               (time.monotonic() - started) * 1000, exc)
+                raise GatewayUnavailable('El procesador de pagos no respondió a tiempo') from exc
+
+        if status >= 500 or status == 429:
+            self.breaker.record_failure()
+            raise GatewayUnavailable(f'El procesador de pagos devolvió {status}')
+        self.breaker.record_success()
+
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            data = {}
+        if status == 402:
+            raise PaymentDeclined(data.get('error') or 'Pago rechazado')
+        if status >= 400 or 'transaction_id' not in data:
+            raise PaymentError(f'Respuesta inesperada del procesador de pagos ({status})')
+        return ChargeResult(data['transaction_id'], data.get('status', 'completed'))
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Instancia única por proceso (comparte conexiones, breaker y bulkhead entre hilos)."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                options = {**DEFAULT_GATEWAY_OPTIONS, **getattr(settings, 'PAYMENT_GATEWAY', {})}
+                _gateway = import_string(options['BACKEND'])(options)
+    return _gateway
+
+
+def reset_gateway():
+    """Descarta la instancia (tests o cambio de settings)."""
+    global _gateway
+    with _gateway_lock:
+        _gateway = None
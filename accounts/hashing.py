@@ -0,0 +1,29 @@
+# accounts/hashing.py
+"""
+Hash de contraseñas en un pool de procesos (manage.py import_users).
+
+Los procesos del pool se lanzan con spawn e importan este módulo antes de llamar a sus
+funciones: no puede importar modelos al cargarse (fallaría con AppRegistryNotReady y el
+pool quedaría roto), así que solo usa django.contrib.auth.hashers, y únicamente después de
+django.setup().
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .workers import setup_worker
+
+
+def hash_password(password):
+    """make_password en un proceso del pool (None genera una contraseña inutilizable)."""
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
+
+
+def password_pool(workers):
+    """Pool de `workers` procesos con Django cargado (PASSWORD_HASHERS de los settings)."""
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=setup_worker)
+
+
+def hash_passwords(executor, passwords, workers):
+    """make_password de cada contraseña repartido en `executor`, en el mismo orden."""
+    return list(executor.map(hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
@@ -0,0 +1,45 @@
+# accounts/management/commands/build_avatar_sprite.py
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+
+from accounts.avatars import (
+    SOURCE_DIR, SPRITE_CELL_SIZE, SPRITE_NAME, SYSTEM_AVATARS, THUMBNAIL_DIR, THUMBNAIL_SIZE,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera la hoja de sprites y las miniaturas de los avatares del sistema '
+        '(accounts/avatars.py) dentro de static/assets/avatars/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quality', type=int, default=85, help='Calidad JPEG (default: 85).')
+
+    def handle(self, *args, **options):
+        static_dir = str(settings.STATICFILES_DIRS[0])
+        thumbnail_dir = os.path.join(static_dir, *THUMBNAIL_DIR.split('/'))
+        os.makedirs(thumbnail_dir, exist_ok=True)
+        quality = options['quality']
+
+        sprite = Image.new('RGB', (SPRITE_CELL_SIZE * len(SYSTEM_AVATARS), SPRITE_CELL_SIZE))
+        for index, avatar in enumerate(SYSTEM_AVATARS):
+            with Image.open(os.path.join(static_dir, *SOURCE_DIR.split('/'), avatar.file)) as source:
+                image = source.convert('RGB')
+
+            # Recorte cuadrado centrado, igual que `object-fit: cover` en el navegador
+            thumbnail = ImageOps.fit(image, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+            thumbnail.save(os.path.join(thumbnail_dir, avatar.file), 'JPEG', quality=quality, optimize=True, progressive=True)
+
+            cell = ImageOps.fit(image, (SPRITE_CELL_SIZE, SPRITE_CELL_SIZE), Image.LANCZOS)
+            sprite.paste(cell, (index * SPRITE_CELL_SIZE, 0))
+            self.stdout.write(f'  {avatar.file}')
+
+        sprite_path = os.path.join(static_dir, *SPRITE_NAME.split('/'))
+        sprite.save(sprite_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Sprite con {len(SYSTEM_AVATARS)} avatares: {SPRITE_NAME} ({os.path.getsize(sprite_path) // 1024} KB)'
+        ))
@@ -0,0 +1,114 @@
+# accounts/management/commands/fake_gateway.py
+import json
+import random
+import signal
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 para que HttpGateway pueda reutilizar las conexiones (keep-alive)
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if self.path.rstrip('/') != '/v1/charges':
+            return self.reply(404, {'error': 'not found'})
+        try:
+            charge = json.loads(body)
+        except ValueError:
+            return self.reply(400, {'error': 'JSON inválido'})
+
+        latency = server.latency + random.uniform(0, server.jitter)
+        if random.random() < server.hang_rate:
+            latency += server.hang_seconds
+        time.sleep(latency)
+
+        if random.random() < server.error_rate:
+            return self.reply(503, {'error': 'upstream no disponible'})
+        if random.random() < server.decline_rate:
+            return self.reply(402, {'error': 'Tarjeta rechazada por el banco emisor'})
+
+        # Misma Idempotency-Key -> misma respuesta, como una pasarela real
+        key = self.headers.get('Idempotency-Key') or uuid.uuid4().hex
+        with server.lock:
+            transaction_id = server.charges.setdefault(key, str(uuid.uuid4())[:10].upper())
+        self.reply(200, {'transaction_id': transaction_id, 'status': 'completed', 'amount': charge.get('amount')})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente ya abandonó por timeout: es justo lo que se quería provocar
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class Command(BaseCommand):
+    help = (
+        'Servidor local que imita la API de cargos de la pasarela de pago (POST /v1/charges) '
+        'con latencia, cuelgues, errores 503 y rechazos 402 configurables. Arranca la web con '
+        'PAYMENT_GATEWAY_URL=http://127.0.0.1:<puerto> para probar el checkout bajo degradación.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--latency-ms', type=float, default=50, help='Latencia base de cada cargo.')
+        parser.add_argument('--jitter-ms', type=float, default=20, help='Latencia extra aleatoria (0..N ms).')
+        parser.add_argument(
+            '--error-rate', type=float, default=0.0,
+            help='Fracción de cargos que responden 503 (cuentan como fallo para el circuit breaker).',
+        )
+        parser.add_argument(
+            '--decline-rate', type=float, default=0.0,
+            help='Fracción de cargos rechazados con 402.',
+        )
+        parser.add_argument(
+            '--hang-rate', type=float, default=0.0,
+            help='Fracción de cargos que se cuelgan --hang-seconds antes de responder (provoca timeouts).',
+        )
+        parser.add_argument('--hang-seconds', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer((options['host'], options['port']), FakeGatewayHandler)
+        server.daemon_threads = True
+        server.latency = options['latency_ms'] / 1000
+        server.jitter = options['jitter_ms'] / 1000
+        server.error_rate = options['error_rate']
+        server.decline_rate = options['decline_rate']
+        server.hang_rate = options['hang_rate']
+        server.hang_seconds = options['hang_seconds']
+        server.verbose = options['verbosity'] > 1
+        server.charges = {}
+        server.lock = threading.Lock()
+
+        # SIGTERM (p. ej. desde un script de carga) detiene el servidor igual que Ctrl+C
+        signal.signal(signal.SIGTERM, lambda *args: threading.Thread(target=server.shutdown).start())
+        self.stdout.write(
+            f'Pasarela falsa en http://{options["host"]}:{options["port"]}/v1/charges '
+            f'(latencia {options["latency_ms"]:.0f}±{options["jitter_ms"]:.0f} ms, '
+            f'errores {options["error_rate"]:.0%}, rechazos {options["decline_rate"]:.0%}, '
+            f'cuelgues {options["hang_rate"]:.0%})'
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'{len(server.charges)} cargos aprobados')
@@ -0,0 +1,257 @@
+# accounts/management/commands/generate_synthetic_data.py
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import CustomUser, PaymentOrder, UserStats
+
+# Mezcla de planes actuales: la mayoría de cuentas son gratuitas
+PLAN_WEIGHTS = [('free', 62), ('standard', 26), ('ultimate', 12)]
+# Precio mensual con 16% de IVA (membresias.html: 200 y 800)
+PLAN_AMOUNTS = {'standard': Decimal('232.00'), 'ultimate': Decimal('928.00')}
+PAYMENT_METHOD_WEIGHTS = [('credit_card', 55), ('debit_card', 25), ('paypal', 12), ('apple_pay', 5), ('google_pay', 3)]
+FIRST_NAMES = ['Ana', 'Luis', 'María', 'Carlos', 'Sofía', 'Jorge', 'Lucía', 'Diego', 'Valeria', 'Mateo', 'Camila', 'Pablo']
+LAST_NAMES = ['García', 'Martínez', 'López', 'Hernández', 'González', 'Pérez', 'Rodríguez', 'Sánchez', 'Ramírez', 'Torres']
+
+# Forma de la cola de compradores intensivos: número de renovaciones ~ Pareto(alpha)
+HEAVY_BUYER_ALPHA = 1.3
+LAPSED_BUYER_RATE = 0.2     # Cuentas gratuitas que alguna vez pagaron
+REFUND_RATE = 0.03
+CANCEL_RATE = 0.02
+FAILED_ATTEMPT_RATE = 0.06  # Usuarios con un cobro fallido además de sus órdenes
+PENDING_RATE = 0.01         # Usuarios con un checkout a medias
+
+
+def _expand(weights):
+    return [value for value, weight in weights for _ in range(weight)]
+
+
+class TableWriter:
+    """
+    INSERT de filas ya convertidas al formato de la base, con executemany.
+
+    Es el mismo INSERT que genera bulk_create, pero sin instanciar modelos ni pasar cada
+    valor por get_db_prep_save: en bulk_create esa conversión campo a campo es la mayor
+    parte del tiempo. Las columnas que no se indican toman el default del campo.
+    """
+
+    def __init__(self, model):
+        fields = model._meta.concrete_fields
+        self.index = {field.attname: position for position, field in enumerate(fields)}
+        self.defaults = [field.get_db_prep_save(field.get_default(), connection) for field in fields]
+        quote = connection.ops.quote_name
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+
+    def row(self, values):
+        row = self.defaults.copy()
+        for attname, value in values.items():
+            row[self.index[attname]] = value
+        return row
+
+    def insert(self, rows):
+        if rows:
+            with connection.cursor() as cursor:
+                cursor.executemany(self.sql, rows)
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera usuarios y órdenes sintéticos con distribuciones realistas (mezcla de planes, '
+        'estados de orden, cola de compradores intensivos, vencimientos) para reproducir '
+        'problemas de rendimiento a escala. Inserta por lotes con ids explícitos, así que '
+        'funciona igual en SQLite y MySQL. Sobre la misma base, la misma --seed genera los mismos datos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Usuarios a generar (default: 100000).')
+        parser.add_argument('--seed', type=int, default=42, help='Semilla del generador (default: 42).')
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Usuarios por transacción; sus órdenes van en la misma (default: 10000).',
+        )
+        parser.add_argument(
+            '--max-orders-per-user', type=int, default=240,
+            help='Tope de órdenes de un comprador intensivo (default: 240, 20 años de renovaciones).',
+        )
+        parser.add_argument(
+            '--days', type=int, default=730,
+            help='Antigüedad máxima de las cuentas en días (default: 730).',
+        )
+        parser.add_argument(
+            '--password', default='synthetic',
+            help='Contraseña común; se hashea una sola vez (default: synthetic).',
+        )
+        parser.add_argument(
+            '--prefix', default='synth',
+            help='Prefijo de los nombres de usuario y de los transaction_id (default: synth).',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] <= 0:
+            raise CommandError('--users debe ser mayor que 0')
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now().replace(microsecond=0)
+        if settings.USE_TZ:
+            # Se genera con fechas naive en la zona de la conexión, que es a lo que
+            # adapt_datetimefield_value convertiría cada fecha aware (y es lo caro)
+            self.now = timezone.make_naive(self.now, connection.timezone)
+        self.db_datetime = connection.ops.adapt_datetimefield_value
+        self.max_orders = options['max_orders_per_user']
+        self.max_age = timedelta(days=options['days'])
+        self.prefix = options['prefix']
+        self.plans = _expand(PLAN_WEIGHTS)
+        self.payment_methods = _expand(PAYMENT_METHOD_WEIGHTS)
+        self.users = TableWriter(CustomUser)
+        self.orders = TableWriter(PaymentOrder)
+        self.stats = TableWriter(UserStats)
+        # Valores constantes convertidos una sola vez; un PBKDF2 por usuario dominaría el tiempo
+        self.password = make_password(options['password'])
+        amount_field = PaymentOrder._meta.get_field('amount')
+        self.db_amounts = {plan: amount_field.get_db_prep_save(amount, connection) for plan, amount in PLAN_AMOUNTS.items()}
+        self.db_now = self.db_datetime(self.now)
+
+        # Ids explícitos a continuación de los existentes: las órdenes referencian a sus
+        # usuarios sin releerlos (MySQL no devuelve los ids insertados en lote)
+        self.next_user_id = (CustomUser.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        self.next_order_id = (PaymentOrder.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+        started = time.monotonic()
+        totals = {'users': 0, 'orders': 0}
+        remaining = options['users']
+        while remaining:
+            count = min(remaining, options['batch_size'])
+            users, orders, stats = self.generate_batch(count)
+            with transaction.atomic():
+                self.users.insert(users)
+                self.orders.insert(orders)
+                self.stats.insert(stats)
+            remaining -= count
+            totals['users'] += len(users)
+            totals['orders'] += len(orders)
+            elapsed = time.monotonic() - started
+            rows = totals['users'] + totals['orders']
+            self.stdout.write(f'  {totals["users"]} usuarios, {totals["orders"]} órdenes ({rows / elapsed:.0f} filas/s)')
+
+        if connection.vendor == 'postgresql':
+            self.stderr.write('Con ids explícitos hay que ajustar las secuencias: manage.py sqlsequencereset accounts')
+        elapsed = time.monotonic() - started
+        rows = totals['users'] + totals['orders']
+        self.stdout.write(self.style.SUCCESS(
+            f'{totals["users"]} usuarios y {totals["orders"]} órdenes en {elapsed:.1f}s ({rows / elapsed:.0f} filas/s)'
+        ))
+
+    # ------------------------------------------------------------------
+    # Generación
+    # ------------------------------------------------------------------
+
+    def generate_batch(self, count):
+        users, orders, stats = [], [], []
+        for _ in range(count):
+            self.generate_user(users, orders, stats)
+        return users, orders, stats
+
+    def generate_user(self, users, orders, stats):
+        rng = self.rng
+        user_id = self.next_user_id
+        self.next_user_id += 1
+        username = f'{self.prefix}{user_id}'
+        email = f'{username}@synthetic.test'
+        plan = rng.choice(self.plans)
+        date_joined = self.now - self.max_age * rng.random()
+        user = {
+            'id': user_id,
+            'username': username,
+            'email': email,
+            'password': self.password,
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'membership_type': plan,
+        }
+
+        if plan != 'free':
+            # Miembro activo: vence dentro del mes pagado en curso
+            history_plan = plan
+            last_end = self.now + timedelta(seconds=rng.randrange(30 * 86400))
+            user['is_active_member'] = True
+        elif rng.random() < LAPSED_BUYER_RATE:
+            # Pagó en el pasado y no renovó
+            history_plan = 'standard' if rng.random() < 0.7 else 'ultimate'
+            last_end = self.now - timedelta(seconds=rng.randrange(1, 365 * 86400))
+        else:
+            user['date_joined'] = self.db_datetime(date_joined)
+            users.append(self.users.row(user))
+            return
+
+        renewals = min(self.max_orders, int(rng.paretovariate(HEAVY_BUYER_ALPHA)))
+        first_start = last_end - timedelta(days=30 * renewals)
+        user['date_joined'] = self.db_datetime(min(date_joined, first_start - timedelta(days=rng.random() * 30)))
+        user['membership_start'] = self.db_datetime(last_end - timedelta(days=30))
+        user['membership_expiry'] = self.db_datetime(last_end)
+        users.append(self.users.row(user))
+
+        common = {
+            'user_id': user_id,
+            'plan_type': history_plan,
+            'amount': self.db_amounts[history_plan],
+            'payment_method': rng.choice(self.payment_methods),
+            'card_last_four': f'{rng.randrange(10000):04d}',
+            'customer_email': email,
+        }
+        counts = {'completed': 0, 'refunded': 0, 'cancelled': 0}
+        for index in range(renewals):
+            start = first_start + timedelta(days=30 * index)
+            status = 'completed'
+            if index < renewals - 1:
+                # La orden vigente siempre está completada; las antiguas a veces se devolvieron
+                roll = rng.random()
+                status = 'refunded' if roll < REFUND_RATE else 'cancelled' if roll < REFUND_RATE + CANCEL_RATE else status
+            counts[status] += 1
+            orders.append(self.order(common, status, start, start + timedelta(days=30)))
+        if rng.random() < FAILED_ATTEMPT_RATE:
+            # Cobro rechazado poco antes del que sí pasó
+            last_start = first_start + timedelta(days=30 * (renewals - 1))
+            orders.append(self.order(common, 'failed', last_start - timedelta(hours=rng.random() * 48)))
+        if rng.random() < PENDING_RATE:
+            orders.append(self.order(common, 'pending', self.now))
+
+        # Lo mismo que calcularía reconcile_user_stats (accounts/stats.py)
+        amount = PLAN_AMOUNTS[history_plan]
+        stats.append(self.stats.row({
+            'user_id': user_id,
+            'completed_orders': counts['completed'],
+            'lifetime_spend': str(amount * counts['completed']),
+            'refunded_orders': counts['refunded'],
+            'refunded_amount': str(amount * counts['refunded']),
+            'last_purchase_at': self.db_datetime(first_start + timedelta(days=30 * (renewals - 1))),
+            'updated_at': self.db_now,
+        }))
+
+    def order(self, common, status, start, end=None):
+        order_id = self.next_order_id
+        self.next_order_id += 1
+        created = self.db_datetime(start)
+        paid = end is not None
+        return self.orders.row(dict(
+            common,
+            id=order_id,
+            status=status,
+            transaction_id=f'{self.prefix.upper()}-{order_id:010d}',
+            # Fechas históricas (bulk_create las sustituiría por la hora actual: auto_now_add)
+            created_at=created,
+            updated_at=created,
+            paid_at=created if paid else None,
+            subscription_start=created if paid else None,
+            subscription_end=self.db_datetime(end) if paid else None,
+        ))
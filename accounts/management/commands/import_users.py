@@ -0,0 +1,235 @@
+# accounts/management/commands/import_users.py
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from accounts.hashing import hash_passwords, password_pool
+from accounts.models import CustomUser
+
+MEMBERSHIP_TYPES = {value for value, _ in CustomUser.MEMBERSHIP_CHOICES}
+# Nunca se copian al archivo de rechazos
+SECRET_FIELDS = ('password', 'password_hash')
+
+
+class RejectedRow(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa usuarios desde CSV o JSONL en lotes con bulk_create. Columnas: username, email, '
+        'first_name, last_name, membership_type y password (en claro, se hashea en un pool de '
+        'procesos) o password_hash (ya hasheado en un formato de Django). Las filas inválidas o '
+        'duplicadas (usuario o correo, sin distinguir mayúsculas) van al archivo de rechazos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo .csv o .jsonl ("-" para leer JSONL de stdin).')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Por defecto según la extensión.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Filas por bulk_create (default: 1000).',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help='Procesos para hashear contraseñas en claro (default: núcleos de la máquina).',
+        )
+        parser.add_argument(
+            '--rejects',
+            help='Archivo JSONL con las filas rechazadas (default: <archivo>.rejects.jsonl).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Valida y cuenta sin hashear ni insertar.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        rejects_path = options['rejects'] or ('import_users.rejects.jsonl' if path == '-' else f'{path}.rejects.jsonl')
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        self.username_validator = UnicodeUsernameValidator()
+        self.stats = {'imported': 0, 'rejected': 0}
+
+        self.stdout.write('Cargando usuarios y correos existentes...')
+        self.usernames, self.emails = set(), set()
+        for username, email in CustomUser.objects.values_list('username', 'email').iterator(chunk_size=5000):
+            self.usernames.add(username.lower())
+            if email:
+                self.emails.add(email.lower())
+
+        self.workers = options['workers']
+        self.executor = None
+
+        started = time.monotonic()
+        try:
+            with self.open_input(path) as source, open(rejects_path, 'w', encoding='utf-8') as rejects:
+                self.rejects = rejects
+                batch = []
+                for line, row in self.read_rows(source, fmt):
+                    try:
+                        batch.append((line, row, self.clean_row(row)))
+                    except RejectedRow as exc:
+                        self.reject(line, row, str(exc))
+                    if len(batch) >= self.batch_size:
+                        self.import_batch(batch)
+                        batch = []
+                        self.report_progress(started)
+                if batch:
+                    self.import_batch(batch)
+        finally:
+            if self.executor:
+                self.executor.shutdown()
+
+        elapsed = time.monotonic() - started
+        total = self.stats['imported'] + self.stats['rejected']
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.stats["imported"]} usuarios {"válidos" if self.dry_run else "importados"}, '
+            f'{self.stats["rejected"]} rechazados en {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} filas/s)'
+        ))
+        if self.stats['rejected']:
+            self.stdout.write(f'Filas rechazadas en {rejects_path}')
+        else:
+            os.remove(rejects_path)
+
+    # ------------------------------------------------------------------
+    # Lectura y validación
+    # ------------------------------------------------------------------
+
+    def open_input(self, path):
+        if path == '-':
+            return open(sys.stdin.fileno(), encoding='utf-8', closefd=False)
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(f'No se puede abrir {path}: {exc}')
+
+    def read_rows(self, source, fmt):
+        if fmt == 'csv':
+            # La línea 1 es la cabecera
+            for line, row in enumerate(csv.DictReader(source), start=2):
+                yield line, row
+            return
+        for line, text in enumerate(source, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                self.reject(line, {'raw': text[:200]}, 'JSON inválido')
+                continue
+            yield line, row
+
+    def clean_row(self, row):
+        username = CustomUser.normalize_username((row.get('username') or '').strip())
+        email = CustomUser.objects.normalize_email((row.get('email') or '').strip()).lower()
+        if not username or len(username) > 150:
+            raise RejectedRow('Nombre de usuario vacío o de más de 150 caracteres')
+        try:
+            self.username_validator(username)
+            validate_email(email)
+        except ValidationError as exc:
+            raise RejectedRow(exc.messages[0])
+
+        membership_type = (row.get('membership_type') or 'free').strip()
+        if membership_type not in MEMBERSHIP_TYPES:
+            raise RejectedRow(f'Tipo de membresía desconocido: {membership_type}')
+
+        password_hash = (row.get('password_hash') or '').strip()
+        if password_hash:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                raise RejectedRow('password_hash no tiene un formato de Django reconocido')
+
+        # Únicos sin distinguir mayúsculas, como SignupForm; también entre filas del mismo archivo
+        if username.lower() in self.usernames:
+            raise RejectedRow('El nombre de usuario ya existe')
+        if email in self.emails:
+            raise RejectedRow('El correo electrónico ya existe')
+        self.usernames.add(username.lower())
+        self.emails.add(email)
+
+        return {
+            'username': username,
+            'email': email,
+            'first_name': (row.get('first_name') or '').strip()[:150],
+            'last_name': (row.get('last_name') or '').strip()[:150],
+            'membership_type': membership_type,
+            'password_hash': password_hash,
+            'password': row.get('password') or None,
+        }
+
+    def reject(self, line, row, error):
+        self.stats['rejected'] += 1
+        safe_row = {key: value for key, value in row.items() if key not in SECRET_FIELDS}
+        self.rejects.write(json.dumps({'line': line, 'error': error, 'row': safe_row}, ensure_ascii=False) + '\n')
+
+    # ------------------------------------------------------------------
+    # Inserción
+    # ------------------------------------------------------------------
+
+    def import_batch(self, batch):
+        if self.dry_run:
+            self.stats['imported'] += len(batch)
+            return
+
+        plain = [data for _, _, data in batch if not data['password_hash']]
+        for data, password_hash in zip(plain, self.hash_passwords([data['password'] for data in plain])):
+            data['password_hash'] = password_hash
+
+        users = [self.build_user(data) for _, _, data in batch]
+        try:
+            with transaction.atomic():
+                CustomUser.objects.bulk_create(users, batch_size=self.batch_size)
+            self.stats['imported'] += len(users)
+        except IntegrityError:
+            # Alguien se registró con el mismo usuario/correo durante la importación: fila a fila
+            for (line, row, _), user in zip(batch, users):
+                try:
+                    with transaction.atomic():
+                        user.save(force_insert=True)
+                    self.stats['imported'] += 1
+                except IntegrityError as exc:
+                    self.reject(line, row, f'Conflicto al insertar: {exc}')
+
+    def build_user(self, data):
+        return CustomUser(
+            username=data['username'],
+            email=data['email'],
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            membership_type=data['membership_type'],
+            password=data['password_hash'],
+        )
+
+    def hash_passwords(self, passwords):
+        """
+        make_password de cada contraseña (None genera una inutilizable). Con más de un worker
+        el PBKDF2 se reparte en un pool de procesos, que se crea la primera vez que hace falta:
+        una importación solo con password_hash no lo arranca.
+        """
+        if self.workers <= 1 or sum(1 for password in passwords if password) < 2:
+            return [make_password(password) for password in passwords]
+        if self.executor is None:
+            # Los hijos importan accounts.hashing, que no carga modelos antes de django.setup()
+            self.executor = password_pool(self.workers)
+        return hash_passwords(self.executor, passwords, self.workers)
+
+    def report_progress(self, started):
+        elapsed = time.monotonic() - started
+        done = self.stats['imported'] + self.stats['rejected']
+        self.stdout.write(f'  {done} filas ({done / elapsed if elapsed else 0:.0f} filas/s)')
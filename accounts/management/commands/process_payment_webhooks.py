@@ -0,0 +1,54 @@
+# accounts/management/commands/process_payment_webhooks.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.webhooks import apply_pending_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Aplica a PaymentOrder y a la membresía de cada usuario los eventos de webhook '
+        'guardados por /accounts/payment/webhook/, por lotes y en orden de occurred_at. '
+        'Se pueden lanzar varios a la vez: cada lote se reserva con SKIP LOCKED.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Eventos por lote y transacción (default: 500).',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Vacía la cola pendiente y termina en lugar de seguir esperando eventos.',
+        )
+        parser.add_argument(
+            '--idle-sleep', type=float, default=1.0,
+            help='Segundos de espera cuando no hay eventos pendientes (default: 1).',
+        )
+
+    def handle(self, *args, **options):
+        totals = {}
+        try:
+            while True:
+                started = time.monotonic()
+                outcomes = apply_pending_events(options['batch_size'])
+                if outcomes:
+                    for outcome, count in outcomes.items():
+                        totals[outcome] = totals.get(outcome, 0) + count
+                    if options['verbosity'] > 1:
+                        self.stdout.write(
+                            f'Lote de {sum(outcomes.values())} eventos en '
+                            f'{(time.monotonic() - started) * 1000:.0f} ms: {outcomes}'
+                        )
+                    continue
+                if options['once']:
+                    break
+                # Proceso de larga duración: no conservar una conexión caída entre esperas
+                close_old_connections()
+                time.sleep(options['idle_sleep'])
+        except KeyboardInterrupt:
+            pass
+        summary = ', '.join(f'{outcome}: {count}' for outcome, count in sorted(totals.items())) or 'sin eventos'
+        self.stdout.write(self.style.SUCCESS(f'Eventos procesados ({summary})'))
@@ -0,0 +1,59 @@
+# accounts/management/commands/purge_deleted_accounts.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.deletion import pending_deletions, purge_account
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra las cuentas dadas de baja desde el admin: primero sus órdenes en lotes pequeños '
+        '(cada uno en su propia transacción), después el usuario y por último sus archivos. '
+        'Si se interrumpe, la siguiente ejecución continúa donde se quedó.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Órdenes borradas por transacción (default: 500).',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Segundos de espera entre lotes para ceder la tabla a otras escrituras (default: 0).',
+        )
+        parser.add_argument(
+            '--grace-hours', type=float, default=0,
+            help='Solo borra cuentas marcadas hace al menos N horas (default: 0).',
+        )
+        parser.add_argument(
+            '--limit', type=int,
+            help='Número máximo de cuentas por ejecución.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo cuenta las cuentas pendientes de borrar.',
+        )
+
+    def handle(self, *args, **options):
+        users = pending_deletions(timezone.now() - timedelta(hours=options['grace_hours']))
+        if options['limit']:
+            users = users[:options['limit']]
+        users = list(users)
+        self.stdout.write(f'{len(users)} cuentas pendientes de borrar')
+        if options['dry_run'] or not users:
+            return
+
+        started = time.monotonic()
+        orders = 0
+        for user in users:
+            deleted = purge_account(user, options['batch_size'], options['pause'])
+            orders += deleted
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  {user.username}: {deleted} órdenes')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(users)} cuentas y {orders} órdenes borradas en {elapsed:.1f}s'
+        ))
@@ -0,0 +1,214 @@
+# accounts/management/commands/purge_orphaned_media.py
+import json
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models
+
+
+class Command(BaseCommand):
+    help = (
+        'Elimina archivos de MEDIA_ROOT que ningún registro de la base de datos referencia. '
+        'Recorre el árbol directorio por directorio, de modo que la memoria usada depende '
+        'del tamaño de un directorio y no del total de archivos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help='Solo se borran archivos sin modificar en al menos estas horas (default: 24).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Muestra qué se borraría sin tocar el disco ni el checkpoint.',
+        )
+        parser.add_argument(
+            '--checkpoint', default=os.path.join(settings.MEDIA_ROOT, '.purge_orphaned_media.json'),
+            help='Archivo donde se guarda el progreso para poder reanudar.',
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Ignora el checkpoint existente y empieza desde el principio.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Tamaño de lote al leer referencias de la base de datos.',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.media_root = os.path.abspath(settings.MEDIA_ROOT)
+        self.dry_run = options['dry_run']
+        self.chunk_size = options['chunk_size']
+        self.cutoff = time.time() - options['grace_hours'] * 3600
+        self.file_fields = self.get_file_fields()
+        checkpoint_path = options['checkpoint']
+
+        checkpoint = {} if options['reset'] else self.load_checkpoint(checkpoint_path)
+        resume_after = checkpoint.get('last_directory')
+        stats = {
+            'scanned': checkpoint.get('scanned', 0),
+            'deleted': checkpoint.get('deleted', 0),
+            'freed_bytes': checkpoint.get('freed_bytes', 0),
+        }
+
+        if resume_after is not None:
+            self.stdout.write(f'Reanudando después de "{resume_after or "."}"')
+
+        for directory in self.walk(resume_after):
+            self.purge_directory(directory, stats)
+            if not self.dry_run:
+                self.save_checkpoint(checkpoint_path, dict(stats, last_directory=directory))
+
+        if not self.dry_run and os.path.exists(checkpoint_path):
+            os.unlink(checkpoint_path)
+
+        action = 'Se borrarían' if self.dry_run else 'Borrados'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {stats['deleted']} de {stats['scanned']} archivos "
+            f"({stats['freed_bytes'] / (1024 * 1024):.1f} MB)"
+        ))
+
+    # -----------------------------------------------------------------
+    # Recorrido del árbol
+    # -----------------------------------------------------------------
+
+    def walk(self, resume_after=None):
+        """
+        Recorre MEDIA_ROOT en pre-orden con los subdirectorios ordenados, de modo que el
+        orden es estable entre ejecuciones y el checkpoint puede expresarse como
+        "último directorio terminado". Solo se mantiene en memoria la pila de pendientes.
+        """
+        resume_parts = tuple(resume_after.split('/')) if resume_after else ()
+        stack = ['']
+        while stack:
+            directory = stack.pop()
+            parts = tuple(directory.split('/')) if directory else ()
+
+            if resume_after is not None:
+                is_ancestor = resume_parts[:len(parts)] == parts
+                if parts <= resume_parts and not is_ancestor:
+                    # Todo este subárbol quedó antes del checkpoint
+                    continue
+                if parts <= resume_parts:
+                    # Ancestro (o el propio directorio) ya procesado: solo se desciende
+                    stack.extend(reversed(self.list_subdirectories(directory)))
+                    continue
+
+            subdirectories = self.list_subdirectories(directory)
+            yield directory
+            stack.extend(reversed(subdirectories))
+
+    def list_subdirectories(self, directory):
+        path = os.path.join(self.media_root, directory)
+        try:
+            with os.scandir(path) as entries:
+                names = sorted(
+                    entry.name for entry in entries
+                    if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.')
+                )
+        except FileNotFoundError:
+            return []
+        return [f'{directory}/{name}' if directory else name for name in names]
+
+    # -----------------------------------------------------------------
+    # Referencias en base de datos
+    # -----------------------------------------------------------------
+
+    def get_file_fields(self):
+        """Todos los FileField/ImageField concretos de los modelos instalados."""
+        return [
+            (model, field.name)
+            for model in apps.get_models()
+            for field in model._meta.concrete_fields
+            if isinstance(field, models.FileField)
+        ]
+
+    def referenced_names(self, directory):
+        """Nombres referenciados que viven directamente en `directory` (no en subdirectorios)."""
+        prefix = f'{directory}/' if directory else ''
+        referenced = set()
+        for model, field_name in self.file_fields:
+            queryset = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            if prefix:
+                queryset = queryset.filter(**{f'{field_name}__startswith': prefix})
+            for name in queryset.values_list(field_name, flat=True).iterator(chunk_size=self.chunk_size):
+                if '/' not in name[len(prefix):]:
+                    referenced.add(name)
+        return referenced
+
+    # -----------------------------------------------------------------
+    # Borrado
+    # -----------------------------------------------------------------
+
+    def purge_directory(self, directory, stats):
+        path = os.path.join(self.media_root, directory)
+        referenced = None
+
+        try:
+            entries = os.scandir(path)
+        except FileNotFoundError:
+            return
+
+        with entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+
+                # Los archivos ocultos (checkpoint, temporales de subida) solo se
+                # limpian si son temporales abandonados de una subida interrumpida.
+                if entry.name.startswith('.') and not (
+                    entry.name.startswith('.upload-') and entry.name.endswith('.tmp')
+                ):
+                    continue
+
+                stats['scanned'] += 1
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > self.cutoff:
+                    continue
+
+                name = f'{directory}/{entry.name}' if directory else entry.name
+                if not entry.name.startswith('.'):
+                    if referenced is None:
+                        # Solo se consulta la base de datos si el directorio tiene candidatos
+                        referenced = self.referenced_names(directory)
+                    if name in referenced:
+                        continue
+
+                self.delete_file(entry.path, name, stat.st_size, stats)
+
+    def delete_file(self, path, name, size, stats):
+        if self.dry_run:
+            self.stdout.write(f'[dry-run] {name}')
+        else:
+            try:
+                # Se vuelve a comprobar el mtime: una subida idéntica pudo reutilizar el archivo
+                if os.stat(path).st_mtime > self.cutoff:
+                    return
+                os.unlink(path)
+            except FileNotFoundError:
+                return
+            if self.verbosity >= 2:
+                self.stdout.write(f'Borrado: {name}')
+        stats['deleted'] += 1
+        stats['freed_bytes'] += size
+
+    # -----------------------------------------------------------------
+    # Checkpoint
+    # -----------------------------------------------------------------
+
+    def load_checkpoint(self, path):
+        try:
+            with open(path, encoding='utf-8') as checkpoint_file:
+                return json.load(checkpoint_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_checkpoint(self, path, data):
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump(data, checkpoint_file)
+        os.replace(temp_path, path)
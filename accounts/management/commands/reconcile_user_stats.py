@@ -0,0 +1,46 @@
+# accounts/management/commands/reconcile_user_stats.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import CustomUser
+from accounts.stats import reconcile_users
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula UserStats desde PaymentOrder y corrige las filas que se hayan desviado. '
+        'Recorre los usuarios por lotes de clave primaria, cada lote en su propia transacción.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Usuarios por lote (default: 1000).',
+        )
+        parser.add_argument(
+            '--start-id', type=int, default=0,
+            help='Empieza por los usuarios con id mayor que este (para reanudar).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = options['start_id']
+        started = time.monotonic()
+        checked = fixed = 0
+        while True:
+            user_ids = list(
+                CustomUser.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            fixed += reconcile_users(user_ids)
+            checked += len(user_ids)
+            last_id = user_ids[-1]
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  hasta el usuario {last_id}: {checked} revisados, {fixed} corregidos')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{checked} usuarios revisados, {fixed} estadísticas corregidas en {elapsed:.1f}s'
+        ))
@@ -0,0 +1,84 @@
+# accounts/management/commands/renew_subscriptions.py
+import multiprocessing
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.utils import timezone
+
+from accounts.renewals import renewal_queryset, run_worker
+from accounts.workers import renew_worker, setup_worker, worker_databases
+
+
+class Command(BaseCommand):
+    help = (
+        'Renueva las membresías de pago que vencen dentro de la ventana indicada: cobra el '
+        'importe de la última orden, crea la PaymentOrder y extiende la membresía 30 días. '
+        'Los lotes se reservan con SELECT ... FOR UPDATE SKIP LOCKED, así que se puede repartir '
+        'el trabajo entre --workers procesos (o varias máquinas) y relanzarlo si se interrumpe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window-hours', type=float, default=24,
+            help='Renueva las membresías que vencen en las próximas N horas (default: 24).',
+        )
+        parser.add_argument(
+            '--grace-days', type=float, default=3,
+            help='También las vencidas hace menos de N días; las más antiguas se dan por caducadas (default: 3).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=100,
+            help='Usuarios reservados por lote; cada renovación se confirma por separado (default: 100).',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Procesos en paralelo (default: 1).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo cuenta cuántas membresías entran en la ventana.',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        window_start = now - timedelta(days=options['grace_days'])
+        window_end = now + timedelta(hours=options['window_hours'])
+        pending = renewal_queryset(window_start, window_end).count()
+        self.stdout.write(
+            f'{pending} membresías vencen entre {window_start:%Y-%m-%d %H:%M} y {window_end:%Y-%m-%d %H:%M}'
+        )
+        if options['dry_run'] or not pending:
+            return
+
+        workers = options['workers']
+        if workers > 1 and not connection.features.has_select_for_update_skip_locked:
+            self.stderr.write(f'{connection.vendor} no soporta SKIP LOCKED: se usa un único worker')
+            workers = 1
+
+        started = time.monotonic()
+        job = (window_start, window_end, options['chunk_size'])
+        if workers == 1:
+            results = [run_worker(*job)]
+        else:
+            # Las conexiones abiertas no deben heredarse en los hijos
+            connections.close_all()
+            context = multiprocessing.get_context('spawn')
+            # Los hijos importan accounts.workers, que no carga modelos antes de django.setup()
+            with context.Pool(workers, initializer=setup_worker, initargs=(worker_databases(),)) as pool:
+                results = pool.map(renew_worker, [job] * workers)
+
+        totals = {}
+        for result in results:
+            for outcome, count in result.items():
+                totals[outcome] = totals.get(outcome, 0) + count
+        elapsed = time.monotonic() - started
+        processed = sum(totals.values())
+        summary = ', '.join(f'{outcome}: {count}' for outcome, count in sorted(totals.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} membresías procesadas en {elapsed:.1f}s '
+            f'({processed / elapsed if elapsed else 0:.0f}/s) con {workers} workers ({summary})'
+        ))
+        if totals.get('deferred'):
+            self.stderr.write('La pasarela dejó de responder: vuelve a lanzar el comando para continuar')
@@ -0,0 +1,50 @@
+# accounts/management/commands/send_membership_reminders.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.reminders import reminder_queryset, send_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        'Avisa por correo a los miembros de pago cuya membresía vence en los próximos N días. '
+        'Envía por lotes sobre una única conexión SMTP y marca a cada usuario con el vencimiento '
+        'avisado, así que relanzarlo solo escribe a quien aún no recibió el aviso.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=float, default=7,
+            help='Avisa de las membresías que vencen en los próximos N días (default: 7).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Correos renderizados y enviados por lote (default: 500).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo cuenta cuántos avisos se enviarían.',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        window_end = now + timedelta(days=options['days'])
+        queryset = reminder_queryset(now, window_end)
+        pending = queryset.count()
+        self.stdout.write(f'{pending} membresías vencen antes de {window_end:%Y-%m-%d %H:%M} sin aviso enviado')
+        if options['dry_run'] or not pending:
+            return
+
+        started = time.monotonic()
+        sent = 0
+        for batch in send_reminders(queryset, window_end, options['batch_size']):
+            sent += batch
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  {sent} avisos enviados')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{sent} avisos enviados en {elapsed:.1f}s ({sent / elapsed if elapsed else 0:.0f}/s)'
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:59
+
+import accounts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_customuser_birth_date_customuser_profile_picture_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=accounts.storage.profile_picture_storage, upload_to='profile_pictures/'),
+        ),
+    ]
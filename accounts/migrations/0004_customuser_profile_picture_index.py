@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:00
+
+import accounts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_customuser_profile_picture_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_picture',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=accounts.storage.profile_picture_storage, upload_to='profile_pictures/'),
+        ),
+    ]
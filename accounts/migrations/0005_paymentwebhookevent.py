@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_customuser_profile_picture_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=100, unique=True)),
+                ('transaction_id', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('completed', 'Completado'), ('failed', 'Fallido'), ('cancelled', 'Cancelado'), ('refunded', 'Reembolsado')], max_length=20)),
+                ('occurred_at', models.DateTimeField()),
+                ('payload', models.JSONField(default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('outcome', models.CharField(blank=True, choices=[('applied', 'Aplicado'), ('ignored', 'Ignorado (transición no válida o repetida)'), ('unknown_order', 'Orden desconocida')], max_length=20)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['processed_at', 'occurred_at', 'id'], name='webhook_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_paymentorder_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhookevent',
+            name='retry_after',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_paymentwebhookevent_retry_after'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='membership_renewal_claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
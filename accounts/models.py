@@ -2,7 +2,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
-from django.templatetags.static import static
+from .avatars import DEFAULT_AVATAR, avatar_url, is_valid_avatar
+from .storage import profile_picture_storage
 
 class CustomUser(AbstractUser):
     MEMBERSHIP_CHOICES = [
@@ -18,9 +19,11 @@ class CustomUser(AbstractUser):
         default='free'
     )
     
-    # Información de perfil
+    # Información de perfil (guardada por hash de contenido: sin duplicados en disco)
     profile_picture = models.ImageField(
         upload_to='profile_pictures/',
+        storage=profile_picture_storage,
+        db_index=True,
         null=True,
         blank=True
     )
@@ -39,11 +42,26 @@ class CustomUser(AbstractUser):
     membership_start = models.DateTimeField(null=True, blank=True)
     membership_expiry = models.DateTimeField(null=True, blank=True)
     is_active_member = models.BooleanField(default=False)
+    # Vencimiento para el que ya se intentó la renovación automática (renew_subscriptions)
+    membership_renewal_attempt = models.DateTimeField(null=True, blank=True)
+    # Lote de renovación que reservó al usuario (caduca si el worker muere antes de procesarlo)
+    membership_renewal_claimed_at = models.DateTimeField(null=True, blank=True)
+    # Vencimiento del que ya se avisó por correo (send_membership_reminders)
+    membership_reminder_sent_for = models.DateTimeField(null=True, blank=True)
+
+    # Baja solicitada: la cuenta queda desactivada y purge_deleted_accounts la borra por lotes
+    deletion_requested_at = models.DateTimeField(null=True, blank=True, db_index=True)
     
     # Información de pago
     default_payment_method = models.CharField(max_length=50, blank=True, null=True)
     card_last_four = models.CharField(max_length=4, blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # renew_subscriptions y send_membership_reminders: miembros activos que vencen dentro de la ventana
+            models.Index(fields=['is_active_member', 'membership_expiry'], name='membership_expiry_idx'),
+        ]
+
     def __str__(self):
         return self.username
     
@@ -53,13 +71,16 @@ class CustomUser(AbstractUser):
         if self.profile_picture and hasattr(self.profile_picture, 'url'):
             return self.profile_picture.url
         
-        # SEGUNDO: Si hay avatar del sistema seleccionado
-        elif self.selected_avatar:
-            return static(f'assets/{self.selected_avatar}')
-        
-        # TERCERO: Avatar por defecto
-        else:
-            return static('assets/avatar_default.jpg')
+        # SEGUNDO: Avatar del sistema (o el predeterminado), desde el mapa precalculado
+        return avatar_url(self.get_system_avatar())
+
+    def get_system_avatar(self):
+        """Nombre del avatar del sistema en uso, o None si el usuario subió su propia imagen"""
+        if self.profile_picture:
+            return None
+        if self.selected_avatar and is_valid_avatar(self.selected_avatar):
+            return self.selected_avatar
+        return DEFAULT_AVATAR
     
     @property
     def get_membership_type_display(self):
@@ -117,6 +138,8 @@ class PaymentOrder(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
     transaction_id = models.CharField(max_length=100, unique=True)
+    # Idempotency-Key con la que se cobró (checkout); repetir el cargo con ella no cobra dos veces
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
     card_last_four = models.CharField(max_length=4, blank=True, null=True)
     customer_email = models.EmailField()
     
@@ -151,4 +174,57 @@ class PaymentOrder(models.Model):
     
     def get_plan_display_name(self):
         """Obtener nombre legible del plan"""
-        return dict(self.PLAN_CHOICES).get(self.plan_type, self.plan_type)
\ No newline at end of file
+        return dict(self.PLAN_CHOICES).get(self.plan_type, self.plan_type)
+
+
+class UserStats(models.Model):
+    """
+    Resumen de compras de un usuario, mantenido por accounts/stats.py con UPDATE ... F() cada
+    vez que una orden se completa o deja de estarlo. Leerlo es una búsqueda por clave primaria;
+    reconcile_user_stats lo recalcula desde PaymentOrder si alguna vez se desvía.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    # Órdenes actualmente completadas y su importe (una devolución las descuenta)
+    completed_orders = models.PositiveIntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    refunded_orders = models.PositiveIntegerField(default=0)
+    refunded_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # paid_at más reciente de cualquier orden que llegó a pagarse
+    last_purchase_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Estadísticas de {self.user_id}: {self.completed_orders} órdenes, ${self.lifetime_spend}"
+
+
+class PaymentWebhookEvent(models.Model):
+    """
+    Evento de cambio de estado enviado por el procesador de pagos. La vista solo lo guarda
+    (deduplicado por event_id); process_payment_webhooks lo aplica después a la orden.
+    """
+    OUTCOME_CHOICES = [
+        ('applied', 'Aplicado'),
+        ('ignored', 'Ignorado (transición no válida o repetida)'),
+        ('unknown_order', 'Orden desconocida'),
+    ]
+
+    event_id = models.CharField(max_length=100, unique=True)
+    transaction_id = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=PaymentOrder.STATUS_CHOICES)
+    occurred_at = models.DateTimeField()
+    payload = models.JSONField(default=dict)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # Orden aún desconocida: el worker no vuelve a intentarlo antes de este momento
+    retry_after = models.DateTimeField(null=True, blank=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, blank=True)
+
+    class Meta:
+        indexes = [
+            # Cola de pendientes del worker: processed_at IS NULL ORDER BY occurred_at, id
+            models.Index(fields=['processed_at', 'occurred_at', 'id'], name='webhook_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"Evento {self.event_id} - {self.transaction_id} -> {self.status}"
@@ -0,0 +1,193 @@
+# accounts/receipts.py
+"""
+Recibos de las órdenes completadas, generados una sola vez y guardados como archivos.
+
+Cuando una PaymentOrder pasa a 'completed' (checkout, renovación o webhook) se escriben,
+tras el commit, RECEIPTS_ROOT/<user_id>/<transaction_id>.v<N>.html y .pdf. Desde entonces el
+recibo no se vuelve a renderizar: payment_success y la descarga de recibos solo entregan
+el archivo, con un ETag fuerte derivado del transaction_id y de RECEIPT_VERSION.
+
+Los archivos son inmutables: si cambia la plantilla hay que subir RECEIPT_VERSION, lo que
+cambia el nombre del archivo y el ETag (los recibos antiguos se regeneran al pedirse).
+Si la orden deja de estar completada (devolución, cancelación) sus recibos se borran tras
+el commit: la descarga ya no encuentra el archivo, la orden no pasa el filtro de estado y
+ambas vistas responden 404 aunque el navegador revalide con el ETag antiguo.
+RECEIPTS_ROOT está fuera de MEDIA_ROOT: los recibos solo se sirven a su propietario.
+"""
+import logging
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import PaymentOrder
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_VERSION = 1
+RECEIPT_FORMATS = {
+    'html': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf',
+}
+
+_unsafe_chars = re.compile(r'[^A-Za-z0-9_-]')
+
+
+def receipt_path(user_id, transaction_id, fmt):
+    name = _unsafe_chars.sub('_', transaction_id)
+    return os.path.join(settings.RECEIPTS_ROOT, str(user_id), f'{name}.v{RECEIPT_VERSION}.{fmt}')
+
+
+def receipt_etag(transaction_id):
+    return f'"{_unsafe_chars.sub("_", transaction_id)}-v{RECEIPT_VERSION}"'
+
+
+# =========================================================================
+# GENERACIÓN
+# =========================================================================
+
+def store_receipt(order):
+    """Escribe los recibos de `order` si aún no existen. Devuelve la ruta del HTML."""
+    html_path = receipt_path(order.user_id, order.transaction_id, 'html')
+    if os.path.exists(html_path):
+        return html_path
+    os.makedirs(os.path.dirname(html_path), exist_ok=True)
+    html = render_to_string('accounts/receipt.html', {'order': order})
+    # El PDF primero: un HTML presente implica que ambos están completos
+    _write_atomic(receipt_path(order.user_id, order.transaction_id, 'pdf'), render_pdf(receipt_lines(order)))
+    _write_atomic(html_path, html.encode('utf-8'))
+    return html_path
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def receipt_lines(order):
+    paid_at = order.paid_at or order.created_at
+    return [
+        (18, 'ChaosCompany - Recibo de pago'),
+        (11, ''),
+        (11, f'Orden: #{order.id}'),
+        (11, f'Plan: {order.get_plan_type_display()}'),
+        (11, f'Monto: ${order.amount}'),
+        (11, f'Método de pago: {order.get_payment_method_display()}'),
+        (11, f'Tarjeta: **** {order.card_last_four}' if order.card_last_four else ''),
+        (11, f'ID de transacción: {order.transaction_id}'),
+        (11, f'Fecha: {timezone.localtime(paid_at):%d/%m/%Y %H:%M}' if paid_at else ''),
+        (11, f'Correo: {order.customer_email}'),
+    ]
+
+
+def _pdf_text(text):
+    # Helvetica con WinAnsiEncoding: cp1252 cubre los acentos y la ñ
+    return text.encode('cp1252', 'replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def render_pdf(lines):
+    """PDF de una página A4 con líneas de texto, sin dependencias externas."""
+    stream = [b'BT', b'50 790 Td']
+    for size, text in lines:
+        stream.append(b'/F1 %d Tf (%s) Tj 0 -%d Td' % (size, _pdf_text(text), size + 8))
+    stream.append(b'ET')
+    content = b'\n'.join(stream)
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+        b'/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+# =========================================================================
+# ENTREGA
+# =========================================================================
+
+def receipt_response(request, user_id, transaction_id, fmt='html', load_order=None):
+    """
+    Respuesta con el recibo guardado. Si el archivo aún no existe (orden anterior a los
+    recibos, o la generación falló) y se pasa `load_order`, se genera ahora. 404 si no hay
+    recibo ni forma de generarlo.
+
+    Cache-Control no-cache: el navegador revalida con el ETag en cada visita, así que
+    cerrar sesión sigue impidiendo ver el recibo, y un 304 no lee el archivo.
+    """
+    path = receipt_path(user_id, transaction_id, fmt)
+    if not os.path.exists(path):
+        order = load_order() if load_order is not None else None
+        if order is None:
+            raise Http404('Recibo no encontrado')
+        store_receipt(order)
+
+    etag = receipt_etag(transaction_id)
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=RECEIPT_FORMATS[fmt])
+        if fmt != 'html':
+            response['Content-Disposition'] = f'attachment; filename="recibo-{os.path.basename(path)}"'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _store_receipt_quietly(order):
+    try:
+        store_receipt(order)
+    except Exception:
+        # Sin recibo guardado la vista lo genera al pedirse: no debe romper el pago
+        logger.exception("❌ No se pudo generar el recibo de la orden %s", order.pk)
+
+
+def discard_receipt(order):
+    """Borra los recibos guardados de `order` (primero el HTML, que marca el recibo como completo)."""
+    for fmt in RECEIPT_FORMATS:
+        try:
+            os.remove(receipt_path(order.user_id, order.transaction_id, fmt))
+        except FileNotFoundError:
+            pass
+
+
+def schedule_receipt(order):
+    """
+    Al confirmar la transacción en curso genera el recibo si la orden está completada, o
+    borra el que hubiera si ya no lo está.
+    """
+    if order.status == 'completed':
+        transaction.on_commit(lambda: _store_receipt_quietly(order), using=order._state.db)
+    else:
+        transaction.on_commit(lambda: discard_receipt(order), using=order._state.db)
+
+
+def _order_saved(sender, instance, **kwargs):
+    schedule_receipt(instance)
+
+
+post_save.connect(_order_saved, sender=PaymentOrder, dispatch_uid='accounts.receipts.order_saved')
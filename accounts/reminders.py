@@ -0,0 +1,76 @@
+# accounts/reminders.py
+"""
+Avisos por correo de membresías a punto de vencer (manage.py send_membership_reminders).
+
+- Selección: miembros activos de pago cuyo membership_expiry cae en la ventana, por el
+  índice membership_expiry_idx (is_active_member, membership_expiry), el mismo que usa
+  renew_subscriptions.
+- Envío: la plantilla se compila una vez y cada lote se renderiza de golpe y sale por una
+  única conexión SMTP abierta para toda la ejecución (connection.send_messages), en lugar
+  de un send_mail por usuario, que abre conexión, saluda, se autentica y cierra cada vez.
+- Idempotencia: membership_reminder_sent_for guarda el vencimiento del que ya se avisó,
+  así que relanzar el comando no vuelve a escribir a nadie y al renovarse la membresía
+  (vencimiento nuevo) el usuario vuelve a ser elegible. Cada lote se marca después de
+  enviarse: si el proceso muere entre ambos pasos, la siguiente ejecución repite ese lote
+  (como mucho un aviso duplicado, nunca uno perdido).
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.template.loader import get_template
+from django.urls import reverse
+
+from .models import CustomUser
+
+REMINDER_TEMPLATE = 'accounts/emails/membership_reminder.txt'
+REMINDER_FIELDS = ['username', 'first_name', 'email', 'membership_type', 'membership_expiry']
+
+
+def reminder_queryset(window_start, window_end):
+    """Miembros de pago que vencen en [window_start, window_end] y aún no recibieron el aviso."""
+    return CustomUser.objects.filter(
+        is_active_member=True,
+        membership_expiry__gte=window_start,
+        membership_expiry__lte=window_end,
+    ).exclude(membership_type='free').exclude(email='').filter(
+        Q(membership_reminder_sent_for__isnull=True) | Q(membership_reminder_sent_for__lt=F('membership_expiry'))
+    )
+
+
+def build_reminders(users, connection=None):
+    """Un EmailMessage por usuario, todos con la misma plantilla ya compilada."""
+    template = get_template(REMINDER_TEMPLATE)
+    renew_url = settings.SITE_URL.rstrip('/') + reverse('membresias')
+    messages = []
+    for user in users:
+        plan = user.get_membership_type_display
+        body = template.render({'user': user, 'plan': plan, 'renew_url': renew_url})
+        messages.append(EmailMessage(
+            f'Tu membresía {plan} vence pronto - ChaosCompany',
+            body,
+            settings.DEFAULT_FROM_EMAIL,
+            [user.email],
+            connection=connection,
+        ))
+    return messages
+
+
+def send_reminders(queryset, window_end, batch_size=500, connection=None):
+    """
+    Envía los avisos de `queryset` (ver reminder_queryset) por lotes de `batch_size` sobre
+    una sola conexión. Genera el número de avisos enviados en cada lote.
+    """
+    connection = connection or get_connection()
+    with connection:
+        while True:
+            # Los ya marcados salen del queryset: cada vuelta toma el siguiente lote
+            users = list(queryset.only(*REMINDER_FIELDS).order_by('membership_expiry', 'pk')[:batch_size])
+            if not users:
+                return
+            sent = connection.send_messages(build_reminders(users, connection)) or 0
+            # Se marca el vencimiento avisado; si la membresía se renovó mientras tanto
+            # (vencimiento fuera de la ventana) queda sin marcar para el nuevo periodo
+            CustomUser.objects.filter(
+                pk__in=[user.pk for user in users], membership_expiry__lte=window_end,
+            ).update(membership_reminder_sent_for=F('membership_expiry'))
+            yield sent
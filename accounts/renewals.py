@@ -0,0 +1,169 @@
+# accounts/renewals.py
+"""
+Renovación automática de membresías (manage.py renew_subscriptions).
+
+Cada worker repite hasta vaciar la ventana:
+1. Reserva un lote de miembros activos que vencen antes de `window_end` en una transacción
+   corta: SELECT ... FOR UPDATE SKIP LOCKED sobre el índice membership_expiry_idx y un
+   UPDATE de membership_renewal_claimed_at, y confirma. Varios procesos reservan lotes
+   distintos sin esperarse entre sí, y ninguno retiene bloqueos mientras cobra.
+2. Para cada uno cobra en la pasarela (accounts/gateways.py), fuera de cualquier
+   transacción, el importe de su última orden completada; después crea la PaymentOrder con
+   el estado que devolvió la pasarela y, solo si es 'completed', extiende la membresía
+   desde el vencimiento anterior, en una transacción propia. Un cobro 'pending' o 'failed'
+   queda en su orden para que lo resuelva el webhook (accounts/webhooks.py).
+
+La Idempotency-Key del cobro se deriva del usuario y del vencimiento que se renueva: si
+el proceso muere entre el cobro y el commit, la reserva caduca a los CLAIM_TIMEOUT, la
+siguiente ejecución repite la misma clave y la pasarela no cobra dos veces. Los renovados
+ya no están en la ventana y los rechazados quedan marcados en membership_renewal_attempt,
+así que relanzar el comando continúa donde se quedó.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .gateways import GatewayUnavailable, PaymentDeclined, PaymentError, get_gateway
+from .models import CustomUser, PaymentOrder
+
+logger = logging.getLogger(__name__)
+
+RENEWAL_DAYS = 30
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+def renewal_queryset(window_start, window_end):
+    """Miembros activos de pago que vencen en [window_start, window_end] sin intento previo."""
+    return CustomUser.objects.filter(
+        is_active_member=True,
+        membership_expiry__gte=window_start,
+        membership_expiry__lte=window_end,
+    ).exclude(membership_type='free').filter(
+        Q(membership_renewal_attempt__isnull=True) | Q(membership_renewal_attempt__lt=F('membership_expiry'))
+    )
+
+
+def last_orders(user_ids):
+    """Última orden completada de cada usuario (importe, tarjeta y correo a reutilizar)."""
+    orders = {}
+    for order in (PaymentOrder.objects.filter(user_id__in=user_ids, status='completed')
+                  .order_by('user_id', '-paid_at', '-id')):
+        orders.setdefault(order.user_id, order)
+    return orders
+
+
+def claim_chunk(window_start, window_end, chunk_size):
+    """Reserva hasta `chunk_size` usuarios de la ventana y confirma; devuelve la lista."""
+    now = timezone.now()
+    with transaction.atomic():
+        users = renewal_queryset(window_start, window_end).filter(
+            Q(membership_renewal_claimed_at__isnull=True) | Q(membership_renewal_claimed_at__lt=now - CLAIM_TIMEOUT)
+        ).order_by('membership_expiry', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            users = users.select_for_update(skip_locked=True)
+        users = list(users[:chunk_size])
+        CustomUser.objects.filter(pk__in=[user.pk for user in users]).update(membership_renewal_claimed_at=now)
+    return users
+
+
+def renew_chunk(window_start, window_end, chunk_size):
+    """
+    Reserva y procesa un lote. Devuelve {resultado: n}; vacío si no quedaba nada que
+    reservar. Si la pasarela cae, el resto del lote se libera y se devuelve como 'deferred'.
+    """
+    stats = {}
+    users = claim_chunk(window_start, window_end, chunk_size)
+    if not users:
+        return stats
+
+    orders = last_orders([user.pk for user in users])
+    gateway = get_gateway()
+    deferred = []
+    for user in users:
+        if deferred:
+            result = 'deferred'
+        else:
+            try:
+                result = renew_user(user, orders.get(user.pk), gateway)
+            except GatewayUnavailable as exc:
+                # Con la pasarela caída no se sigue cobrando: el resto queda para otra ejecución
+                logger.warning("⛔ Renovaciones detenidas, pasarela no disponible: %s", exc)
+                result = 'deferred'
+        if result == 'deferred':
+            deferred.append(user.pk)
+        stats[result] = stats.get(result, 0) + 1
+    if deferred:
+        CustomUser.objects.filter(pk__in=deferred).update(membership_renewal_claimed_at=None)
+    return stats
+
+
+def renew_user(user, last_order, gateway):
+    previous_expiry = user.membership_expiry
+    if last_order is None:
+        # Sin orden previa no hay importe que cobrar (membresía asignada a mano)
+        mark_attempted(user, previous_expiry)
+        return 'skipped'
+
+    key = f'renew-{user.pk}-{int(previous_expiry.timestamp())}'
+    try:
+        charge = gateway.charge(last_order.amount, user.membership_type,
+                                last_order.customer_email, last_order.card_last_four,
+                                idempotency_key=key)
+        status = charge.status if charge.status in dict(PaymentOrder.STATUS_CHOICES) else 'pending'
+        with transaction.atomic():
+            new_expiry = previous_expiry + timedelta(days=RENEWAL_DAYS)
+            # Con las fechas de la renovación aunque no esté completada: si un webhook la
+            # completa después, refresh_memberships alarga la membresía hasta subscription_end
+            PaymentOrder.objects.create(
+                user=user,
+                plan_type=user.membership_type,
+                amount=last_order.amount,
+                status=status,
+                transaction_id=charge.transaction_id,
+                payment_method=last_order.payment_method,
+                card_last_four=last_order.card_last_four,
+                customer_email=last_order.customer_email,
+                subscription_start=previous_expiry,
+                subscription_end=new_expiry,
+            )
+            if status != 'completed':
+                # Cobro sin confirmar (o fallido): la membresía no se alarga hasta que llegue el webhook
+                mark_attempted(user, previous_expiry)
+                return status
+            user.membership_expiry = new_expiry
+            user.membership_renewal_attempt = previous_expiry
+            user.membership_renewal_claimed_at = None
+            user.save(update_fields=['membership_expiry', 'membership_renewal_attempt', 'membership_renewal_claimed_at'])
+    except PaymentDeclined as exc:
+        logger.info("💳 Renovación rechazada para el usuario %s: %s", user.pk, exc)
+        mark_attempted(user, previous_expiry)
+        return 'declined'
+    except GatewayUnavailable:
+        raise
+    except PaymentError as exc:
+        logger.error("💥 Respuesta inesperada renovando al usuario %s: %s", user.pk, exc)
+        mark_attempted(user, previous_expiry)
+        return 'error'
+    except IntegrityError:
+        # El transaction_id ya existe: esta renovación se registró en una ejecución anterior
+        mark_attempted(user, previous_expiry)
+        return 'duplicate'
+    return 'renewed'
+
+
+def mark_attempted(user, expiry):
+    CustomUser.objects.filter(pk=user.pk).update(membership_renewal_attempt=expiry, membership_renewal_claimed_at=None)
+
+
+def run_worker(window_start, window_end, chunk_size):
+    """Bucle de un worker: lotes hasta que no quede nada que reservar."""
+    totals = {}
+    while True:
+        stats = renew_chunk(window_start, window_end, chunk_size)
+        for result, count in stats.items():
+            totals[result] = totals.get(result, 0) + count
+        if not stats or 'deferred' in stats:
+            return totals
@@ -0,0 +1,163 @@
+# accounts/stats.py
+"""
+Estadísticas de compra por usuario (UserStats) mantenidas de forma incremental.
+
+Cada cambio de estado de una orden se traduce en deltas que se aplican con un solo
+UPDATE ... SET campo = campo + delta sobre la fila del usuario, dentro de la misma
+transacción que guarda la orden: nunca se leen y reescriben los totales, así que dos
+pagos simultáneos del mismo usuario no se pisan. Orígenes de los cambios:
+
+- Órdenes creadas ya completadas (renovaciones): señal post_save. post_save se emite
+  fuera de la transacción de save(), así que quien crea la orden lo hace dentro de
+  transaction.atomic() junto con la membresía (renewals.renew_user); si no, orden y
+  estadísticas se confirmarían por separado.
+- Checkout: la orden se crea 'pending' y checkout.finish_order aplica la transición con
+  record_status_changes en la misma transacción que la orden y la membresía.
+- Transiciones de los webhooks (bulk_update, sin señales): apply_pending_events llama a
+  record_status_changes con el estado anterior de cada orden.
+
+reconcile_user_stats recalcula todo desde PaymentOrder por lotes de usuarios.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from .models import PaymentOrder, UserStats
+
+STAT_FIELDS = ['completed_orders', 'lifetime_spend', 'refunded_orders', 'refunded_amount', 'last_purchase_at']
+
+
+def get_user_stats(user):
+    """Estadísticas de `user` (una búsqueda por clave primaria); ceros si aún no tiene fila."""
+    return UserStats.objects.filter(pk=user.pk).first() or UserStats(user_id=user.pk)
+
+
+async def aget_user_stats(user):
+    return await UserStats.objects.filter(pk=user.pk).afirst() or UserStats(user_id=user.pk)
+
+
+# =========================================================================
+# ACTUALIZACIÓN INCREMENTAL
+# =========================================================================
+
+def order_delta(order, old_status):
+    """Deltas que produce pasar `order` de `old_status` (None si es nueva) a su estado actual."""
+    delta = {}
+    if old_status == order.status:
+        return delta
+    if order.status == 'completed':
+        delta['completed_orders'] = 1
+        delta['lifetime_spend'] = order.amount
+    elif old_status == 'completed':
+        delta['completed_orders'] = -1
+        delta['lifetime_spend'] = -order.amount
+    if order.status == 'refunded':
+        delta['refunded_orders'] = 1
+        delta['refunded_amount'] = order.amount
+    if order.paid_at:
+        # Greatest: repetirlo no cambia nada, y cubre pending -> completed -> refunded en un lote
+        delta['last_purchase_at'] = order.paid_at
+    return delta
+
+
+def merge_delta(total, delta):
+    for field, value in delta.items():
+        if field == 'last_purchase_at':
+            total[field] = max(total.get(field, value), value)
+        else:
+            total[field] = total.get(field, 0) + value
+
+
+def apply_delta(user_id, delta):
+    if not delta:
+        return
+    expressions = {'updated_at': timezone.now()}
+    for field, value in delta.items():
+        if field == 'last_purchase_at':
+            # Coalesce: Greatest con NULL devuelve NULL en MySQL y SQLite
+            expressions[field] = Greatest(Coalesce(F(field), Value(value)), Value(value))
+        else:
+            expressions[field] = F(field) + value
+
+    if UserStats.objects.filter(pk=user_id).update(**expressions):
+        return
+    try:
+        # Primera orden del usuario: se crea la fila a cero y se aplica el mismo UPDATE
+        with transaction.atomic():
+            UserStats.objects.create(user_id=user_id)
+    except IntegrityError:
+        # Otra transacción la creó a la vez
+        pass
+    UserStats.objects.filter(pk=user_id).update(**expressions)
+
+
+def record_status_changes(changes):
+    """Aplica `changes` = [(orden ya guardada, estado anterior)] con un UPDATE por usuario."""
+    per_user = {}
+    for order, old_status in changes:
+        merge_delta(per_user.setdefault(order.user_id, {}), order_delta(order, old_status))
+    for user_id in sorted(per_user):
+        # Orden fijo de bloqueo entre workers que tocan los mismos usuarios
+        apply_delta(user_id, per_user[user_id])
+
+
+def _order_saved(sender, instance, created, raw=False, **kwargs):
+    # Solo las altas: los cambios de estado posteriores llegan por los webhooks
+    if created and not raw:
+        apply_delta(instance.user_id, order_delta(instance, None))
+
+
+post_save.connect(_order_saved, sender=PaymentOrder, dispatch_uid='accounts.stats.order_saved')
+
+
+# =========================================================================
+# RECONCILIACIÓN
+# =========================================================================
+
+def compute_stats(user_ids):
+    """Estadísticas calculadas desde PaymentOrder para `user_ids`, {user_id: {campo: valor}}."""
+    rows = (
+        PaymentOrder.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(
+            completed_orders=Count('pk', filter=Q(status='completed')),
+            lifetime_spend=Coalesce(Sum('amount', filter=Q(status='completed')), Value(Decimal('0'))),
+            refunded_orders=Count('pk', filter=Q(status='refunded')),
+            refunded_amount=Coalesce(Sum('amount', filter=Q(status='refunded')), Value(Decimal('0'))),
+            # paid_at solo se fija al completarse: sigue contando aunque luego se devuelva o cancele
+            last_purchase_at=Max('paid_at'),
+        )
+    )
+    stats = {user_id: dict.fromkeys(STAT_FIELDS, 0) | {'last_purchase_at': None} for user_id in user_ids}
+    for row in rows:
+        stats[row.pop('user_id')] = row
+    return stats
+
+
+def reconcile_users(user_ids):
+    """Recalcula y corrige las estadísticas de `user_ids`. Devuelve cuántas filas cambiaron."""
+    with transaction.atomic():
+        # Se bloquean las filas existentes antes de agregar: un pago concurrente espera y
+        # aplica su delta sobre el valor ya corregido
+        current = {stats.pk: stats for stats in UserStats.objects.select_for_update().filter(pk__in=user_ids)}
+        expected = compute_stats(user_ids)
+
+        fixed = []
+        for user_id, values in expected.items():
+            stats = current.get(user_id) or UserStats(user_id=user_id)
+            if all(getattr(stats, field) == values[field] for field in STAT_FIELDS):
+                # Sin diferencias (o sin órdenes ni fila: get_user_stats ya devuelve ceros)
+                continue
+            fixed.append(UserStats(user_id=user_id, updated_at=timezone.now(), **values))
+        UserStats.objects.bulk_create(
+            fixed,
+            update_conflicts=True,
+            # MySQL (ON DUPLICATE KEY UPDATE) no admite indicar la columna en conflicto
+            unique_fields=['user'] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=STAT_FIELDS + ['updated_at'],
+        )
+    return len(fixed)
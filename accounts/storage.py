@@ -0,0 +1,84 @@
+# accounts/storage.py
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+# Los nombres tienen la forma "<directorio>/<2 primeros hex>/<sha256>.<ext>"
+CONTENT_ADDRESSED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?$')
+
+
+def is_content_addressed(name):
+    """Indica si un nombre de archivo proviene de ContentAddressedStorage (y por lo tanto nunca cambia)."""
+    return bool(name) and CONTENT_ADDRESSED_NAME_RE.search(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Almacenamiento que guarda cada archivo bajo el hash SHA-256 de su contenido.
+
+    - Subir dos veces la misma imagen produce un solo archivo en disco.
+    - La escritura es atómica: se escribe a un temporal en el mismo directorio y luego se renombra.
+    - Como el nombre depende del contenido, la URL de un archivo nunca cambia y puede cachearse para siempre.
+    """
+
+    chunk_size = 64 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo se calcula en _save() a partir del contenido,
+        # así que nunca se agregan sufijos aleatorios como "_sqbcTP7".
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(full_directory, self.directory_permissions_mode)
+
+        # Un solo recorrido del contenido: se calcula el hash mientras se escribe el temporal
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=full_directory, prefix='.upload-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(self.chunk_size):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+
+            hexdigest = digest.hexdigest()
+            final_name = posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+            final_path = self.path(final_name)
+
+            if os.path.exists(final_path):
+                # Archivo idéntico ya almacenado: se descarta el duplicado y se
+                # refresca su mtime para que el recolector de huérfanos no lo borre
+                # justo cuando vuelve a estar referenciado.
+                os.unlink(temp_path)
+                os.utime(final_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode if self.file_permissions_mode is not None else 0o644)
+                os.replace(temp_path, final_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        return final_name
+
+    def is_immutable(self, name):
+        return is_content_addressed(name)
+
+
+def profile_picture_storage():
+    """Storage usado por CustomUser.profile_picture (resuelto en tiempo de ejecución para respetar MEDIA_ROOT)."""
+    return ContentAddressedStorage()
@@ -1,3 +1,1052 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from http.server import ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from chaoscompany import db_router
+from chaoscompany.db_router import PIN_COOKIE_NAME, replica_reads
+from .avatars import (
+    DEFAULT_AVATAR, SPRITE_CELL_SIZE, SPRITE_NAME, SYSTEM_AVATARS, THUMBNAIL_DIR, THUMBNAIL_SIZE, avatar_url, is_valid_avatar,
+)
+from .entitlements import InvalidToken, Verifier
+from .gateways import DEFAULT_GATEWAY_OPTIONS, ChargeResult, GatewayUnavailable, HttpGateway, PaymentDeclined, SimulatedGateway
+from .management.commands.fake_gateway import FakeGatewayHandler
+from .models import CustomUser, PaymentOrder, PaymentWebhookEvent, UserStats
+from .receipts import receipt_path
+from .storage import ContentAddressedStorage, is_content_addressed
+from .uploadhandlers import INVALID_FORMAT_MESSAGE, TOO_LARGE_MESSAGE
+from .webhooks import SIGNATURE_HEADER, apply_pending_events, sign_payload
+
+# =========================================================================
+# FOTOS DE PERFIL POR HASH DE CONTENIDO (accounts/storage.py)
+# =========================================================================
+
+class MediaRootTestCase(TestCase):
+    """Cada test con su propio MEDIA_ROOT temporal."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write_file(self, name, content=b'x', age_hours=0):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as media_file:
+            media_file.write(content)
+        if age_hours:
+            past = time.time() - age_hours * 3600
+            os.utime(path, (past, past))
+        return path
+
+
+class ContentAddressedStorageTests(MediaRootTestCase):
+
+    def test_files_are_named_by_hash_and_deduplicated(self):
+        storage = ContentAddressedStorage()
+        digest = hashlib.sha256(b'imagen').hexdigest()
+
+        name = storage.save('profile_pictures/Foto.PNG', ContentFile(b'imagen'))
+        self.assertEqual(name, f'profile_pictures/{digest[:2]}/{digest}.png')
+        self.assertTrue(is_content_addressed(name))
+        self.assertTrue(storage.is_immutable(name))
+        with storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'imagen')
+
+        # La misma imagen otra vez: mismo nombre, un solo archivo y mtime refrescado
+        path = storage.path(name)
+        os.utime(path, (0, 0))
+        self.assertEqual(storage.save('profile_pictures/otra.png', ContentFile(b'imagen')), name)
+        self.assertGreater(os.stat(path).st_mtime, time.time() - 60)
+        self.assertEqual(os.listdir(os.path.dirname(path)), [os.path.basename(path)])
+
+        self.assertNotEqual(storage.save('profile_pictures/otra.png', ContentFile(b'distinta')), name)
+        self.assertFalse(is_content_addressed('profile_pictures/foto.png'))
+
+
+# =========================================================================
+# LIMPIEZA DE MEDIA HUÉRFANA (manage.py purge_orphaned_media)
+# =========================================================================
+
+class PurgeOrphanedMediaTests(MediaRootTestCase):
+
+    def purge(self, **options):
+        output = StringIO()
+        call_command('purge_orphaned_media', stdout=output, **options)
+        return output.getvalue()
+
+    def test_only_old_unreferenced_files_are_deleted(self):
+        referenced = self.write_file('profile_pictures/ab/referenciada.png', age_hours=48)
+        orphan = self.write_file('profile_pictures/ab/huerfana.png', age_hours=48)
+        recent = self.write_file('profile_pictures/ab/reciente.png')
+        stale_upload = self.write_file('profile_pictures/ab/.upload-abc.tmp', age_hours=48)
+        CustomUser.objects.create(
+            username='con_foto', email='f@example.com', profile_picture='profile_pictures/ab/referenciada.png',
+        )
+
+        output = self.purge(dry_run=True)
+        self.assertIn('[dry-run] profile_pictures/ab/huerfana.png', output)
+        self.assertTrue(os.path.exists(orphan))
+
+        self.purge()
+        self.assertTrue(os.path.exists(referenced))
+        self.assertTrue(os.path.exists(recent))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertFalse(os.path.exists(stale_upload))
+        # Terminado el recorrido no queda checkpoint
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, '.purge_orphaned_media.json')))
+
+    def test_resumes_after_checkpointed_directory(self):
+        done = self.write_file('a/huerfana.png', age_hours=48)
+        pending = self.write_file('b/huerfana.png', age_hours=48)
+        checkpoint = os.path.join(self.media_root, '.purge_orphaned_media.json')
+        with open(checkpoint, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump({'last_directory': 'a', 'scanned': 5, 'deleted': 1, 'freed_bytes': 0}, checkpoint_file)
+
+        output = self.purge()
+        self.assertIn('Reanudando después de "a"', output)
+        self.assertIn('Borrados 2 de 6 archivos', output)
+        self.assertTrue(os.path.exists(done))
+        self.assertFalse(os.path.exists(pending))
+
+        # --reset ignora el checkpoint y vuelve a recorrer todo
+        with open(checkpoint, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump({'last_directory': 'b'}, checkpoint_file)
+        self.purge(reset=True)
+        self.assertFalse(os.path.exists(done))
+
+
+# =========================================================================
+# ENTREGA DE MEDIA (accounts.views.serve_media)
+# =========================================================================
+
+class ServeMediaTests(MediaRootTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 4
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.name = f'profile_pictures/{digest[:2]}/{digest}.png'
+        self.path = self.write_file(self.name, self.content)
+        self.url = reverse('media', args=[self.name])
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def test_full_file_with_immutable_cache_and_etag(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertNotIn('Content-Disposition', response)
+
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(if_none_match=f'"otro", W/{response["ETag"]}').status_code, 304)
+        self.assertEqual(self.get(if_none_match='"otro"').status_code, 200)
+
+    def test_single_range(self):
+        response = self.get(range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        # Sufijo: los últimos N bytes
+        response = self.get(range='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+        # If-Range con otro ETag: archivo completo
+        self.assertEqual(self.get(range='bytes=10-19', if_range='"otro"').status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.get(range=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_hidden_and_private_paths_are_not_served(self):
+        self.write_file('.purge_orphaned_media.json', b'{}')
+        self.write_file('privado/nota.txt')
+        for path in ('.purge_orphaned_media.json', 'privado/nota.txt', 'profile_pictures/../privado/nota.txt'):
+            with self.assertLogs('django.request', 'WARNING'):
+                self.assertEqual(self.client.get(reverse('media', args=[path])).status_code, 404, path)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_nginx_accel_redirect(self):
+        response = self.get(range='bytes=0-9')
+        # nginx resuelve el rango: la aplicación no envía cuerpo
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.name)
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='apache')
+    def test_apache_x_sendfile(self):
+        response = self.get()
+        self.assertEqual(response['X-Sendfile'], self.path)
+        self.assertNotIn('X-Accel-Redirect', response)
+
+
+# =========================================================================
+# AVATARES DEL SISTEMA (accounts/avatars.py)
+# =========================================================================
+
+class SystemAvatarTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='avatarero', email='av@example.com')
+        self.client.force_login(self.user)
+
+    def post_avatar(self, avatar):
+        return self.client.post(reverse('edit_profile'), {
+            'username': 'avatarero', 'email': 'av@example.com', 'membership_type': 'free', 'selected_avatar': avatar,
+        })
+
+    def test_registry(self):
+        self.assertTrue(is_valid_avatar('Panda.jpg'))
+        self.assertFalse(is_valid_avatar('../settings.py'))
+        self.assertEqual([avatar.sprite_position for avatar in (SYSTEM_AVATARS[0], SYSTEM_AVATARS[-1])], [0, 100])
+        self.assertEqual(avatar_url('no-existe.jpg'), avatar_url(DEFAULT_AVATAR))
+        self.assertTrue(avatar_url('Panda.jpg').endswith('assets/avatars/Panda.jpg'))
+
+    def test_only_valid_avatars_are_accepted(self):
+        self.assertRedirects(self.post_avatar('Panda.jpg'), reverse('profile'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.get_system_avatar(), 'Panda.jpg')
+
+        with self.assertLogs('accounts', 'WARNING'):
+            response = self.post_avatar('../../etc/passwd')
+        self.assertEqual(response.context['form'].errors['selected_avatar'], ['El avatar seleccionado no es válido.'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.selected_avatar, 'Panda.jpg')
+
+    def test_only_current_avatar_is_marked_selected(self):
+        self.user.selected_avatar = 'Panda.jpg'
+        self.user.save()
+        response = self.client.get(reverse('edit_profile'))
+        self.assertContains(response, 'class="avatar-option selected"', count=1)
+        self.assertContains(response, 'class="avatar-option selected" data-avatar="Panda.jpg"')
+        self.assertContains(response, 'id="selected-avatar" value="Panda.jpg"')
+
+    def test_build_avatar_sprite(self):
+        from PIL import Image
+        with tempfile.TemporaryDirectory() as static_dir, override_settings(STATICFILES_DIRS=[static_dir]):
+            os.makedirs(os.path.join(static_dir, 'assets'))
+            for index, avatar in enumerate(SYSTEM_AVATARS):
+                # Originales de distinto tamaño y no cuadrados
+                Image.new('RGB', (300 + index * 10, 200), (index * 30, 0, 0)).save(os.path.join(static_dir, 'assets', avatar.file))
+            call_command('build_avatar_sprite', stdout=StringIO())
+
+            with Image.open(os.path.join(static_dir, *SPRITE_NAME.split('/'))) as sprite:
+                self.assertEqual(sprite.size, (SPRITE_CELL_SIZE * len(SYSTEM_AVATARS), SPRITE_CELL_SIZE))
+            for avatar in SYSTEM_AVATARS:
+                with Image.open(os.path.join(static_dir, *THUMBNAIL_DIR.split('/'), avatar.file)) as thumbnail:
+                    self.assertEqual(thumbnail.size, (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+
+
+# =========================================================================
+# ROUTER DE RÉPLICAS DE LECTURA (chaoscompany/db_router.py)
+# =========================================================================
+# Necesitan dos bases independientes: python manage.py test --settings=chaoscompany.settings_test
+
+@skipUnless('replica1' in getattr(settings, 'REPLICA_DATABASES', []), 'Requiere chaoscompany.settings_test')
+class ReplicaRouterTests(TransactionTestCase):
+    # TransactionTestCase: dentro del atomic() de TestCase el router siempre elige el primario
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        db_router._lag_cache.clear()
+        # Solo existe en la réplica: si se encuentra, la lectura salió de replica1
+        CustomUser.objects.using('replica1').create(username='solo_replica', email='r@example.com')
+
+    def test_reads_outside_marked_code_use_primary(self):
+        self.assertFalse(CustomUser.objects.filter(username='solo_replica').exists())
+
+    def test_marked_reads_use_replica(self):
+        with replica_reads():
+            self.assertTrue(CustomUser.objects.filter(username='solo_replica').exists())
+
+    def test_write_pins_rest_of_block_to_primary(self):
+        with replica_reads():
+            CustomUser.objects.create(username='nuevo', email='n@example.com')
+            self.assertFalse(CustomUser.objects.filter(username='solo_replica').exists())
+            self.assertTrue(CustomUser.objects.filter(username='nuevo').exists())
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(db_router, 'measure_replica_lag', return_value=settings.REPLICA_MAX_LAG + 10):
+            with replica_reads():
+                self.assertFalse(CustomUser.objects.filter(username='solo_replica').exists())
+
+    def test_stopped_replication_falls_back_to_primary(self):
+        with mock.patch.object(db_router, 'measure_replica_lag', return_value=None):
+            with replica_reads():
+                self.assertFalse(CustomUser.objects.filter(username='solo_replica').exists())
+
+    def test_lag_is_cached_between_reads(self):
+        with mock.patch.object(db_router, 'measure_replica_lag', return_value=0) as measure:
+            with replica_reads():
+                for _ in range(3):
+                    CustomUser.objects.filter(username='solo_replica').exists()
+        self.assertEqual(measure.call_count, 1)
+
+    def test_payment_is_readable_right_after_checkout(self):
+        user = CustomUser.objects.create(username='comprador', email='c@example.com')
+        self.client.force_login(user)
+
+        response = self.client.post(reverse('process_payment'), {
+            'plan_type': 'standard',
+            'amount': '11.59',
+            'card_number': '4111111111111111',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        order = PaymentOrder.objects.get(user=user)
+
+        # Con la cookie de fijado la orden se lee del primario aunque la réplica no la tenga
+        response = self.client.get(reverse('payment_success', args=[order.id]))
+        self.assertEqual(response.status_code, 200)
+
+        # Pasada la ventana, la vista lee de la réplica (que aquí nunca recibe la orden)
+        self.client.cookies.pop(PIN_COOKIE_NAME)
+        response = self.client.get(reverse('payment_success', args=[order.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+# =========================================================================
+# PASARELA DE PAGO (accounts/gateways.py) CONTRA fake_gateway
+# =========================================================================
+
+class HttpGatewayTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGatewayHandler)
+        self.server.daemon_threads = True
+        self.server.latency = self.server.jitter = 0
+        self.server.error_rate = self.server.decline_rate = self.server.hang_rate = 0
+        self.server.hang_seconds = 1.0
+        self.server.verbose = False
+        self.server.charges = {}
+        self.server.lock = threading.Lock()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def gateway(self, **options):
+        url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        return HttpGateway({**DEFAULT_GATEWAY_OPTIONS, 'URL': url, **options})
+
+    def charge(self, gateway, key=None):
+        return gateway.charge('9.99', 'standard', 'c@example.com', '1111', idempotency_key=key)
+
+    def test_charges_reuse_keep_alive_connection_and_are_idempotent(self):
+        gateway = self.gateway()
+        first = self.charge(gateway, key='pedido-1')
+        self.assertEqual(self.charge(gateway, key='pedido-1'), first)
+        self.assertEqual(len(gateway._idle), 1)
+        self.assertEqual(len(self.server.charges), 1)
+
+    def test_decline_does_not_open_circuit(self):
+        self.server.decline_rate = 1
+        gateway = self.gateway(FAILURE_THRESHOLD=1)
+        with self.assertRaises(PaymentDeclined):
+            self.charge(gateway)
+        self.assertEqual(gateway.breaker.state, 'closed')
+
+    def test_timeouts_open_circuit_and_fail_fast(self):
+        self.server.hang_rate = 1
+        gateway = self.gateway(READ_TIMEOUT=0.1, FAILURE_THRESHOLD=2, RESET_TIMEOUT=60)
+        for _ in range(2):
+            with self.assertRaises(GatewayUnavailable):
+                self.charge(gateway)
+        self.assertEqual(gateway.breaker.state, 'open')
+
+        # Con el circuito abierto no se llega a abrir conexión con la pasarela
+        with mock.patch.object(gateway, '_post') as post, self.assertRaises(GatewayUnavailable):
+            self.charge(gateway)
+        post.assert_not_called()
+
+    def test_bulkhead_rejects_when_all_slots_are_busy(self):
+        gateway = self.gateway(MAX_CONCURRENT=1, BULKHEAD_TIMEOUT=0.01)
+        with gateway.bulkhead, self.assertRaises(GatewayUnavailable):
+            self.charge(gateway)
+
+
+class CheckoutTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='pagador', email='p@example.com')
+        self.client.force_login(self.user)
+
+    def pay(self):
+        return self.client.post(reverse('process_payment'), {
+            'plan_type': 'standard', 'amount': '11.59', 'card_number': '4111111111111111',
+        })
+
+    def test_order_is_charged_with_its_stored_idempotency_key(self):
+        with mock.patch.object(SimulatedGateway, 'charge', autospec=True,
+                               return_value=ChargeResult('TX-1', 'completed')) as charge:
+            self.pay()
+        order = PaymentOrder.objects.get(user=self.user)
+        self.assertEqual((order.status, order.transaction_id), ('completed', 'TX-1'))
+        self.assertEqual(charge.call_args.kwargs['idempotency_key'], order.idempotency_key)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.membership_type, self.user.is_active_member), ('standard', True))
+        self.assertEqual(UserStats.objects.get(pk=self.user.pk).completed_orders, 1)
+
+    def test_pending_charge_does_not_activate_membership(self):
+        with mock.patch.object(SimulatedGateway, 'charge', return_value=ChargeResult('TX-2', 'pending')):
+            response = self.pay()
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+        self.assertEqual(PaymentOrder.objects.get(user=self.user).status, 'pending')
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.membership_type, self.user.is_active_member), ('free', False))
+        self.assertFalse(UserStats.objects.filter(pk=self.user.pk).exists())
+
+    def test_declined_charge_fails_the_order(self):
+        with mock.patch.object(SimulatedGateway, 'charge', side_effect=PaymentDeclined('Sin fondos')), \
+                self.assertLogs('accounts', 'WARNING'):
+            response = self.pay()
+        self.assertRedirects(response, reverse('payment_page'), fetch_redirect_response=False)
+        self.assertEqual(PaymentOrder.objects.get(user=self.user).status, 'failed')
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active_member)
+
+    def test_unavailable_gateway_leaves_order_pending_for_retry(self):
+        with mock.patch.object(SimulatedGateway, 'charge', side_effect=GatewayUnavailable('Sin respuesta')), \
+                self.assertLogs('accounts', 'WARNING'):
+            self.pay()
+        order = PaymentOrder.objects.get(user=self.user)
+        self.assertEqual(order.status, 'pending')
+        self.assertIsNotNone(order.idempotency_key)
+
+
+# =========================================================================
+# WEBHOOKS DE ESTADO DE PAGOS (accounts/webhooks.py)
+# =========================================================================
+
+@override_settings(PAYMENT_WEBHOOK_SECRET='whsec-test')
+class PaymentWebhookTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='suscriptor', email='s@example.com')
+        self.client.force_login(self.user)
+        self.client.post(reverse('process_payment'), {
+            'plan_type': 'ultimate', 'amount': '19.99', 'card_number': '4111111111111111',
+        })
+        self.client.logout()
+        self.order = PaymentOrder.objects.get(user=self.user)
+
+    def send(self, events, secret='whsec-test'):
+        body = json.dumps({'events': events}).encode()
+        return self.client.post(
+            reverse('payment_webhook'), body, content_type='application/json',
+            headers={SIGNATURE_HEADER: sign_payload(body, secret)},
+        )
+
+    def event(self, event_id, status, offset=0):
+        return {'id': event_id, 'transaction_id': self.order.transaction_id,
+                'status': status, 'created': time.time() + offset}
+
+    def test_bad_signature_is_rejected(self):
+        response = self.send([self.event('evt_1', 'refunded')], secret='otro')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentWebhookEvent.objects.exists())
+
+    def test_replayed_events_are_stored_once(self):
+        events = [self.event('evt_1', 'refunded'), self.event('evt_2', 'cancelled')]
+        self.assertEqual(self.send(events).status_code, 202)
+        self.assertEqual(self.send(events).status_code, 202)
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 2)
+        # Recibir no toca la orden: eso lo hace el worker
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'completed')
+
+    def test_worker_applies_events_in_order_and_revokes_membership(self):
+        # El reembolso llega después de un "completed" repetido y antes que un cancelado tardío
+        self.send([
+            self.event('evt_3', 'cancelled', offset=2),
+            self.event('evt_2', 'refunded', offset=1),
+            self.event('evt_1', 'completed'),
+            {**self.event('evt_4', 'failed'), 'transaction_id': 'NO-EXISTE'},
+        ])
+        call_command('process_payment_webhooks', once=True, stdout=StringIO())
+
+        self.order.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(self.order.status, 'refunded')
+        self.assertEqual((self.user.membership_type, self.user.is_active_member), ('free', False))
+        stats = UserStats.objects.get(pk=self.user.pk)
+        self.assertEqual((stats.completed_orders, stats.lifetime_spend), (0, Decimal('0')))
+        self.assertEqual((stats.refunded_orders, stats.refunded_amount), (1, Decimal('19.99')))
+        outcomes = dict(PaymentWebhookEvent.objects.values_list('event_id', 'outcome'))
+        self.assertEqual(outcomes, {
+            'evt_1': 'ignored', 'evt_2': 'applied', 'evt_3': 'ignored', 'evt_4': '',
+        })
+
+    def test_events_for_unknown_orders_are_retried_until_the_deadline(self):
+        self.send([
+            {**self.event('evt_1', 'completed'), 'transaction_id': 'TARDIA'},
+            {**self.event('evt_2', 'completed'), 'transaction_id': 'NO-EXISTE'},
+        ])
+        call_command('process_payment_webhooks', once=True, stdout=StringIO())
+        self.assertFalse(PaymentWebhookEvent.objects.filter(processed_at__isnull=False).exists())
+
+        # La orden aparece (process_payment terminó de cobrar) y vence el plazo del otro evento
+        PaymentOrder.objects.create(
+            user=self.user, plan_type='standard', amount='11.59', status='pending',
+            transaction_id='TARDIA', payment_method='credit_card', customer_email='s@example.com',
+        )
+        PaymentWebhookEvent.objects.update(retry_after=timezone.now())
+        PaymentWebhookEvent.objects.filter(event_id='evt_2').update(received_at=timezone.now() - timedelta(hours=2))
+        call_command('process_payment_webhooks', once=True, stdout=StringIO())
+
+        outcomes = dict(PaymentWebhookEvent.objects.values_list('event_id', 'outcome'))
+        self.assertEqual(outcomes, {'evt_1': 'applied', 'evt_2': 'unknown_order'})
+        self.assertEqual(PaymentOrder.objects.get(transaction_id='TARDIA').status, 'completed')
+
+    def test_refund_keeps_membership_granted_by_hand(self):
+        granted_until = timezone.now() + timedelta(days=365)
+        CustomUser.objects.filter(pk=self.user.pk).update(membership_type='ultimate', membership_expiry=granted_until)
+        self.send([self.event('evt_1', 'refunded')])
+        call_command('process_payment_webhooks', once=True, stdout=StringIO())
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.membership_expiry, granted_until)
+        self.assertEqual((self.user.membership_type, self.user.is_active_member), ('ultimate', True))
+
+
+# =========================================================================
+# RENOVACIÓN DE MEMBRESÍAS (accounts/renewals.py)
+# =========================================================================
+
+class RenewSubscriptionsTests(TestCase):
+
+    def setUp(self):
+        self.expiry = timezone.now() + timedelta(hours=2)
+        self.user = CustomUser.objects.create(
+            username='renovable', email='r@example.com', membership_type='standard',
+            is_active_member=True, membership_expiry=self.expiry,
+        )
+        PaymentOrder.objects.create(
+            user=self.user, plan_type='standard', amount='11.59', status='completed',
+            transaction_id='ORIGINAL', payment_method='credit_card', customer_email='r@example.com',
+        )
+
+    def renew(self):
+        call_command('renew_subscriptions', stdout=StringIO(), stderr=StringIO())
+        self.user.refresh_from_db()
+
+    def test_renewal_creates_order_and_extends_from_previous_expiry(self):
+        self.renew()
+        self.assertEqual(self.user.membership_expiry, self.expiry + timedelta(days=30))
+        renewal = PaymentOrder.objects.exclude(transaction_id='ORIGINAL').get()
+        self.assertEqual((renewal.subscription_start, renewal.amount), (self.expiry, Decimal('11.59')))
+
+        # Relanzar no vuelve a cobrar: ya no vence dentro de la ventana
+        self.renew()
+        self.assertEqual(PaymentOrder.objects.count(), 2)
+
+    def test_declined_renewal_is_not_retried(self):
+        declined = mock.patch.object(SimulatedGateway, 'charge', side_effect=PaymentDeclined('Sin fondos'))
+        with declined as charge:
+            self.renew()
+            self.renew()
+        charge.assert_called_once()
+        self.assertEqual(self.user.membership_expiry, self.expiry)
+        self.assertEqual(PaymentOrder.objects.count(), 1)
+
+    def test_pending_charge_records_order_without_extending_membership(self):
+        with mock.patch.object(SimulatedGateway, 'charge', return_value=ChargeResult('EN-CURSO', 'pending')) as charge:
+            self.renew()
+            self.renew()
+        charge.assert_called_once()
+        self.assertEqual(self.user.membership_expiry, self.expiry)
+        self.assertEqual(self.user.membership_renewal_attempt, self.expiry)
+        self.assertEqual(PaymentOrder.objects.get(transaction_id='EN-CURSO').status, 'pending')
+        self.assertEqual(UserStats.objects.get(pk=self.user.pk).completed_orders, 1)
+
+        # El webhook que confirma el cobro alarga la membresía con las fechas de la renovación
+        PaymentWebhookEvent.objects.create(
+            event_id='evt_renovacion', transaction_id='EN-CURSO', status='completed', occurred_at=timezone.now(),
+        )
+        apply_pending_events()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.membership_expiry, self.expiry + timedelta(days=30))
+
+    def test_charge_runs_after_the_claim_commits_and_outside_transactions(self):
+        depth = len(connection.atomic_blocks)
+
+        def charge(*args, **kwargs):
+            # Reserva ya confirmada y ninguna transacción abierta mientras responde la pasarela
+            self.assertEqual(len(connection.atomic_blocks), depth)
+            self.assertTrue(CustomUser.objects.filter(
+                pk=self.user.pk, membership_renewal_claimed_at__isnull=False,
+            ).exists())
+            return ChargeResult('RENOVADA', 'completed')
+
+        with mock.patch.object(SimulatedGateway, 'charge', side_effect=charge):
+            self.renew()
+        self.assertEqual(self.user.membership_expiry, self.expiry + timedelta(days=30))
+        self.assertIsNone(self.user.membership_renewal_claimed_at)
+
+    def test_unavailable_gateway_releases_the_claim(self):
+        unavailable = mock.patch.object(SimulatedGateway, 'charge', side_effect=GatewayUnavailable('Caída'))
+        with unavailable, self.assertLogs('accounts.renewals', 'WARNING'):
+            self.renew()
+        self.assertIsNone(self.user.membership_renewal_claimed_at)
+        self.assertIsNone(self.user.membership_renewal_attempt)
+        self.renew()
+        self.assertEqual(self.user.membership_expiry, self.expiry + timedelta(days=30))
+
+
+class RenewSubscriptionsWorkersTests(TransactionTestCase):
+
+    def test_spawned_workers_renew_memberships(self):
+        expiry = timezone.now() + timedelta(hours=2)
+        for i in range(2):
+            user = CustomUser.objects.create(
+                username=f'renovable{i}', email=f'r{i}@example.com', membership_type='standard',
+                is_active_member=True, membership_expiry=expiry,
+            )
+            PaymentOrder.objects.create(
+                user=user, plan_type='standard', amount='11.59', status='completed',
+                transaction_id=f'ORIGINAL-{i}', payment_method='credit_card', customer_email=user.email,
+            )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # Los hijos no ven la base de tests en memoria: trabajan sobre una copia en archivo
+            path = os.path.join(tmp, 'renovaciones.sqlite3')
+            connection.ensure_connection()
+            with closing(sqlite3.connect(path)) as copy:
+                connection.connection.backup(copy)
+            # IMMEDIATE: dos procesos escribiendo en SQLite esperan al otro en lugar de fallar
+            options = {'transaction_mode': 'IMMEDIATE', 'timeout': 30}
+            databases = {alias: {**connections[alias].settings_dict, 'NAME': path, 'OPTIONS': options}
+                         for alias in connections}
+
+            out = StringIO()
+            with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True), \
+                    mock.patch('accounts.management.commands.renew_subscriptions.worker_databases',
+                               return_value=databases):
+                call_command('renew_subscriptions', workers=2, stdout=out, stderr=StringIO())
+
+            self.assertIn('con 2 workers (renewed: 2)', out.getvalue())
+            with closing(sqlite3.connect(path)) as copy:
+                self.assertEqual(copy.execute('SELECT COUNT(*) FROM accounts_paymentorder').fetchone(), (4,))
+
+
+# =========================================================================
+# RECIBOS GUARDADOS (accounts/receipts.py)
+# =========================================================================
+
+class ReceiptTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='cliente', email='cliente@example.com')
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('process_payment'), {
+                'plan_type': 'standard', 'amount': '11.59', 'card_number': '4111111111111111',
+            })
+        self.success_url = response['Location']
+        self.order = PaymentOrder.objects.get(user=self.user)
+
+    def test_payment_success_serves_stored_receipt_with_etag(self):
+        response = self.client.get(self.success_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.order.transaction_id.encode(), b''.join(response.streaming_content))
+
+        # Cambiar la orden no altera el recibo ya emitido, y la revalidación responde 304
+        PaymentOrder.objects.filter(pk=self.order.pk).update(customer_email='otro@example.com')
+        response = self.client.get(self.success_url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_payment_success_only_serves_completed_orders(self):
+        pending = PaymentOrder.objects.create(
+            user=self.user, plan_type='standard', amount='11.59', status='pending',
+            transaction_id='PENDIENTE', payment_method='credit_card', customer_email='cliente@example.com',
+        )
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(reverse('payment_success', args=[pending.id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(os.path.exists(receipt_path(self.user.pk, 'PENDIENTE', 'html')))
+
+    def test_refund_withdraws_the_stored_receipt(self):
+        etag = self.client.get(self.success_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.status = 'refunded'
+            self.order.save()
+
+        pdf_url = reverse('receipt', args=[self.order.transaction_id, 'pdf'])
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.get(pdf_url).status_code, 404)
+            response = self.client.get(self.success_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 404)
+
+    def test_pdf_download_is_owner_only(self):
+        url = reverse('receipt', args=[self.order.transaction_id, 'pdf'])
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF-'))
+
+        self.client.force_login(CustomUser.objects.create(username='ajeno', email='a@example.com'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+# =========================================================================
+# IMPORTACIÓN MASIVA DE USUARIOS (manage.py import_users)
+# =========================================================================
+
+class ImportUsersTests(TestCase):
+
+    def import_csv(self, content, workers=1):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'usuarios.csv')
+            with open(path, 'w', encoding='utf-8') as csv_file:
+                csv_file.write(content)
+            call_command('import_users', path, workers=workers, batch_size=2, stdout=StringIO())
+            if not os.path.exists(path + '.rejects.jsonl'):
+                return []
+            with open(path + '.rejects.jsonl', encoding='utf-8') as rejects:
+                return [json.loads(line) for line in rejects]
+
+    def test_imports_valid_rows_and_rejects_the_rest(self):
+        CustomUser.objects.create(username='Existente', email='existente@example.com')
+        rejects = self.import_csv(
+            'username,email,membership_type,password,password_hash\n'
+            'ana,Ana@Example.com,standard,secreto123,\n'
+            'bruno,bruno@example.com,ultimate,,md5$sal$0123456789abcdef0123456789abcdef\n'
+            'existente,nuevo@example.com,free,x,\n'
+            'otra,ANA@example.com,free,x,\n'
+            'carla,carla@example.com,gold,x,\n'
+            'dani,dani@example.com,free,,no-es-un-hash\n'
+        )
+        self.assertTrue(CustomUser.objects.get(username='ana').check_password('secreto123'))
+        self.assertEqual(CustomUser.objects.get(username='ana').email, 'ana@example.com')
+        self.assertEqual(CustomUser.objects.get(username='bruno').password, 'md5$sal$0123456789abcdef0123456789abcdef')
+        self.assertEqual(CustomUser.objects.count(), 3)
+        self.assertEqual([reject['line'] for reject in rejects], [4, 5, 6, 7])
+        # Las contraseñas nunca se copian al archivo de rechazos
+        self.assertNotIn('password', rejects[0]['row'])
+
+    def test_passwords_are_hashed_in_spawned_workers(self):
+        rejects = self.import_csv(
+            'username,email,password\n'
+            'eva,eva@example.com,clave-eva\n'
+            'fran,fran@example.com,clave-fran\n',
+            workers=2,
+        )
+        self.assertEqual(rejects, [])
+        self.assertTrue(CustomUser.objects.get(username='eva').check_password('clave-eva'))
+        self.assertTrue(CustomUser.objects.get(username='fran').check_password('clave-fran'))
+
+
+# =========================================================================
+# BAJA DE CUENTAS POR LOTES (accounts/deletion.py)
+# =========================================================================
+
+class AccountDeletionTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='saliente', email='s@example.com', is_active_member=True)
+        PaymentOrder.objects.bulk_create([
+            PaymentOrder(user=self.user, plan_type='standard', amount=Decimal('11.59'), payment_method='credit_card',
+                         transaction_id=f'baja-{i}', customer_email='s@example.com')
+            for i in range(5)
+        ])
+        admin = CustomUser.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+
+    def test_admin_delete_only_deactivates_and_command_purges_in_batches(self):
+        self.client.post(reverse('admin:accounts_customuser_delete', args=[self.user.pk]), {'post': 'yes'})
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(self.user.is_active_member)
+        self.assertIsNotNone(self.user.deletion_requested_at)
+        self.assertEqual(PaymentOrder.objects.count(), 5)
+
+        call_command('purge_deleted_accounts', batch_size=2, stdout=StringIO())
+        self.assertFalse(CustomUser.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(PaymentOrder.objects.count(), 0)
+
+    def test_admin_messages_do_not_claim_the_account_was_deleted(self):
+        response = self.client.post(reverse('admin:accounts_customuser_delete', args=[self.user.pk]),
+                                    {'post': 'yes'}, follow=True)
+        shown = [str(m) for m in response.context['messages']]
+        self.assertEqual(shown, ['1 cuentas desactivadas; sus datos se borrarán en segundo plano.'])
+
+        other = CustomUser.objects.create(username='otra', email='o@example.com')
+        changelist = reverse('admin:accounts_customuser_changelist')
+        response = self.client.post(changelist, {'action': 'delete_selected', '_selected_action': [other.pk]})
+        self.assertContains(response, '<input type="hidden" name="post" value="yes">', html=True)
+        response = self.client.post(changelist, {'action': 'delete_selected', '_selected_action': [other.pk],
+                                                 'post': 'yes'}, follow=True)
+        shown = [str(m) for m in response.context['messages']]
+        self.assertEqual(shown, ['1 cuentas desactivadas; sus datos se borrarán en segundo plano.'])
+        self.assertTrue(CustomUser.objects.filter(pk=other.pk, is_active=False).exists())
+
+    def test_cancelled_deletion_is_not_purged(self):
+        self.user.membership_expiry = timezone.now() + timedelta(days=10)
+        self.user.save()
+        self.client.post(reverse('admin:accounts_customuser_delete', args=[self.user.pk]), {'post': 'yes'})
+        self.client.post(reverse('admin:accounts_customuser_changelist'),
+                         {'action': 'cancel_deletion', '_selected_action': [self.user.pk]})
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.deletion_requested_at)
+        self.assertTrue(self.user.is_active)
+        self.assertTrue(self.user.is_active_member)
+
+        call_command('purge_deleted_accounts', stdout=StringIO())
+        self.assertTrue(CustomUser.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(PaymentOrder.objects.count(), 5)
+
+    def test_reactivated_account_is_not_purged(self):
+        # Marcada pero reactivada a mano desde la ficha (is_active) sin cancelar la baja
+        CustomUser.objects.filter(pk=self.user.pk).update(deletion_requested_at=timezone.now(), is_active=True)
+        call_command('purge_deleted_accounts', stdout=StringIO())
+        self.assertTrue(CustomUser.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(PaymentOrder.objects.count(), 5)
+
+
+# =========================================================================
+# ESTADÍSTICAS DE COMPRA (accounts/stats.py)
+# =========================================================================
+
+class UserStatsTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='comprador', email='c@example.com')
+        self.client.force_login(self.user)
+        for amount in ('11.59', '19.99'):
+            self.client.post(reverse('process_payment'), {
+                'plan_type': 'standard', 'amount': amount, 'card_number': '4111111111111111',
+            })
+
+    def test_completed_orders_update_stats_incrementally(self):
+        stats = UserStats.objects.get(pk=self.user.pk)
+        self.assertEqual((stats.completed_orders, stats.lifetime_spend), (2, Decimal('31.58')))
+        self.assertEqual(stats.last_purchase_at, PaymentOrder.objects.latest('paid_at').paid_at)
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['purchase_stats'].completed_orders, 2)
+
+    def test_failed_checkout_rolls_back_order_stats_and_membership_together(self):
+        with mock.patch.object(CustomUser, 'save', side_effect=DatabaseError('Conexión perdida')), \
+                self.assertLogs('accounts', 'ERROR'):
+            self.client.post(reverse('process_payment'), {
+                'plan_type': 'ultimate', 'amount': '19.99', 'card_number': '4111111111111111',
+            })
+
+        # La orden queda pendiente (con su clave para reintentar) y nada más cambió
+        self.assertEqual(PaymentOrder.objects.filter(user=self.user).latest('id').status, 'pending')
+        stats = UserStats.objects.get(pk=self.user.pk)
+        self.assertEqual((stats.completed_orders, stats.lifetime_spend), (2, Decimal('31.58')))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.membership_type, 'standard')
+
+    def test_reconcile_fixes_drifted_rows(self):
+        UserStats.objects.filter(pk=self.user.pk).update(completed_orders=7, lifetime_spend=0)
+        out = StringIO()
+        call_command('reconcile_user_stats', batch_size=1, stdout=out)
+        self.assertIn('1 estadísticas corregidas', out.getvalue())
+        stats = UserStats.objects.get(pk=self.user.pk)
+        self.assertEqual((stats.completed_orders, stats.lifetime_spend), (2, Decimal('31.58')))
+
+
+# =========================================================================
+# DATOS SINTÉTICOS (manage.py generate_synthetic_data)
+# =========================================================================
+
+class SyntheticDataTests(TestCase):
+
+    def test_generated_data_is_consistent_and_deterministic(self):
+        call_command('generate_synthetic_data', users=300, seed=7, batch_size=100, stdout=StringIO())
+        self.assertEqual(CustomUser.objects.count(), 300)
+        self.assertTrue(PaymentOrder.objects.filter(status='completed').exists())
+        # Las estadísticas insertadas coinciden con las que recalcula reconcile_user_stats
+        out = StringIO()
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertIn(' 0 estadísticas corregidas', out.getvalue())
+        self.assertTrue(CustomUser.objects.get(username='synth1').check_password('synthetic'))
+
+        first_run = list(CustomUser.objects.order_by('pk').values_list('membership_type', 'first_name'))
+        CustomUser.objects.all().delete()
+        call_command('generate_synthetic_data', users=300, seed=7, batch_size=100, stdout=StringIO())
+        self.assertEqual(list(CustomUser.objects.order_by('pk').values_list('membership_type', 'first_name')), first_run)
+
+
+# =========================================================================
+# AVISOS DE VENCIMIENTO (manage.py send_membership_reminders)
+# =========================================================================
+
+class MembershipReminderTests(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        for username, plan, days in [('vence1', 'standard', 2), ('vence2', 'ultimate', 6),
+                                     ('lejano', 'standard', 20), ('gratis', 'free', 2)]:
+            CustomUser.objects.create(
+                username=username, email=f'{username}@example.com', membership_type=plan,
+                is_active_member=True, membership_expiry=now + timedelta(days=days),
+            )
+
+    def send(self):
+        out = StringIO()
+        call_command('send_membership_reminders', days=7, batch_size=1, stdout=out)
+        return out.getvalue()
+
+    def test_reminders_are_sent_once_per_expiry(self):
+        self.assertIn('2 avisos enviados', self.send())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['vence1@example.com', 'vence2@example.com'])
+        self.assertIn('/membresias/', mail.outbox[0].body)
+        user = CustomUser.objects.get(username='vence1')
+        self.assertEqual(user.membership_reminder_sent_for, user.membership_expiry)
+
+        # Relanzarlo no vuelve a escribir a nadie
+        self.assertIn('0 membresías vencen', self.send())
+        self.assertEqual(len(mail.outbox), 2)
+
+        # Con un vencimiento nuevo vuelve a ser elegible
+        user.membership_expiry += timedelta(days=1)
+        user.save(update_fields=['membership_expiry'])
+        self.send()
+        self.assertEqual([message.to for message in mail.outbox[2:]], [['vence1@example.com']])
+
+
+# =========================================================================
+# SUBIDA DE LA FOTO DE PERFIL (accounts/uploadhandlers.py)
+# =========================================================================
+
+@mock.patch('accounts.uploadhandlers.PROFILE_PICTURE_MAX_SIZE', 4096)
+class ProfilePictureUploadTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='subidor', email='s@example.com')
+        self.client.force_login(self.user)
+
+    def upload(self, content, name='foto.png', **extra):
+        return self.client.post(reverse('edit_profile'), {
+            'username': 'subidor', 'email': 's@example.com', 'membership_type': 'free',
+            'profile_picture': SimpleUploadedFile(name, content),
+        }, **extra)
+
+    def assertRejected(self, response, message):
+        self.assertRedirects(response, reverse('edit_profile'), fetch_redirect_response=False)
+        self.assertEqual([str(m) for m in self.client.get(reverse('edit_profile')).context['messages']], [message])
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.profile_picture)
+
+    def test_valid_image_is_saved(self):
+        from PIL import Image
+        image = BytesIO()
+        Image.new('RGB', (8, 8), 'red').save(image, 'PNG')
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            response = self.upload(image.getvalue())
+            self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.profile_picture)
+
+    def test_non_image_is_rejected_from_first_chunk(self):
+        self.assertRejected(self.upload(b'<?php echo 1; ?>' * 10), INVALID_FORMAT_MESSAGE)
+
+    def test_oversized_body_is_rejected(self):
+        png = b'\x89PNG\r\n\x1a\n' + b'\0' * 8192
+        # Por Content-Length, antes de leer el cuerpo...
+        self.assertRejected(self.upload(png), TOO_LARGE_MESSAGE)
+        # ...y al cruzar el límite si Content-Length no lo delata
+        with mock.patch('accounts.uploadhandlers.FORM_OVERHEAD', 1 << 20):
+            self.assertRejected(self.upload(png), TOO_LARGE_MESSAGE)
+
+    def test_csrf_is_still_enforced(self):
+        client = self.client_class(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(reverse('edit_profile'), {'username': 'otro', 'email': 's@example.com'})
+        self.assertEqual(response.status_code, 403)
+
+
+# =========================================================================
+# TOKENS DE DERECHOS (accounts/entitlements.py)
+# =========================================================================
+
+ENTITLEMENT_KEYS = {'k1': 'secreto-uno', 'k2': 'secreto-dos'}
+
+
+@override_settings(ENTITLEMENT_KEYS=ENTITLEMENT_KEYS, ENTITLEMENT_ACTIVE_KEY='k1', ENTITLEMENT_TTL=300)
+class EntitlementTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(
+            username='jugador', email='j@example.com', membership_type='ultimate',
+            is_active_member=True, membership_expiry=timezone.now() + timedelta(days=10),
+        )
+        self.client.force_login(self.user)
+
+    def issue(self):
+        response = self.client.get(reverse('entitlement_token'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-store', response['Cache-Control'])
+        return response.json()
+
+    def test_issued_token_verifies_offline(self):
+        data = self.issue()
+        entitlement = Verifier(ENTITLEMENT_KEYS).verify(data['token'])
+        self.assertEqual((entitlement.user_id, entitlement.tier, entitlement.key_id), (self.user.pk, 'ultimate', 'k1'))
+        self.assertEqual(entitlement.expires_at, data['expires_at'])
+        self.assertTrue(Verifier(ENTITLEMENT_KEYS).allows(data['token'], 'standard'))
+        # El token llega al cliente de juego desde game_session
+        response = self.client.get(reverse('game_session'))
+        self.assertContains(response, 'data-entitlement-token="v1.k1.')
+
+    def test_tampered_and_expired_tokens_are_rejected(self):
+        token = self.issue()['token']
+        verifier = Verifier(ENTITLEMENT_KEYS)
+        with self.assertRaisesMessage(InvalidToken, 'Firma'):
+            verifier.verify(token.replace('.ultimate.', '.standard.'))
+        with self.assertRaisesMessage(InvalidToken, 'caducado'):
+            verifier.verify(token, now=time.time() + 400)
+        with self.assertRaisesMessage(InvalidToken, 'mal formado'):
+            verifier.verify('basura')
+
+    def test_key_rotation(self):
+        old_token = self.issue()['token']
+        with override_settings(ENTITLEMENT_ACTIVE_KEY='k2'):
+            new_token = self.issue()['token']
+        self.assertTrue(new_token.startswith('v1.k2.'))
+        # Mientras los verificadores conservan k1, los tokens antiguos siguen valiendo
+        self.assertEqual(Verifier(ENTITLEMENT_KEYS).verify(old_token).key_id, 'k1')
+        retired = Verifier({'k2': ENTITLEMENT_KEYS['k2']})
+        retired.verify(new_token)
+        with self.assertRaisesMessage(InvalidToken, 'Clave desconocida'):
+            retired.verify(old_token)
+
+    def test_free_tier_and_disabled_endpoint(self):
+        self.user.membership_type = 'free'
+        self.user.save()
+        self.assertEqual(self.issue()['tier'], 'free')
+        with override_settings(ENTITLEMENT_KEYS={}):
+            self.assertEqual(self.client.get(reverse('entitlement_token')).status_code, 404)
@@ -0,0 +1,98 @@
+# accounts/uploadhandlers.py
+"""
+Upload handler de la foto de perfil (edit_profile_view).
+
+Con los handlers por defecto, Django recibe la subida completa (en memoria o en un archivo
+temporal) antes de que el formulario compruebe el tamaño y el formato: un cliente puede
+mandar un cuerpo arbitrariamente grande y solo se le rechaza al final. Este handler:
+
+- Mira Content-Length antes de leer nada: si no cabe una imagen de PROFILE_PICTURE_MAX_SIZE
+  más el resto del formulario, devuelve un formulario vacío sin tocar el cuerpo.
+- Cuenta los bytes del archivo según llegan y deja de leer (StopUpload con
+  connection_reset, sin vaciar el resto del cuerpo) en cuanto supera el límite, por si
+  Content-Length no era fiable.
+- Comprueba la firma (magic bytes) en el primer fragmento: lo que no empiece como JPEG,
+  PNG, GIF o WebP se descarta sin leer el resto.
+- Guarda el archivo en memoria: con el límite anterior nunca pasa de 5 MB por petición y
+  no se escribe nada en disco hasta que el formulario lo acepta.
+
+El formulario (CustomUserChangeForm.clean_profile_picture) sigue validando lo mismo: el
+handler solo adelanta el rechazo. Los handlers tienen que cambiarse antes de que se lea
+request.POST, así que la vista está exenta de CSRF y lo comprueba después (ver
+accounts/views.py).
+"""
+import logging
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PICTURE_MAX_SIZE = 5 * 1024 * 1024
+# Margen para el resto de campos del formulario y las cabeceras multipart
+FORM_OVERHEAD = 64 * 1024
+
+TOO_LARGE_MESSAGE = 'La imagen debe ser menor a 5MB.'
+INVALID_FORMAT_MESSAGE = 'Formato de imagen no válido. Use JPG, PNG, GIF o WebP.'
+
+
+def sniff_image(data):
+    """Formato de imagen según los primeros bytes, o None si no es uno de los admitidos."""
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class ProfilePictureUploadHandler(MemoryFileUploadHandler):
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = PROFILE_PICTURE_MAX_SIZE
+        # Motivo del rechazo (mensaje para el usuario) o None
+        self.rejection = None
+
+    def reject(self, message, detail):
+        self.rejection = message
+        logger.warning("🚫 Subida de foto de perfil rechazada (%s): %s", detail, getattr(self.request, 'user', None))
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_size + FORM_OVERHEAD:
+            self.reject(TOO_LARGE_MESSAGE, f'Content-Length {content_length}')
+            # Formulario vacío: el parser no lee el cuerpo
+            return QueryDict(encoding=encoding), MultiValueDict()
+        # Siempre en memoria, sin el umbral FILE_UPLOAD_MAX_MEMORY_SIZE
+        self.activated = True
+        return None
+
+    def new_file(self, *args, **kwargs):
+        self.received = 0
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and sniff_image(raw_data[:12]) is None:
+            self.reject(INVALID_FORMAT_MESSAGE, f'firma {raw_data[:12]!r}')
+            raise StopUpload(connection_reset=True)
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.reject(TOO_LARGE_MESSAGE, f'más de {self.max_size} bytes recibidos')
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def parse_profile_upload(request):
+    """
+    Procesa el cuerpo de `request` con ProfilePictureUploadHandler. Devuelve el mensaje
+    de rechazo, o None si la subida (o la ausencia de ella) es aceptable.
+    """
+    handler = ProfilePictureUploadHandler(request)
+    request.upload_handlers = [handler]
+    # La lectura perezosa del cuerpo ocurre aquí, ya con el handler
+    request.POST
+    return handler.rejection
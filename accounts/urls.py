@@ -1,23 +1,30 @@
 # accounts/urls.py
 from django.urls import path
-from . import views
+from django.conf import settings
+from . import async_views, views
+
+# En modo ASGI (settings.ASYNC_VIEWS) perfil, carrito y pago usan su versión asíncrona
+hot_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('signup/', views.signup_view, name='signup'),
     path('logout/', views.logout_view, name='logout'),
-    path('profile/', views.profile_view, name='profile'),
+    path('profile/', hot_views.profile_view, name='profile'),
     path('profile/edit/', views.edit_profile_view, name='edit_profile'), 
     path('forgot-password/', views.forgot_password_view, name='forgot_password'),
     path('reset-password/<str:token>/', views.reset_password_view, name='reset_password'),
-    path('cart/', views.cart_view, name='cart'),
-    path('cart/add/', views.add_to_cart, name='add_to_cart'),
-    path('cart/remove/', views.remove_from_cart, name='remove_from_cart'),
+    path('cart/', hot_views.cart_view, name='cart'),
+    path('cart/add/', hot_views.add_to_cart, name='add_to_cart'),
+    path('cart/remove/', hot_views.remove_from_cart, name='remove_from_cart'),
     path('checkout/', views.checkout_view, name='checkout'),
     
     # URLs de pago
-    path('payment/', views.payment_page, name='payment_page'),
-    path('payment/process/', views.process_payment, name='process_payment'),
-    path('payment/success/<int:order_id>/', views.payment_success, name='payment_success'),
+    path('payment/', hot_views.payment_page, name='payment_page'),
+    path('payment/process/', hot_views.process_payment, name='process_payment'),
+    path('payment/success/<int:order_id>/', hot_views.payment_success, name='payment_success'),
     path('payment/cancel/', views.payment_cancel, name='payment_cancel'),
+    path('payment/webhook/', views.payment_webhook, name='payment_webhook'),
+    path('receipts/<str:transaction_id>.<str:fmt>', views.receipt_download, name='receipt'),
+    path('entitlement/', views.entitlement_token, name='entitlement_token'),
 ]
\ No newline at end of file
@@ -1,15 +1,33 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse
 from django.utils import timezone
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST, require_safe
+from .avatars import DEFAULT_AVATAR, SYSTEM_AVATARS, avatar_urls, sprite_url
+from .checkout import charge_order, checkout_not_completed, fail_order, finish_order, start_order
+from .entitlements import issue_for_user
 from .forms import LoginForm, SignupForm, CustomUserChangeForm
+from .gateways import PaymentError
 from .models import CustomUser, PaymentOrder
+from .receipts import RECEIPT_FORMATS, receipt_response
+from .stats import get_user_stats
+from .storage import is_content_addressed
+from .uploadhandlers import parse_profile_upload
+from .webhooks import SIGNATURE_HEADER, InvalidWebhook, parse_events, store_events, verify_signature
+from chaoscompany.db_router import use_replicas
+import mimetypes
+import os
+import posixpath
 import secrets
 import string
-import uuid
 from datetime import timedelta
 import logging
 
@@ -43,7 +61,6 @@ def login_view(request):
     if request.method == 'POST':
         logger.info("📨 POST recibido en login")
         form = LoginForm(request, data=request.POST)
-        logger.debug(f"✅ Form login válido: {form.is_valid()}")
         
         if form.is_valid():
             logger.info("🎯 Login válido - autenticando...")
@@ -101,7 +118,6 @@ def signup_view(request):
     if request.method == 'POST':
         logger.info("📨 POST recibido en signup")
         form = SignupForm(request.POST)
-        logger.debug(f"✅ Form signup válido: {form.is_valid()}")
         
         if form.is_valid():
             logger.info("🎯 Formulario de registro válido - creando usuario...")
@@ -137,6 +153,7 @@ def logout_view(request):
 
 
 @login_required
+@use_replicas
 def profile_view(request):
     logger.info("👤 Vista profile llamada")
     
@@ -148,12 +165,32 @@ def profile_view(request):
         
     return render(request, 'accounts/profile.html', {
         'payment_history': payment_history,
+        # Totales de compra precalculados: una lectura por clave primaria
+        'purchase_stats': get_user_stats(request.user),
         'title': 'Mi Perfil'
     })
 
 
 @login_required
+@csrf_exempt
 def edit_profile_view(request):
+    """
+    La subida de la foto se procesa con ProfilePictureUploadHandler, que rechaza por
+    tamaño o formato sin recibir el archivo entero. Los handlers deben cambiarse antes de
+    que se lea request.POST y CsrfViewMiddleware lo lee antes de la vista, así que esta
+    está exenta y _edit_profile comprueba el CSRF después.
+    """
+    if request.method == 'POST':
+        rejection = parse_profile_upload(request)
+        if rejection:
+            # No se guarda nada, así que basta con avisar; el token CSRF pudo quedar en la parte no leída
+            messages.error(request, rejection)
+            return redirect('edit_profile')
+    return _edit_profile(request)
+
+
+@csrf_protect
+def _edit_profile(request):
     logger.info("✍️ Vista edit_profile llamada")
     user = request.user
     
@@ -162,14 +199,13 @@ def edit_profile_view(request):
         # El formulario debe recibir los datos POST, los archivos y la instancia del usuario
         form = CustomUserChangeForm(request.POST, request.FILES, instance=user)
         # El is_valid ya no fallará por FileNotFoundError gracias al fix en forms.py
-        logger.debug(f"✅ Form editar perfil válido: {form.is_valid()}")
         
         if form.is_valid():
             logger.info("🎯 Form editar perfil válido - guardando...")
             user = form.save(commit=False) # No guardar aún, hay lógica de avatar
             
             # --- Lógica de Avatar ---
-            selected_avatar = request.POST.get('selected_avatar', '')
+            selected_avatar = form.cleaned_data.get('selected_avatar')  # Ya validado contra el registro
             profile_picture_file = request.FILES.get('profile_picture') # Archivo subido (None si no se subió)
 
             # 1. Caso A: Se subió una nueva imagen
@@ -180,7 +216,7 @@ def edit_profile_view(request):
                 
             # 2. Caso B: Se seleccionó un avatar predeterminado
             elif selected_avatar:
-                logger.info(f"🔹 Avatar de sistema seleccionado: {selected_avatar}")
+                logger.info("🔹 Avatar de sistema seleccionado: %s", selected_avatar)
                 user.selected_avatar = selected_avatar
                 user.profile_picture = None  # Limpiar la referencia al archivo subido
 
@@ -198,7 +234,7 @@ def edit_profile_view(request):
             except Exception as e:
                 # Capturar cualquier error inesperado al guardar
                 messages.error(request, f'Error al guardar el perfil: {str(e)}')
-                logger.error(f"❌ Error al guardar en base de datos: {e}")
+                logger.error("❌ Error al guardar en base de datos: %s", e)
         
         else:
             logger.warning("❌ Formulario inválido. Mostrando errores.")
@@ -211,11 +247,16 @@ def edit_profile_view(request):
     
     # Obtener la URL del avatar actual para la vista previa
     current_avatar_url = user.get_profile_picture_url() 
+    urls = avatar_urls()
         
     return render(request, 'accounts/edit_profile.html', {
         'form': form, 
         'title': 'Editar Perfil',
-        'current_avatar_url': current_avatar_url 
+        'current_avatar_url': current_avatar_url,
+        'current_avatar': user.get_system_avatar() or '',
+        'default_avatar_url': urls[DEFAULT_AVATAR],
+        'system_avatars': [(avatar, urls[avatar.file]) for avatar in SYSTEM_AVATARS],
+        'avatar_sprite_url': sprite_url(),
     })
 
 
@@ -254,13 +295,13 @@ def forgot_password_view(request):
             )
             
             messages.success(request, 'Se ha enviado un correo electrónico con instrucciones para restablecer tu contraseña. Revisa tu bandeja de entrada.')
-            logger.info(f"📧 Correo de restablecimiento enviado a {email}")
+            logger.info("📧 Correo de restablecimiento enviado a %s", email)
         
         except CustomUser.DoesNotExist:
             messages.success(request, 'Si la dirección de correo electrónico está registrada, recibirás un enlace de restablecimiento.')
-            logger.warning(f"⚠️ Intento de restablecimiento para email no existente: {email}")
+            logger.warning("⚠️ Intento de restablecimiento para email no existente: %s", email)
         except Exception as e:
-            logger.error(f"💥 Error al enviar correo de restablecimiento: {e}")
+            logger.error("💥 Error al enviar correo de restablecimiento: %s", e)
             messages.error(request, 'Ocurrió un error al procesar tu solicitud. Intenta más tarde.')
         
         return redirect('forgot_password')
@@ -271,7 +312,7 @@ def forgot_password_view(request):
 
 
 def reset_password_view(request, token):
-    logger.info(f"🔑 Vista reset_password llamada con token: {token[:10]}...")
+    logger.info("🔑 Vista reset_password llamada con token: %.10s...", token)
     try:
         # Busca el usuario por token y verifica que no haya expirado
         user = CustomUser.objects.get(password_reset_token=token, password_reset_expires__gt=timezone.now())
@@ -291,7 +332,7 @@ def reset_password_view(request, token):
                 user.save()
                 
                 messages.success(request, '¡Tu contraseña ha sido restablecida exitosamente! Ya puedes iniciar sesión.')
-                logger.info(f"✅ Contraseña restablecida para usuario: {user.username}")
+                logger.info("✅ Contraseña restablecida para usuario: %s", user.username)
                 return redirect('login')
             else:
                  messages.error(request, 'La contraseña debe tener al menos 8 caracteres.')
@@ -310,24 +351,42 @@ def reset_password_view(request, token):
 
 # --- Lógica de Carrito ---
 
-@login_required
-def cart_view(request):
-    logger.info("🛒 Vista cart_view llamada")
-    cart_items = request.session.get('cart', [])
-    
+# Contextos compartidos con las versiones asíncronas (accounts/async_views.py)
+def cart_context(cart_items):
     # Calcular totales
     total_price = sum(float(item['price']) for item in cart_items)
     tax_amount = total_price * 0.16  # 16% de IVA
     grand_total = total_price + tax_amount
     
-    context = {
+    return {
         'cart_items': cart_items,
         'total_price': round(total_price, 2),
         'tax_amount': round(tax_amount, 2),
         'grand_total': round(grand_total, 2),
     }
 
-    return render(request, 'main/carrito.html', context)
+
+def payment_context(cart_item):
+    plan_type = cart_item.get('plan_type')
+    base_price = float(cart_item.get('price', 0))
+    
+    tax_amount = base_price * 0.16
+    total_amount = base_price + tax_amount
+    
+    return {
+        'plan_type': plan_type,
+        'base_price': round(base_price, 2),
+        'tax_amount': round(tax_amount, 2),
+        'amount': round(total_amount, 2),
+        'title': 'Proceso de Pago'
+    }
+
+
+@login_required
+def cart_view(request):
+    logger.info("🛒 Vista cart_view llamada")
+    cart_items = request.session.get('cart', [])
+    return render(request, 'main/carrito.html', cart_context(cart_items))
 
 
 @login_required
@@ -392,20 +451,7 @@ def payment_page(request):
         messages.error(request, 'No hay items en el carrito')
         return redirect('cart')
     
-    item = cart_items[0]
-    plan_type = item.get('plan_type')
-    base_price = float(item.get('price', 0))
-    
-    tax_amount = base_price * 0.16
-    total_amount = base_price + tax_amount
-    
-    return render(request, 'main/payment.html', {
-        'plan_type': plan_type,
-        'base_price': round(base_price, 2),
-        'tax_amount': round(tax_amount, 2),
-        'amount': round(total_amount, 2),
-        'title': 'Proceso de Pago'
-    })
+    return render(request, 'main/payment.html', payment_context(cart_items[0]))
 
 @login_required
 def process_payment(request):
@@ -420,28 +466,12 @@ def process_payment(request):
             card_number = request.POST.get('card_number', '0000')
             email = request.POST.get('email', request.user.email)
 
-            # SIMULAR PROCESAMIENTO DE PAGO EXITOSO
-            transaction_id = str(uuid.uuid4())[:10].upper()
-            
-            # Crear y completar la orden de pago (el .save() actualizará las fechas)
-            order = PaymentOrder.objects.create(
-                user=request.user,
-                plan_type=plan_type,
-                amount=amount,
-                status='completed',
-                transaction_id=transaction_id,
-                payment_method='credit_card', # Hardcodeado para simulación
-                card_last_four=card_number[-4:],
-                customer_email=email
-            )
-            
-            # Forzar la actualización de la membresía en el modelo CustomUser
-            user_profile = request.user
-            user_profile.membership_type = plan_type
-            user_profile.is_active_member = True
-            user_profile.membership_start = timezone.now()
-            user_profile.membership_expiry = timezone.now() + timedelta(days=30)
-            user_profile.save(update_fields=['membership_type', 'is_active_member', 'membership_start', 'membership_expiry'])
+            # Orden 'pending' con su Idempotency-Key, cobro en la pasarela configurada
+            # (accounts/gateways.py) y, si se completó, membresía (ver accounts/checkout.py)
+            order = start_order(request.user, plan_type, amount, card_number[-4:], email)
+            order = finish_order(order, charge_order(order), request.user)
+            if order.status != 'completed':
+                return checkout_not_completed(request, order)
 
             # Limpiar carrito
             request.session['cart'] = [] 
@@ -449,25 +479,219 @@ def process_payment(request):
             messages.success(request, f'¡Pago exitoso! Tu suscripción {plan_type.title()} ha sido activada.')
             return redirect('payment_success', order_id=order.id)
             
+        except PaymentError as e:
+            logger.warning("💳 Pago no completado: %s", e)
+            fail_order(order, e)
+            messages.error(request, str(e))
+            return redirect('payment_page')
         except Exception as e:
-            logger.error(f"💥 Error procesando el pago: {e}")
+            logger.error("💥 Error procesando el pago: %s", e)
             messages.error(request, f'Error procesando el pago: {str(e)}')
             return redirect('payment_page')
     
     return redirect('cart')
 
 @login_required
+@use_replicas
 def payment_success(request, order_id):
-    logger.info(f"🎉 Vista payment_success llamada - Orden: {order_id}")
-    order = get_object_or_404(PaymentOrder, id=order_id, user=request.user)
-    
-    return render(request, 'main/payment_success.html', {
-        'order': order,
-        'title': 'Pago Exitoso'
-    })
+    logger.info("🎉 Vista payment_success llamada - Orden: %s", order_id)
+    orders = PaymentOrder.objects.filter(id=order_id, user=request.user, status='completed')
+    transaction_id = orders.values_list('transaction_id', flat=True).first()
+    if transaction_id is None:
+        raise Http404('Orden no encontrada')
+
+    # El recibo ya confirma el pago: el mensaje de éxito no debe aparecer en la siguiente página
+    messages.get_messages(request).used = True
+    return receipt_response(request, request.user.pk, transaction_id, 'html', orders.first)
+
+@login_required
+def receipt_download(request, transaction_id, fmt):
+    """Descarga del recibo guardado; si el archivo existe no se consulta la base de datos."""
+    if fmt not in RECEIPT_FORMATS:
+        raise Http404('Formato no disponible')
+    orders = PaymentOrder.objects.filter(transaction_id=transaction_id, user=request.user, status='completed')
+    return receipt_response(request, request.user.pk, transaction_id, fmt, orders.first)
 
 @login_required
 def payment_cancel(request):
     logger.info("❌ Pago cancelado")
     messages.info(request, 'El pago fue cancelado. Puedes intentarlo nuevamente.')
-    return redirect('cart')
\ No newline at end of file
+    return redirect('cart')
+
+@csrf_exempt
+@require_POST
+def payment_webhook(request):
+    """
+    Recibe eventos firmados del procesador de pagos y solo los guarda (ver accounts/webhooks.py);
+    process_payment_webhooks los aplica a las órdenes en segundo plano.
+    """
+    secret = settings.PAYMENT_WEBHOOK_SECRET
+    if not secret:
+        raise Http404
+    try:
+        verify_signature(request.body, request.headers.get(SIGNATURE_HEADER, ''), secret,
+                         settings.PAYMENT_WEBHOOK_TOLERANCE)
+        events = parse_events(request.body, settings.PAYMENT_WEBHOOK_MAX_EVENTS)
+    except InvalidWebhook as e:
+        logger.warning("🚫 Webhook de pago rechazado: %s", e)
+        return JsonResponse({'error': str(e)}, status=400)
+
+    store_events(events)
+    return JsonResponse({'received': len(events)}, status=202)
+
+@login_required
+@require_safe
+@never_cache
+def entitlement_token(request):
+    """
+    Token firmado con el nivel de membresía del usuario para los servidores de juego, que lo
+    verifican sin volver a llamar a Django (ver accounts/entitlements.py).
+    """
+    issued = issue_for_user(request.user)
+    if issued is None:
+        raise Http404
+    entitlement, token = issued
+    return JsonResponse({
+        'token': token,
+        'user_id': entitlement.user_id,
+        'tier': entitlement.tier,
+        'expires_at': entitlement.expires_at,
+    })
+
+
+# =========================================================================
+# VISTAS DE ARCHIVOS MULTIMEDIA (imágenes de perfil)
+# =========================================================================
+
+class _RangeFile:
+    """Envuelve un archivo abierto para que solo entregue `length` bytes desde la posición actual."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _parse_range_header(header, size):
+    """
+    Interpreta un encabezado `Range: bytes=...` con un único rango.
+    Devuelve (inicio, fin) inclusivos, None si debe ignorarse, o False si no es satisfacible.
+    """
+    unit, _, ranges = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return None  # Multirango u otra unidad: se responde el archivo completo
+    start, _, end = ranges.strip().partition('-')
+    try:
+        if start:
+            start = int(start)
+            end = int(end) if end else size - 1
+        else:
+            # Sufijo: los últimos N bytes
+            start = max(0, size - int(end))
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return False
+    return start, min(end, size - 1)
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Entrega archivos de MEDIA_ROOT en producción.
+
+    La vista solo valida la ruta y resuelve las peticiones condicionales; la transferencia
+    se delega al servidor frontal (X-Accel-Redirect / X-Sendfile) si está configurado,
+    o se hace con FileResponse, que usa sendfile cuando el servidor WSGI lo soporta.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    if (
+        path.startswith('..')
+        or any(part.startswith('.') for part in path.split('/'))
+        or not path.startswith(tuple(settings.MEDIA_PUBLIC_PREFIXES))
+    ):
+        raise Http404('Archivo no encontrado')
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404('Archivo no encontrado')
+
+    # Los archivos con hash de contenido en el nombre nunca cambian
+    immutable = is_content_addressed(path)
+    if immutable:
+        etag = '"%s"' % posixpath.splitext(posixpath.basename(path))[0]
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        cache_control = f'public, max-age={settings.MEDIA_MAX_AGE}'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control,
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and ('*' in if_none_match or etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    backend = settings.MEDIA_SENDFILE_BACKEND
+
+    if backend:
+        # El servidor frontal se encarga de la transferencia, de Range y de Content-Length
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        else:
+            response['X-Sendfile'] = full_path
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = _parse_range_header(range_header, stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    file = open(full_path, 'rb')
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        file.seek(start)
+        if end < stat.st_size - 1:
+            # Rango acotado: sin fileno() para que no se use sendfile más allá del rango
+            file = _RangeFile(file, length)
+        response = FileResponse(file, content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(length)
+    else:
+        response = FileResponse(file, content_type=content_type)
+    # FileResponse añade "inline; filename=<hash>.png": innecesario para una imagen embebida
+    del response['Content-Disposition']
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -0,0 +1,247 @@
+# accounts/webhooks.py
+"""
+Ingesta de webhooks de estado de pagos en dos fases.
+
+1. payment_webhook (accounts/views.py) verifica la firma, valida los eventos y los guarda
+   con un único INSERT por lote (bulk_create ignore_conflicts): el índice único de event_id
+   descarta los reenvíos sin consultar antes. Responde 202 sin tocar PaymentOrder, así que
+   un procesador que reenvía miles de eventos por segundo solo cuesta inserciones.
+2. process_payment_webhooks aplica los pendientes por lotes en orden de occurred_at:
+   bloquea el lote con SELECT ... FOR UPDATE SKIP LOCKED (varios workers a la vez no se
+   pisan), carga las órdenes afectadas en una consulta, aplica las transiciones válidas y
+   ajusta la membresía de los usuarios afectados con bulk_update.
+
+Un evento puede llegar antes de que process_payment guarde el transaction_id de la orden:
+los de órdenes desconocidas se dejan pendientes y se reintentan cada UNKNOWN_ORDER_RETRY
+hasta UNKNOWN_ORDER_DEADLINE después de recibirse; solo entonces se marcan 'unknown_order'.
+
+Firma: cabecera X-Chaos-Signature "t=<unix>,v1=<hex>", donde v1 es
+HMAC-SHA256(PAYMENT_WEBHOOK_SECRET, "<t>.<cuerpo>"). Se rechazan firmas con más de
+PAYMENT_WEBHOOK_TOLERANCE segundos para que no se puedan reenviar peticiones capturadas.
+"""
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import CustomUser, PaymentOrder, PaymentWebhookEvent
+from .receipts import schedule_receipt
+from .stats import record_status_changes
+
+SIGNATURE_HEADER = 'X-Chaos-Signature'
+
+# Estados a los que puede pasar una orden desde cada estado. Los eventos llegan
+# desordenados o repetidos: lo que no encaja aquí se marca como ignorado.
+TRANSITIONS = {
+    'pending': {'completed', 'failed', 'cancelled'},
+    'failed': {'completed', 'cancelled'},
+    'completed': {'refunded', 'cancelled'},
+    'cancelled': set(),
+    'refunded': set(),
+}
+
+VALID_STATUSES = {status for status, _ in PaymentOrder.STATUS_CHOICES}
+
+UNKNOWN_ORDER_RETRY = timedelta(seconds=30)
+UNKNOWN_ORDER_DEADLINE = timedelta(hours=1)
+
+
+class InvalidWebhook(Exception):
+    """Firma o contenido del webhook no válidos."""
+
+
+# =========================================================================
+# RECEPCIÓN
+# =========================================================================
+
+def sign_payload(body, secret, timestamp=None):
+    """Cabecera de firma para `body` (la usan los tests y los scripts de carga)."""
+    timestamp = int(time.time() if timestamp is None else timestamp)
+    digest = hmac.new(secret.encode(), f'{timestamp}.'.encode() + body, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+
+def verify_signature(body, header, secret, tolerance):
+    try:
+        parts = dict(item.split('=', 1) for item in header.split(','))
+        timestamp = int(parts['t'])
+        provided = parts['v1']
+    except (KeyError, ValueError):
+        raise InvalidWebhook('Cabecera de firma mal formada')
+    if abs(time.time() - timestamp) > tolerance:
+        raise InvalidWebhook('Firma caducada')
+    expected = hmac.new(secret.encode(), f'{timestamp}.'.encode() + body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, provided):
+        raise InvalidWebhook('Firma no válida')
+
+
+def parse_events(body, max_events):
+    """
+    Acepta un evento suelto o {"events": [...]}. Cada evento:
+    {"id", "transaction_id", "status", "created" (unix)}.
+    """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise InvalidWebhook('JSON no válido')
+    items = data.get('events') if isinstance(data, dict) and 'events' in data else [data]
+    if not isinstance(items, list) or not items:
+        raise InvalidWebhook('No hay eventos')
+    if len(items) > max_events:
+        raise InvalidWebhook(f'Más de {max_events} eventos en una petición')
+
+    events = []
+    for item in items:
+        try:
+            status = item['status']
+            if status not in VALID_STATUSES:
+                raise InvalidWebhook(f'Estado desconocido: {status}')
+            events.append(PaymentWebhookEvent(
+                event_id=str(item['id'])[:100],
+                transaction_id=str(item['transaction_id'])[:100],
+                status=status,
+                occurred_at=datetime.fromtimestamp(float(item['created']), dt_timezone.utc),
+                payload=item,
+            ))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise InvalidWebhook('Evento incompleto')
+    return events
+
+
+def store_events(events):
+    """Un INSERT por lote; los event_id ya recibidos los descarta el índice único."""
+    PaymentWebhookEvent.objects.bulk_create(events, batch_size=500, ignore_conflicts=True)
+
+
+# =========================================================================
+# APLICACIÓN (worker)
+# =========================================================================
+
+def apply_pending_events(batch_size=500):
+    """
+    Aplica un lote de eventos pendientes; devuelve {outcome: n} (vacío si no quedaba nada).
+    Los aplazados por orden desconocida cuentan como 'deferred'.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = PaymentWebhookEvent.objects.filter(
+            Q(retry_after__isnull=True) | Q(retry_after__lte=now), processed_at__isnull=True,
+        ).order_by('occurred_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        events = list(pending[:batch_size])
+        if not events:
+            return {}
+
+        transaction_ids = {event.transaction_id for event in events}
+        orders = {
+            order.transaction_id: order
+            for order in PaymentOrder.objects.select_for_update().filter(transaction_id__in=transaction_ids)
+        }
+
+        outcomes = {}
+        deferred = []
+        changed_orders = {}
+        previous = {}
+        for event in events:
+            order = orders.get(event.transaction_id)
+            if order is None:
+                if now - event.received_at < UNKNOWN_ORDER_DEADLINE:
+                    # La orden puede estar aún cobrándose: se reintenta más tarde
+                    deferred.append(event.pk)
+                    continue
+                outcome = 'unknown_order'
+            elif event.status in TRANSITIONS[order.status]:
+                previous.setdefault(order.pk, (order.status, order.subscription_end))
+                apply_transition(order, event.status, now)
+                changed_orders[order.pk] = order
+                outcome = 'applied'
+            else:
+                outcome = 'ignored'
+            outcomes.setdefault(outcome, []).append(event.pk)
+
+        if changed_orders:
+            PaymentOrder.objects.bulk_update(
+                changed_orders.values(),
+                ['status', 'paid_at', 'subscription_start', 'subscription_end', 'updated_at'],
+                batch_size=500,
+            )
+            refresh_memberships([(order, *previous[order.pk]) for order in changed_orders.values()], now)
+            record_status_changes([(order, previous[order.pk][0]) for order in changed_orders.values()])
+            # bulk_update no emite post_save: los recibos se generan o se retiran aquí
+            for order in changed_orders.values():
+                schedule_receipt(order)
+
+        for outcome, ids in outcomes.items():
+            PaymentWebhookEvent.objects.filter(pk__in=ids).update(processed_at=now, outcome=outcome)
+        if deferred:
+            PaymentWebhookEvent.objects.filter(pk__in=deferred).update(retry_after=now + UNKNOWN_ORDER_RETRY)
+            outcomes['deferred'] = deferred
+
+    return {outcome: len(ids) for outcome, ids in outcomes.items()}
+
+
+def apply_transition(order, status, now):
+    # bulk_update no llama a save(): las fechas que ponía PaymentOrder.save() se fijan aquí
+    order.status = status
+    order.updated_at = now
+    if status == 'completed' and not order.paid_at:
+        order.paid_at = now
+        order.subscription_start = order.subscription_start or now
+        order.subscription_end = order.subscription_end or now + timedelta(days=30)
+    elif status in ('refunded', 'cancelled') and order.subscription_end and order.subscription_end > now:
+        # La suscripción pagada con esta orden termina ya
+        order.subscription_end = now
+
+
+def refresh_memberships(changes, now):
+    """
+    Ajusta la membresía de los usuarios de `changes` = [(orden, estado anterior, fin de
+    suscripción anterior)] a su orden completada vigente que termina más tarde. Solo se
+    degrada si la transición terminó la orden que respaldaba la membresía (mismo
+    vencimiento): una membresía asignada a mano en el admin no se toca, salvo para
+    alargarla con una orden completada que vence después.
+    """
+    user_ids = {order.user_id for order, _, _ in changes}
+    ended = {}
+    for order, old_status, old_end in changes:
+        if old_status == 'completed' and order.status != 'completed' and old_end:
+            ended.setdefault(order.user_id, set()).add(old_end)
+
+    active_until = dict(
+        PaymentOrder.objects.filter(user_id__in=user_ids, status='completed', subscription_end__gt=now)
+        .values('user_id').annotate(until=Max('subscription_end')).values_list('user_id', 'until')
+    )
+    current_plans = {
+        order.user_id: order.plan_type
+        for order in PaymentOrder.objects.filter(
+            user_id__in=active_until, status='completed', subscription_end__in=active_until.values(),
+        ).only('user_id', 'plan_type', 'subscription_end')
+        if order.subscription_end == active_until[order.user_id]
+    }
+
+    users = list(CustomUser.objects.filter(pk__in=user_ids).only(
+        'membership_type', 'membership_expiry', 'is_active_member',
+    ))
+    changed = []
+    for user in users:
+        until = active_until.get(user.pk)
+        if user.membership_expiry not in ended.get(user.pk, ()):
+            # No la respaldaba una orden terminada en este lote: solo se activa o se alarga
+            if until is None or (user.is_active_member and user.membership_expiry and user.membership_expiry >= until):
+                continue
+        if until is not None:
+            user.membership_type = current_plans[user.pk]
+            user.membership_expiry = until
+            user.is_active_member = True
+        else:
+            user.membership_type = 'free'
+            user.membership_expiry = None
+            user.is_active_member = False
+        changed.append(user)
+    CustomUser.objects.bulk_update(changed, ['membership_type', 'membership_expiry', 'is_active_member'])
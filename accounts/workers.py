@@ -0,0 +1,41 @@
+# accounts/workers.py
+"""
+Código que ejecutan los procesos hijos (multiprocessing con spawn) de los comandos de
+accounts.
+
+Un hijo lanzado con spawn arranca un intérprete nuevo e importa el módulo de cada función
+que recibe antes de llamarla, inicializador incluido. Si ese módulo importa modelos (como
+el del propio comando), la importación falla con AppRegistryNotReady porque Django aún no
+está cargado, y el pool se rompe. Este módulo no importa nada de Django al cargarse: los
+módulos con modelos se importan dentro de cada función, después de setup_worker.
+"""
+
+
+def worker_databases():
+    """Configuración de bases que usa ahora el proceso padre, para pasarla a los hijos."""
+    from django.db import connections
+    return {alias: connections[alias].settings_dict for alias in connections}
+
+
+def setup_worker(databases=None):
+    """
+    Inicializador del pool: carga Django con el mismo DJANGO_SETTINGS_MODULE. Con
+    `databases` (ver worker_databases) el hijo usa las mismas bases que el padre aunque este
+    las haya cambiado en tiempo de ejecución, como hace el runner de tests.
+    """
+    import django
+    from django.conf import settings
+    if databases is not None:
+        settings.DATABASES = databases
+    django.setup()
+
+
+def renew_worker(job):
+    """Un worker de renew_subscriptions: job = (window_start, window_end, chunk_size)."""
+    from django.db import connections
+
+    from .renewals import run_worker
+    try:
+        return run_worker(*job)
+    finally:
+        connections.close_all()
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Herramientas de medición de rendimiento de ChaosCompany (no se importan desde la app)."""
@@ -0,0 +1,150 @@
+# benchmarks/asgi_vs_wsgi.py
+"""
+Comparativa de peticiones por segundo y latencia p99 entre el despliegue WSGI
+(gunicorn + vistas síncronas) y el ASGI (uvicorn + vistas asíncronas).
+
+Uso, desde la raíz del proyecto y con la base de datos de settings disponible:
+
+    python -m benchmarks.asgi_vs_wsgi --connections 2000 --duration 30 --workers 4
+
+Para cada servidor se arranca un proceso con el mismo número de workers, se mantienen
+`--connections` conexiones keep-alive concurrentes (benchmarks/loadgen.py) contra las
+rutas de mayor tráfico con una sesión autenticada y se imprime una tabla con rps, p50,
+p99 y errores por servidor y por ruta. Necesita gunicorn y uvicorn instalados; para
+miles de conexiones conviene también subir el límite de ficheros (ulimit -n) del
+usuario, el script sube el suyo hasta el máximo permitido.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+
+from .loadgen import raise_open_files_limit, run_load
+from .servers import running_server, server_command
+
+BENCH_USERNAME = 'bench_asgi_wsgi'
+
+# Rutas medidas: páginas públicas, perfil, carrito y pago (todas GET, sin efectos)
+DEFAULT_PATHS = [
+    '/',
+    '/gamepass/',
+    '/membresias/',
+    '/accounts/profile/',
+    '/accounts/cart/',
+    '/accounts/payment/',
+]
+
+# =========================================================================
+# PREPARACIÓN
+# =========================================================================
+
+def create_bench_session():
+    """
+    Crea (o reutiliza) un usuario de pruebas y una sesión autenticada con un plan en el
+    carrito, para que perfil, carrito y pago respondan 200 en lugar de redirigir.
+    Devuelve la clave de sesión que se enviará en la cookie.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chaoscompany.settings')
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+    from importlib import import_module
+
+    user, created = get_user_model().objects.get_or_create(
+        username=BENCH_USERNAME,
+        defaults={'email': f'{BENCH_USERNAME}@example.com'},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session['cart'] = [{'plan_type': 'standard', 'price': 9.99, 'name': 'Plan Standard'}]
+    session.create()
+    return settings.SESSION_COOKIE_NAME, session.session_key
+
+
+# =========================================================================
+# EJECUCIÓN
+# =========================================================================
+
+def bench_server(name, command, args, paths, headers):
+    with running_server(command, args.host, args.port):
+        # Calentamiento: carga de módulos, plantillas y conexiones a la base de datos
+        asyncio.run(run_load(args.host, args.port, paths, min(args.connections, 50),
+                             args.warmup, headers, ramp_up=0.5))
+        result = asyncio.run(run_load(args.host, args.port, paths, args.connections,
+                                      args.duration, headers, ramp_up=args.ramp_up))
+
+    report = {
+        'server': name,
+        'total': result.summary(),
+        'errors': result.errors,
+        'statuses': dict(result.statuses),
+        'paths': {path: result.summary(path) for path in paths},
+    }
+    return report
+
+
+def print_report(reports):
+    header = f"{'servidor':<8} {'ruta':<22} {'peticiones':>10} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for report in reports:
+        rows = [('TOTAL', report['total'])] + list(report['paths'].items())
+        for path, stats in rows:
+            print(f"{report['server']:<8} {path:<22} {stats['requests']:>10} {stats['rps']:>9} "
+                  f"{stats['p50_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9}")
+        print(f"{report['server']:<8} errores: {report['errors']}  códigos: {report['statuses']}")
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara rps y p99 entre gunicorn (WSGI) y uvicorn (ASGI).')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--connections', type=int, default=2000, help='Conexiones concurrentes (por defecto 2000)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Segundos de medición por servidor')
+    parser.add_argument('--ramp-up', type=float, default=3.0, help='Segundos para abrir todas las conexiones')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Segundos de calentamiento antes de medir')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos por servidor')
+    parser.add_argument('--threads', type=int, default=8, help='Hilos por worker de gunicorn (WSGI)')
+    parser.add_argument('--servers', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--json', dest='json_path', help='Guardar también los resultados en este archivo JSON')
+    args = parser.parse_args(argv)
+
+    commands = {name: server_command(name, args.host, args.port, args.workers, args.threads)
+                for name in args.servers}
+    for name in args.servers:
+        if shutil.which(commands[name][0]) is None:
+            parser.error(f'No se encontró {commands[name][0]!r} en el PATH (necesario para {name}).')
+
+    limit = raise_open_files_limit(args.connections)
+    if limit != -1 and limit < args.connections + 64:
+        print(f'⚠️ Límite de ficheros abiertos {limit}: habrá errores de conexión por encima de ese número.',
+              file=sys.stderr)
+
+    cookie_name, session_key = create_bench_session()
+    headers = {'Cookie': f'{cookie_name}={session_key}'}
+
+    reports = []
+    for name in args.servers:
+        print(f'🚀 Midiendo {name}: {" ".join(commands[name])}', file=sys.stderr)
+        reports.append(bench_server(name, commands[name], args, args.paths, headers))
+
+    print_report(reports)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as fh:
+            json.dump({'args': vars(args), 'results': reports}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
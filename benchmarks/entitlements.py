@@ -0,0 +1,91 @@
+# benchmarks/entitlements.py
+"""
+Verificaciones por segundo de los tokens de derechos (accounts/entitlements.py), tal como
+las haría un servidor de juego: sin Django, sin base de datos y sin red.
+
+Uso, desde la raíz del proyecto (no necesita settings ni base de datos):
+
+    python -m benchmarks.entitlements --tokens 10000 --duration 5 --processes 4
+
+Se firma un conjunto de tokens con la clave activa y con una clave anterior todavía
+aceptada (rotación en curso), se mezclan con un porcentaje de tokens manipulados y se
+verifican en bucle durante --duration segundos en cada proceso. Imprime verificaciones
+por segundo por proceso y en total, y el coste medio de una verificación.
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+from accounts.entitlements import TIERS, InvalidToken, Signer, Verifier
+
+KEYS = {'2024a': 'clave-anterior-de-benchmark', '2024b': 'clave-activa-de-benchmark'}
+
+
+def build_tokens(count, tampered_rate, seed=0):
+    rng = random.Random(seed)
+    expires_at = int(time.time()) + 3600
+    signers = [Signer(KEYS, kid) for kid in KEYS]
+    tokens = []
+    for user_id in range(1, count + 1):
+        token = rng.choice(signers).sign(user_id, rng.choice(TIERS), expires_at)
+        if rng.random() < tampered_rate:
+            # Se cambia el id de usuario sin volver a firmar
+            parts = token.split('.')
+            parts[2] = str(user_id + 1)
+            token = '.'.join(parts)
+        tokens.append(token)
+    return tokens
+
+
+def verify_loop(args):
+    tokens, duration = args
+    verifier = Verifier(KEYS)
+    verified = rejected = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        # Se comprueba el reloj cada bloque de tokens, no en cada verificación
+        for token in tokens:
+            try:
+                verifier.verify(token)
+                verified += 1
+            except InvalidToken:
+                rejected += 1
+    return verified, rejected, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verificaciones por segundo de tokens de derechos.')
+    parser.add_argument('--tokens', type=int, default=10000, help='Tokens distintos a verificar (default: 10000).')
+    parser.add_argument('--duration', type=float, default=5.0, help='Segundos de medida por proceso (default: 5).')
+    parser.add_argument('--processes', type=int, default=1, help='Procesos verificando en paralelo (default: 1).')
+    parser.add_argument(
+        '--tampered-rate', type=float, default=0.05,
+        help='Fracción de tokens manipulados, que deben rechazarse (default: 0.05).',
+    )
+    args = parser.parse_args(argv)
+
+    tokens = build_tokens(args.tokens, args.tampered_rate)
+    work = [(tokens, args.duration)] * args.processes
+    started = time.perf_counter()
+    if args.processes == 1:
+        results = [verify_loop(work[0])]
+    else:
+        with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+            results = pool.map(verify_loop, work)
+    elapsed = time.perf_counter() - started
+
+    header = f"{'proceso':<8} {'válidos':>10} {'rechazados':>11} {'verif/s':>10}"
+    print(header)
+    print('-' * len(header))
+    rates = []
+    for index, (verified, rejected, seconds) in enumerate(results):
+        rates.append((verified + rejected) / seconds)
+        print(f'{index:<8} {verified:>10} {rejected:>11} {rates[-1]:>10.0f}')
+    rate = sum(rates)
+    print(f'\nTotal: {rate:.0f} verificaciones/s con {args.processes} proceso(s), '
+          f'{1e6 * args.processes / rate:.2f} µs por verificación ({elapsed:.1f}s de reloj)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+# benchmarks/funnel.py
+"""
+Prueba de carga de extremo a extremo del embudo registro → login → carrito → pago → juego.
+
+Cada usuario virtual recorre el embudo completo contra el URL conf real con su propia
+conexión keep-alive y sus cookies (sesión y csrftoken), y lo repite con un usuario
+nuevo hasta agotar la duración o las iteraciones:
+
+    GET/POST /accounts/signup/   GET /accounts/logout/   GET/POST /accounts/login/
+    GET /cart/   POST /add-to-cart/   POST /payment/process/   GET /game-session/
+
+Uso, desde la raíz del proyecto con la base de datos migrada:
+
+    python -m benchmarks.funnel --users 50 --duration 60               # arranca runserver
+    python -m benchmarks.funnel --server wsgi --workers 4 --users 200  # gunicorn
+    python -m benchmarks.funnel --target 127.0.0.1:8000                # servidor ya levantado
+
+Informa de rendimiento y p50/p95/p99 por endpoint y los compara con el baseline guardado
+(benchmarks/baselines/funnel-<servidor>.json). Si algún percentil empeora o el
+rendimiento cae más allá de --tolerance, o la tasa de errores supera --max-error-rate,
+el proceso termina con código 1. --update-baseline guarda la ejecución actual como
+nuevo baseline. Los usuarios creados (lt_<run>_*) se borran al terminar salvo con
+--keep-users.
+
+Los baselines son locales de cada máquina y no se versionan (benchmarks/baselines/ está en
+.gitignore): las latencias dependen del hardware, la base de datos y la concurrencia, así
+que un baseline de otra máquina no sirve como puerta. La puerta compara siempre con uno
+grabado en la misma máquina, con los mismos argumentos y desde una revisión de referencia
+(p. ej. main antes del cambio):
+
+    git switch main && python -m benchmarks.funnel --server wsgi --workers 4 --users 200 --update-baseline
+    git switch -    && python -m benchmarks.funnel --server wsgi --workers 4 --users 200
+
+Si los argumentos no coinciden con los que guardó el baseline en "args", se avisa: la
+comparación solo tiene sentido con la misma carga.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from .loadgen import HttpClient, LoadResult, raise_open_files_limit
+from .servers import BASE_DIR, SERVER_CHOICES, running_server, server_command
+
+BASELINE_DIR = os.path.join(BASE_DIR, 'benchmarks', 'baselines')
+
+USERNAME_PREFIX = 'lt_'
+PASSWORD = 'Carga-Embudo-2024!'
+
+# Orden del embudo; también es el orden de las filas del informe
+ENDPOINTS = [
+    'signup_form', 'signup', 'logout', 'login_form', 'login',
+    'cart', 'add_to_cart', 'payment_process', 'game_session',
+]
+
+PERCENTILES = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+class FunnelAborted(Exception):
+    """Un paso devolvió una respuesta inesperada; el resto del embudo depende de él."""
+
+
+# =========================================================================
+# EMBUDO DE UN USUARIO VIRTUAL
+# =========================================================================
+
+class FunnelRun:
+    """Resultados de una ejecución: latencias por endpoint, fallos y embudos completados."""
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.result = LoadResult()
+        self.failures = defaultdict(int)     # endpoint -> respuestas inesperadas o errores de red
+        self.network_errors = defaultdict(int)  # endpoint -> peticiones sin respuesta
+        self.completed = 0
+        self.aborted = 0
+
+    async def step(self, client, name, method, path, data=None, expect=200, location=None):
+        headers = None
+        if method == 'POST':
+            # CsrfViewMiddleware acepta el secreto de la cookie como token
+            headers = {'X-CSRFToken': client.cookies.get('csrftoken', '')}
+        started = time.monotonic()
+        try:
+            status, response_headers, _ = await client.request(method, path, data, headers)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            self.failures[name] += 1
+            self.network_errors[name] += 1
+            raise FunnelAborted(f'{name}: {e}') from e
+        self.result.latencies[name].append(time.monotonic() - started)
+        self.result.statuses[status] += 1
+
+        if status != expect or (location and location not in response_headers.get('location', '')):
+            self.failures[name] += 1
+            raise FunnelAborted(f'{name}: HTTP {status} {response_headers.get("location", "")}')
+
+    async def run_once(self, host, port, vu, iteration):
+        client = HttpClient(host, port)
+        username = f'{USERNAME_PREFIX}{self.run_id}_{vu}_{iteration}'
+        try:
+            await self.step(client, 'signup_form', 'GET', '/accounts/signup/')
+            await self.step(client, 'signup', 'POST', '/accounts/signup/', {
+                'username': username,
+                'email': f'{username}@carga.example.com',
+                'first_name': 'Carga',
+                'last_name': f'Usuario {vu}',
+                'membership_type': 'free',
+                'password1': PASSWORD,
+                'password2': PASSWORD,
+            }, expect=302)
+            await self.step(client, 'logout', 'GET', '/accounts/logout/', expect=302)
+            await self.step(client, 'login_form', 'GET', '/accounts/login/')
+            await self.step(client, 'login', 'POST', '/accounts/login/', {
+                'username': username,
+                'password': PASSWORD,
+            }, expect=302)
+            await self.step(client, 'cart', 'GET', '/cart/')
+            await self.step(client, 'add_to_cart', 'POST', '/add-to-cart/', {
+                'plan_type': 'standard',
+                'price': '9.99',
+            }, expect=302)
+            await self.step(client, 'payment_process', 'POST', '/payment/process/', {
+                'plan_type': 'standard',
+                'amount': '11.59',
+                'card_holder': 'Carga Usuario',
+                'card_number': '4111 1111 1111 1111',
+                'expiry_date': '12/39',
+                'cvv': '123',
+                'email': f'{username}@carga.example.com',
+            }, expect=302, location='/payment/success/')
+            await self.step(client, 'game_session', 'GET', '/game-session/?game=Fortnite')
+            self.completed += 1
+        except FunnelAborted:
+            self.aborted += 1
+        finally:
+            client.close()
+
+    async def virtual_user(self, host, port, vu, deadline, iterations, ramp_up):
+        await asyncio.sleep(ramp_up * vu / max(self.users, 1))
+        iteration = 0
+        while (iterations is None or iteration < iterations) and (deadline is None or time.monotonic() < deadline):
+            await self.run_once(host, port, vu, iteration)
+            iteration += 1
+
+    async def run(self, host, port, users, duration=None, iterations=None, ramp_up=0.0):
+        self.users = users
+        started = time.monotonic()
+        deadline = started + ramp_up + duration if duration else None
+        await asyncio.gather(*(
+            self.virtual_user(host, port, vu, deadline, iterations, ramp_up)
+            for vu in range(users)
+        ))
+        self.result.elapsed = max(time.monotonic() - started, 0.001)
+        return self
+
+    def report(self):
+        endpoints = {}
+        for name in ENDPOINTS:
+            stats = self.result.summary(name)
+            attempts = stats['requests'] + self.network_errors[name]
+            stats['errors'] = self.failures[name]
+            stats['error_rate'] = round(self.failures[name] / attempts, 4) if attempts else 0.0
+            endpoints[name] = stats
+        return {
+            'run_id': self.run_id,
+            'elapsed_s': round(self.result.elapsed, 2),
+            'funnels_completed': self.completed,
+            'funnels_aborted': self.aborted,
+            'funnels_per_second': round(self.completed / self.result.elapsed, 2),
+            'statuses': dict(self.result.statuses),
+            'endpoints': endpoints,
+        }
+
+
+# =========================================================================
+# BASELINES
+# =========================================================================
+
+def compare_to_baseline(report, baseline, tolerance, slack_ms):
+    """Lista de regresiones (vacía si la ejecución está dentro de la tolerancia)."""
+    regressions = []
+    for name, expected in baseline['endpoints'].items():
+        current = report['endpoints'].get(name)
+        if not current or not current['requests']:
+            regressions.append(f'{name}: sin peticiones medidas')
+            continue
+        for metric in PERCENTILES:
+            limit = expected[metric] * (1 + tolerance) + slack_ms
+            if current[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {current[metric]} > {limit:.2f} (baseline {expected[metric]})')
+        floor = expected['rps'] * (1 - tolerance)
+        if current['rps'] < floor:
+            regressions.append(f"{name}: rps {current['rps']} < {floor:.1f} (baseline {expected['rps']})")
+
+    floor = baseline['funnels_per_second'] * (1 - tolerance)
+    if report['funnels_per_second'] < floor:
+        regressions.append(
+            f"embudos/s {report['funnels_per_second']} < {floor:.2f} (baseline {baseline['funnels_per_second']})")
+    return regressions
+
+
+def baseline_path(args):
+    if args.baseline:
+        return args.baseline
+    server = 'external' if args.target else args.server
+    return os.path.join(BASELINE_DIR, f'funnel-{server}.json')
+
+
+def run_args(args):
+    return {key: vars(args)[key] for key in ('server', 'workers', 'threads', 'users', 'duration', 'iterations')}
+
+
+def save_baseline(path, report, args):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'args': run_args(args),
+        'funnels_per_second': report['funnels_per_second'],
+        'endpoints': {
+            name: {key: stats[key] for key in ('rps', 'error_rate') + PERCENTILES}
+            for name, stats in report['endpoints'].items()
+        },
+    }
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(baseline, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+    os.replace(tmp_path, path)
+
+
+# =========================================================================
+# LIMPIEZA
+# =========================================================================
+
+def delete_run_users(run_id):
+    """Borra los usuarios (y en cascada sus órdenes) creados por esta ejecución."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chaoscompany.settings')
+    import django
+    django.setup()
+    from django.contrib.auth import get_user_model
+
+    deleted, _ = get_user_model().objects.filter(
+        username__startswith=f'{USERNAME_PREFIX}{run_id}_').delete()
+    return deleted
+
+
+# =========================================================================
+# EJECUCIÓN
+# =========================================================================
+
+def print_report(report):
+    header = (f"{'endpoint':<16} {'peticiones':>10} {'errores':>8} {'rps':>9} "
+              f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print(header)
+    print('-' * len(header))
+    for name, stats in report['endpoints'].items():
+        print(f"{name:<16} {stats['requests']:>10} {stats['errors']:>8} {stats['rps']:>9} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+    print(f"\nEmbudos completados: {report['funnels_completed']} "
+          f"({report['funnels_per_second']}/s), abortados: {report['funnels_aborted']}, "
+          f"códigos: {report['statuses']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga del embudo registro → pago con baselines.')
+    parser.add_argument('--server', choices=SERVER_CHOICES, default='runserver',
+                        help='Servidor local a arrancar (por defecto runserver)')
+    parser.add_argument('--target', help='host:puerto de un servidor ya levantado (no se arranca ninguno)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--users', type=int, default=50, help='Usuarios virtuales concurrentes')
+    parser.add_argument('--duration', type=float, default=60.0, help='Segundos de carga')
+    parser.add_argument('--iterations', type=int, help='Embudos por usuario (en lugar de --duration)')
+    parser.add_argument('--ramp-up', type=float, default=5.0, help='Segundos para incorporar a todos los usuarios')
+    parser.add_argument('--baseline', help='Archivo de baseline (por defecto benchmarks/baselines/funnel-<servidor>.json, no versionado)')
+    parser.add_argument('--update-baseline', action='store_true', help='Guardar esta ejecución como baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Empeoramiento relativo permitido en percentiles y rps (0.25 = 25%%)')
+    parser.add_argument('--slack-ms', type=float, default=5.0,
+                        help='Margen absoluto en ms para percentiles muy pequeños')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='Tasa de errores máxima por endpoint')
+    parser.add_argument('--json', dest='json_path', help='Guardar también el informe en este archivo JSON')
+    parser.add_argument('--keep-users', action='store_true', help='No borrar los usuarios creados')
+    args = parser.parse_args(argv)
+
+    raise_open_files_limit(args.users * 2)
+    run_id = uuid.uuid4().hex[:8]
+    funnel = FunnelRun(run_id)
+    duration = None if args.iterations else args.duration
+
+    async def load(host, port):
+        return await funnel.run(host, port, args.users, duration, args.iterations, args.ramp_up)
+
+    print(f'🚦 Ejecución {run_id}: {args.users} usuarios virtuales', file=sys.stderr)
+    try:
+        if args.target:
+            host, _, port = args.target.rpartition(':')
+            asyncio.run(load(host, int(port)))
+        else:
+            command = server_command(args.server, args.host, args.port, args.workers, args.threads)
+            with running_server(command, args.host, args.port, quiet=True):
+                asyncio.run(load(args.host, args.port))
+    finally:
+        if not args.keep_users:
+            print(f'🧹 Objetos de carga borrados (usuarios y órdenes): {delete_run_users(run_id)}', file=sys.stderr)
+
+    report = funnel.report()
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+
+    failed = False
+    for name, stats in report['endpoints'].items():
+        if stats['error_rate'] > args.max_error_rate:
+            print(f"❌ {name}: tasa de errores {stats['error_rate']:.2%} > {args.max_error_rate:.2%}")
+            failed = True
+
+    path = baseline_path(args)
+    if args.update_baseline:
+        if failed:
+            print('⚠️ No se actualiza el baseline de una ejecución con errores.')
+        else:
+            save_baseline(path, report, args)
+            print(f'💾 Baseline guardado en {path}')
+    elif os.path.exists(path):
+        with open(path, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        if baseline.get('args') != run_args(args):
+            print(f"⚠️ El baseline se grabó con otros argumentos ({baseline.get('args')}); la comparación no es fiable.")
+        regressions = compare_to_baseline(report, baseline, args.tolerance, args.slack_ms)
+        for regression in regressions:
+            print(f'📉 Regresión: {regression}')
+        if regressions:
+            failed = True
+        else:
+            print(f'✅ Dentro de la tolerancia ({args.tolerance:.0%}) respecto a {path}')
+    else:
+        print(f'ℹ️ Sin baseline en {path}; usa --update-baseline para crearlo.')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+# benchmarks/loadgen.py
+"""
+Generador de carga HTTP/1.1 basado en asyncio (solo librería estándar).
+
+Cada conexión es una corrutina que reutiliza su socket (keep-alive) y lanza peticiones
+en bucle cerrado hasta agotar la duración, así que la concurrencia real es exactamente
+el número de conexiones abiertas. Las latencias se guardan por ruta para poder calcular
+percentiles después.
+"""
+import asyncio
+import math
+import random
+import resource
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+# =========================================================================
+# UTILITIES
+# =========================================================================
+
+def raise_open_files_limit(connections):
+    """Sube el límite de descriptores abiertos (RLIMIT_NOFILE) para miles de conexiones."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = connections + 256
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        new_soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+        soft = new_soft
+    return soft
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not values:
+        return 0.0
+    index = math.ceil(pct / 100.0 * len(values)) - 1
+    return values[max(0, min(index, len(values) - 1))]
+
+
+class LoadResult:
+    """Resultados agregados de una ejecución de carga."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)   # ruta -> [segundos]
+        self.statuses = defaultdict(int)     # código HTTP -> número de respuestas
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def requests(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def rps(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def summary(self, path=None):
+        """Devuelve rps, p50, p95, p99 y máximo (en milisegundos) global o de una ruta."""
+        if path is None:
+            values = sorted(v for values in self.latencies.values() for v in values)
+            rps = self.rps
+        else:
+            values = sorted(self.latencies.get(path, []))
+            rps = len(values) / self.elapsed if self.elapsed else 0.0
+        return {
+            'requests': len(values),
+            'rps': round(rps, 1),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+        }
+
+# =========================================================================
+# CLIENTE HTTP MÍNIMO
+# =========================================================================
+
+async def read_response(reader):
+    """Lee una respuesta completa y devuelve (status, headers, body, keep_alive)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Conexión cerrada por el servidor')
+    status = int(status_line.split()[1])
+
+    headers = []   # lista de (nombre en minúsculas, valor): Set-Cookie puede repetirse
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers.append((name.strip().lower(), value.strip()))
+    header_map = dict(headers)
+
+    if header_map.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            chunks.append((await reader.readexactly(size + 2))[:-2])
+            if size == 0:
+                break
+        body = b''.join(chunks)
+        keep_alive = True
+    elif 'content-length' in header_map:
+        body = await reader.readexactly(int(header_map['content-length']))
+        keep_alive = True
+    else:
+        body = await reader.read()
+        keep_alive = False
+
+    if header_map.get('connection', '').lower() == 'close':
+        keep_alive = False
+    return status, headers, body, keep_alive
+
+
+async def _connection_worker(host, port, paths, headers, measure_from, deadline, result, ramp_up):
+    """Bucle cerrado de una conexión: petición, respuesta, siguiente petición."""
+    # Escalonar las conexiones para no disparar miles de SYN en el mismo instante
+    await asyncio.sleep(random.uniform(0, ramp_up))
+    extra_headers = ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+    reader = writer = None
+
+    while time.monotonic() < deadline:
+        path = random.choice(paths)
+        request = (
+            f'GET {path} HTTP/1.1\r\n'
+            f'Host: {host}:{port}\r\n'
+            f'{extra_headers}'
+            '\r\n'
+        ).encode('latin-1')
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.monotonic()
+            writer.write(request)
+            await writer.drain()
+            status, _, _, keep_alive = await read_response(reader)
+            # Solo cuenta lo ocurrido después del escalonado inicial (ventana de medición)
+            if started >= measure_from:
+                result.latencies[path].append(time.monotonic() - started)
+                result.statuses[status] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            if time.monotonic() >= measure_from:
+                result.errors += 1
+            if writer is not None:
+                writer.close()
+                writer = None
+            await asyncio.sleep(0.05)
+
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(host, port, paths, connections=2000, duration=30.0, headers=None, ramp_up=2.0):
+    """
+    Mantiene `connections` conexiones keep-alive contra host:port y devuelve un
+    LoadResult con lo medido durante `duration` segundos, una vez terminado el
+    escalonado inicial de `ramp_up` segundos.
+    """
+    result = LoadResult()
+    measure_from = time.monotonic() + ramp_up
+    deadline = measure_from + duration
+    await asyncio.gather(*(
+        _connection_worker(host, port, paths, headers or {}, measure_from, deadline, result, ramp_up)
+        for _ in range(connections)
+    ))
+    result.elapsed = max(time.monotonic() - measure_from, 0.001)
+    return result
+
+
+# =========================================================================
+# CLIENTE CON SESIÓN (flujos con cookies y formularios)
+# =========================================================================
+
+class HttpClient:
+    """
+    Una conexión keep-alive con su propio tarro de cookies: representa a un usuario
+    virtual que navega (sesión, csrftoken) en lugar de lanzar GET sueltos.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.cookies = {}
+        self._reader = self._writer = None
+
+    async def request(self, method, path, data=None, headers=None):
+        """Envía una petición y devuelve (status, headers, body). No sigue redirecciones."""
+        body = urlencode(data).encode('utf-8') if data is not None else b''
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}']
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        if data is not None:
+            lines.append('Content-Type: application/x-www-form-urlencoded')
+        if body or method not in ('GET', 'HEAD'):
+            lines.append(f'Content-Length: {len(body)}')
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+        for attempt in (1, 2):
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                reused = False
+            else:
+                reused = True
+            try:
+                self._writer.write(payload)
+                await self._writer.drain()
+                status, response_headers, response_body, keep_alive = await read_response(self._reader)
+                break
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                # El servidor pudo cerrar la conexión reutilizada entre peticiones: un reintento
+                if not reused or attempt == 2:
+                    raise
+
+        if not keep_alive:
+            self.close()
+        self._store_cookies(response_headers)
+        return status, dict(response_headers), response_body
+
+    def _store_cookies(self, headers):
+        for name, value in headers:
+            if name != 'set-cookie':
+                continue
+            cookie = SimpleCookie()
+            cookie.load(value)
+            for key, morsel in cookie.items():
+                if morsel['max-age'] == '0' or not morsel.value:
+                    self.cookies.pop(key, None)
+                else:
+                    self.cookies[key] = morsel.value
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
@@ -0,0 +1,193 @@
+# benchmarks/reminders.py
+"""
+Avisos de vencimiento por segundo (accounts/reminders.py) contra un sumidero SMTP local.
+
+Uso, desde la raíz del proyecto con la base de datos migrada:
+
+    python -m benchmarks.reminders --users 5000 --batch-size 500 --handshake-ms 20
+
+Arranca en otro proceso un servidor SMTP mínimo que acepta y descarta los mensajes, crea
+--users miembros de prueba (bench_reminder_<run>_*) que vencen dentro de la ventana y
+compara:
+
+- un send_mail por usuario, que abre y cierra una conexión SMTP por mensaje (sobre los
+  primeros --baseline-users, es el camino lento);
+- send_reminders por lotes sobre una única conexión;
+- una segunda ejecución, que no debe enviar nada porque ya están todos marcados.
+
+--handshake-ms retrasa el saludo del sumidero para simular el coste de conectar con un
+servidor real (TLS, autenticación); con 0 solo se mide el coste local. Los usuarios de
+prueba se borran al terminar.
+"""
+import argparse
+import multiprocessing
+import os
+import socketserver
+import time
+import uuid
+from datetime import timedelta
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Lo justo de SMTP para smtplib: acepta todo y cuenta los mensajes recibidos."""
+    # Sin Nagle, y cada respuesta en una sola escritura: si no, el ACK retardado del
+    # cliente añade ~40 ms por orden y se mediría TCP en lugar de SMTP
+    disable_nagle_algorithm = True
+
+    def reply(self, *lines):
+        self.wfile.write(b''.join(line.encode('ascii') + b'\r\n' for line in lines))
+
+    def handle(self):
+        server = self.server
+        time.sleep(server.handshake)
+        server.count(CONNECTIONS)
+        self.reply('220 sink ESMTP')
+        in_data = False
+        for line in self.rfile:
+            if in_data:
+                if line.rstrip(b'\r\n') == b'.':
+                    in_data = False
+                    server.count(MESSAGES)
+                    self.reply('250 OK')
+                continue
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.reply('250-sink', '250 8BITMIME')
+            elif command in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self.reply('250 OK')
+            elif command == b'DATA':
+                in_data = True
+                self.reply('354 Fin con <CRLF>.<CRLF>')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 No implementado')
+
+
+CONNECTIONS, MESSAGES = 0, 1
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake, counters):
+        super().__init__(('127.0.0.1', 0), SinkHandler)
+        self.handshake = handshake
+        self.counters = counters
+
+    def count(self, index):
+        with self.counters.get_lock():
+            self.counters[index] += 1
+
+
+def serve_sink(handshake, counters, ready):
+    # En su propio proceso: en el mismo, el sumidero competiría por el GIL con el emisor
+    sink = SmtpSink(handshake, counters)
+    ready.put(sink.server_address)
+    sink.serve_forever()
+
+
+def create_users(prefix, count, days):
+    from django.utils import timezone
+
+    from accounts.models import CustomUser
+
+    now = timezone.now()
+    CustomUser.objects.bulk_create([
+        CustomUser(
+            username=f'{prefix}{index}', email=f'{prefix}{index}@example.com', first_name='Bench',
+            membership_type='standard', is_active_member=True,
+            membership_start=now - timedelta(days=30),
+            # Repartidos por la ventana, ninguno vencido
+            membership_expiry=now + timedelta(days=days) * (index + 1) / (count + 1),
+        )
+        for index in range(count)
+    ], batch_size=1000)
+
+
+def measure(counters, run):
+    before = counters[:]
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    return {
+        'messages': counters[MESSAGES] - before[MESSAGES],
+        'connections': counters[CONNECTIONS] - before[CONNECTIONS],
+        'seconds': elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Avisos de vencimiento por segundo contra un sumidero SMTP local.')
+    parser.add_argument('--users', type=int, default=5000, help='Miembros de prueba a avisar (default: 5000).')
+    parser.add_argument('--batch-size', type=int, default=500, help='Avisos por lote (default: 500).')
+    parser.add_argument(
+        '--baseline-users', type=int, default=500,
+        help='Usuarios enviados con un send_mail por mensaje para comparar (default: 500).',
+    )
+    parser.add_argument(
+        '--handshake-ms', type=float, default=0,
+        help='Retraso del saludo SMTP por conexión, en ms (default: 0).',
+    )
+    parser.add_argument('--keep-users', action='store_true', help='No borra los usuarios de prueba.')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chaoscompany.settings')
+    import django
+    django.setup()
+    from django.core.mail import get_connection
+    from django.utils import timezone
+
+    from accounts.models import CustomUser
+    from accounts.reminders import REMINDER_FIELDS, build_reminders, reminder_queryset, send_reminders
+
+    context = multiprocessing.get_context('spawn')
+    counters = context.Array('q', 2)
+    ready = context.Queue()
+    sink = context.Process(target=serve_sink, args=(args.handshake_ms / 1000, counters, ready), daemon=True)
+    sink.start()
+    host, port = ready.get(timeout=30)
+
+    def smtp_connection():
+        return get_connection('django.core.mail.backends.smtp.EmailBackend', host=host, port=port,
+                              username='', password='', use_tls=False, use_ssl=False)
+
+    prefix = f'bench_reminder_{uuid.uuid4().hex[:6]}_'
+    days = 7
+    create_users(prefix, args.users, days)
+    window_end = timezone.now() + timedelta(days=days)
+    queryset = reminder_queryset(timezone.now(), window_end).filter(username__startswith=prefix)
+    try:
+        def one_connection_per_message():
+            users = queryset.only(*REMINDER_FIELDS).order_by('pk')[:args.baseline_users]
+            for message in build_reminders(users):
+                # Lo mismo que send_mail: conexión nueva para cada mensaje
+                smtp_connection().send_messages([message])
+
+        def batched():
+            for _ in send_reminders(queryset, window_end, args.batch_size, smtp_connection()):
+                pass
+
+        results = [
+            ('send_mail por mensaje', measure(counters, one_connection_per_message)),
+            (f'lotes de {args.batch_size}', measure(counters, batched)),
+            ('reejecución', measure(counters, batched)),
+        ]
+    finally:
+        if not args.keep_users:
+            CustomUser.objects.filter(username__startswith=prefix).delete()
+        sink.terminate()
+
+    header = f"{'modo':<22} {'mensajes':>9} {'conexiones':>11} {'segundos':>9} {'mensajes/s':>11}"
+    print(header)
+    print('-' * len(header))
+    for name, result in results:
+        rate = result['messages'] / result['seconds'] if result['messages'] else 0
+        print(f"{name:<22} {result['messages']:>9} {result['connections']:>11} "
+              f"{result['seconds']:>9.2f} {rate:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/servers.py
+"""Arranque y parada de servidores locales de ChaosCompany para las mediciones."""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_CHOICES = ['runserver', 'wsgi', 'asgi']
+
+
+def server_command(name, host, port, workers=1, threads=8):
+    """Línea de arranque de cada servidor; gunicorn y uvicorn con el mismo número de procesos."""
+    if name == 'runserver':
+        return [sys.executable, 'manage.py', 'runserver', f'{host}:{port}', '--noreload']
+    if name == 'wsgi':
+        return [
+            'gunicorn', 'chaoscompany.wsgi:application',
+            '--bind', f'{host}:{port}', '--workers', str(workers), '--threads', str(threads),
+            '--worker-connections', '10000', '--backlog', '4096',
+            '--keep-alive', '75', '--log-level', 'warning',
+        ]
+    if name == 'asgi':
+        return [
+            'uvicorn', 'chaoscompany.asgi:application',
+            '--host', host, '--port', str(port), '--workers', str(workers),
+            '--backlog', '4096', '--timeout-keep-alive', '75',
+            '--no-access-log', '--log-level', 'warning',
+        ]
+    raise ValueError(f'Servidor desconocido: {name}')
+
+
+def wait_for_port(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'El servidor no abrió {host}:{port} en {timeout:.0f}s')
+
+
+@contextmanager
+def running_server(command, host, port, quiet=False):
+    """Arranca `command` en su propio grupo de procesos y lo detiene al salir del bloque."""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'chaoscompany.settings')
+    # El modo de vistas lo decide el punto de entrada (asgi.py activa las asíncronas)
+    env.pop('DJANGO_ASYNC_VIEWS', None)
+
+    output = subprocess.DEVNULL if quiet else None
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env, start_new_session=True,
+                               stdout=output, stderr=output)
+    try:
+        wait_for_port(host, port)
+        yield process
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
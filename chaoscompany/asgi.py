@@ -5,6 +5,26 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Modo de despliegue ASGI
+-----------------------
+Arrancar con uvicorn (uno o varios procesos, cada uno con su event loop):
+
+    uvicorn chaoscompany.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+o bajo gunicorn como gestor de procesos:
+
+    gunicorn chaoscompany.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+Este módulo fija DJANGO_ASYNC_VIEWS=1 (salvo que ya venga definido), de modo que
+settings.ASYNC_VIEWS enruta inicio, gamepass, membresías, ventajas, perfil, carrito y
+pago a sus versiones asíncronas (main/async_views.py, accounts/async_views.py). El
+resto de vistas siguen siendo síncronas y Django las ejecuta en el hilo compartido de
+sync_to_async. Todo el middleware de MIDDLEWARE admite modo asíncrono, así que la
+cadena no se degrada a síncrona. Con DJANGO_ASYNC_VIEWS=0 se sirve exactamente el
+mismo stack síncrono que en chaoscompany.wsgi.
+
+Comparativa de rendimiento WSGI vs ASGI: python -m benchmarks.asgi_vs_wsgi --help
 """
 
 import os
@@ -12,5 +32,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chaoscompany.settings')
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,2 @@
+# chaoscompany/db_backends/__init__.py
+"""Backends de base de datos propios (se eligen con ENGINE en settings.DATABASES)."""
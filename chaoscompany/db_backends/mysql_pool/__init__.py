@@ -0,0 +1,6 @@
+# chaoscompany/db_backends/mysql_pool/__init__.py
+"""
+Backend MySQL de Django con pool de conexiones compartido entre hilos.
+
+ENGINE = 'chaoscompany.db_backends.mysql_pool' (ver base.py y pool.py).
+"""
@@ -0,0 +1,89 @@
+# chaoscompany/db_backends/mysql_pool/base.py
+"""
+Backend MySQL con pool de conexiones (ver pool.py).
+
+Respecto a django.db.backends.mysql:
+
+- get_new_connection() toma una conexión del pool en lugar de abrir una nueva, y close()
+  la devuelve al pool; con CONN_MAX_AGE = 0 eso ocurre al final de cada petición, así
+  que ninguna conexión queda atada a un hilo que quizá no vuelva a usarse.
+- init_command (SET sql_mode) solo se ejecuta al abrir la conexión física, y el estado de
+  sesión que aplica Django (nivel de aislamiento, SQL_AUTO_IS_NULL) se aplica una sola
+  vez por conexión física en lugar de en cada préstamo.
+- El cambio de autocommit se omite cuando la conexión ya está en el estado pedido
+  (mysqlclient lo sabe sin consultar al servidor).
+
+Las opciones del pool van en la clave POOL del alias (SIZE, MAX_OVERFLOW, TIMEOUT,
+RECYCLE, PRE_PING), no en OPTIONS, que se pasan tal cual a MySQLdb.connect().
+"""
+from functools import partial
+
+from django.db.backends.mysql import base as mysql_base
+from django.utils.asyncio import async_unsafe
+
+from .pool import PoolTimeout as GenericPoolTimeout, get_pool
+
+Database = mysql_base.Database
+
+
+class PoolTimeout(GenericPoolTimeout, Database.OperationalError):
+    """Pool agotado; como OperationalError del driver, Django lo envuelve en django.db.OperationalError."""
+
+
+def open_physical_connection(conn_params):
+    """Abre una conexión MySQLdb igual que DatabaseWrapper.get_new_connection de Django."""
+    connection = Database.connect(**conn_params)
+    # Mismo ajuste que el backend de Django: el encoder de bytes de mysqlclient no funciona
+    if connection.encoders.get(bytes) is bytes:
+        connection.encoders.pop(bytes)
+    return connection
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        """Pool compartido del alias; se crea en la primera conexión de cualquier hilo."""
+        return get_pool(self.alias, options=self.settings_dict.get('POOL'))
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = get_pool(
+            self.alias,
+            partial(open_physical_connection, conn_params),
+            self.settings_dict.get('POOL'),
+            timeout_error=PoolTimeout,
+        )
+        return pool.checkout()
+
+    def init_connection_state(self):
+        record = self.pool.record(self.connection)
+        if record is not None and record.initialized:
+            return
+        super().init_connection_state()
+        if record is not None:
+            record.initialized = True
+
+    def _set_autocommit(self, autocommit):
+        if self.connection.get_autocommit() != autocommit:
+            super()._set_autocommit(autocommit)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        if self.in_atomic_block:
+            # Cerrada dentro de un atomic(): Django conserva la referencia y la dará por
+            # rota, así que no puede volver al pool
+            self.pool.checkin(connection, discard=True)
+            return
+
+        discard = False
+        try:
+            if not connection.get_autocommit():
+                connection.rollback()
+            elif self.errors_occurred:
+                connection.ping()
+        except Database.Error:
+            discard = True
+        self.pool.checkin(connection, discard=discard)
@@ -0,0 +1,292 @@
+# chaoscompany/db_backends/mysql_pool/pool.py
+"""
+Pool de conexiones físicas thread-safe, independiente del driver.
+
+Django crea un DatabaseWrapper por hilo (o por contexto asíncrono), así que sin pool cada
+hilo nuevo de gunicorn --threads o de sync_to_async bajo uvicorn abre su propia conexión
+TCP, con handshake, autenticación e init_command. Aquí todas las instancias del mismo
+alias comparten un único pool:
+
+- SIZE conexiones se conservan abiertas entre peticiones; hasta MAX_OVERFLOW más se abren
+  en picos y se cierran al devolverse.
+- Si no queda ninguna libre, checkout() espera hasta TIMEOUT segundos y luego lanza
+  PoolTimeout (o la subclase que indique el backend, ver base.py).
+- Las conexiones con más de RECYCLE segundos de vida se cierran en lugar de reutilizarse
+  (por debajo del wait_timeout del servidor).
+- Las que llevan más de PRE_PING segundos inactivas se comprueban con ping() antes de
+  entregarse; si el servidor las cerró se reemplazan por una nueva.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+# Configuración de logger
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_OPTIONS = {
+    'SIZE': 10,
+    'MAX_OVERFLOW': 10,
+    'TIMEOUT': 10.0,
+    'RECYCLE': 3600,
+    'PRE_PING': 30,
+}
+
+
+class PoolTimeout(Exception):
+    """
+    No se obtuvo una conexión del pool dentro del tiempo de espera. El backend lo combina
+    con el OperationalError de su driver para que Django lo trate como error de base de datos.
+    """
+
+
+class _ConnectionRecord:
+    """Metadatos de una conexión física del pool."""
+
+    __slots__ = ('created_at', 'last_used', 'initialized')
+
+    def __init__(self):
+        self.created_at = self.last_used = time.monotonic()
+        # El backend marca aquí que el estado de sesión (aislamiento, etc.) ya está aplicado
+        self.initialized = False
+
+
+class ConnectionPool:
+    """Pool de conexiones con tamaño, desbordamiento, espera y reciclado configurables."""
+
+    def __init__(self, connect, size=10, max_overflow=10, timeout=10.0, recycle=3600, pre_ping=30,
+                 name='default', timeout_error=PoolTimeout):
+        self._connect = connect
+        self.timeout_error = timeout_error
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.name = name
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()          # conexiones libres, la más recientemente usada al final
+        self._records = {}            # conexión -> _ConnectionRecord (libres y prestadas)
+        self._checked_out = 0
+        self._pending = 0             # conexiones reservadas que se están abriendo
+        self._pid = os.getpid()
+
+        # Contadores para métricas
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+
+    # ------------------------------------------------------------------
+    # Préstamo y devolución
+    # ------------------------------------------------------------------
+
+    def checkout(self):
+        """Entrega una conexión abierta, reutilizando una libre si la hay."""
+        self._check_fork()
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection = self._idle.pop()
+                    self._checked_out += 1
+                    break
+                if self._checked_out + self._pending + len(self._idle) < self.size + self.max_overflow:
+                    connection = None
+                    self._pending += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise self.timeout_error(
+                        f"Pool '{self.name}' agotado: {self._checked_out} conexiones en uso "
+                        f"(size={self.size}, max_overflow={self.max_overflow}, timeout={self.timeout}s)"
+                    )
+                self._cond.wait(remaining)
+            waited = time.monotonic() - started
+            self.wait_time += waited
+
+        if waited > 0.1:
+            logger.warning("⏳ Pool '%s': %.0f ms esperando conexión", self.name, waited * 1000)
+
+        if connection is not None:
+            connection = self._validate(connection)
+            if connection is not None:
+                return connection
+            # La conexión libre no sirve: su hueco pasa a ser una conexión nueva
+            with self._cond:
+                self._checked_out -= 1
+                self._pending += 1
+
+        return self._open()
+
+    def checkin(self, connection, discard=False):
+        """Devuelve una conexión prestada; se cierra si sobra, caducó o se pide descartarla."""
+        if self._check_fork():
+            # Conexión heredada del proceso padre: no se toca el socket compartido
+            return
+        with self._cond:
+            record = self._records.get(connection)
+            if record is None:
+                return
+            self._checked_out -= 1
+            now = time.monotonic()
+            keep = (
+                not discard
+                and len(self._idle) < self.size
+                and now - record.created_at < self.recycle
+            )
+            if keep:
+                record.last_used = now
+                self._idle.append(connection)
+            else:
+                del self._records[connection]
+                if not discard and now - record.created_at >= self.recycle:
+                    self.recycled += 1
+            self._cond.notify()
+
+        if not keep:
+            self._close_physical(connection)
+
+    def record(self, connection):
+        """Metadatos de una conexión prestada por este pool (o None si no es suya)."""
+        return self._records.get(connection)
+
+    # ------------------------------------------------------------------
+    # Mantenimiento
+    # ------------------------------------------------------------------
+
+    def dispose(self):
+        """Cierra todas las conexiones libres (las prestadas se cierran al devolverse)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            for connection in idle:
+                self._records.pop(connection, None)
+        for connection in idle:
+            self._close_physical(connection)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'idle': len(self._idle),
+                'checked_out': self._checked_out,
+                'created': self.created,
+                'reused': self.reused,
+                'recycled': self.recycled,
+                'timeouts': self.timeouts,
+                'wait_time': round(self.wait_time, 6),
+            }
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _open(self):
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._pending -= 1
+            self._checked_out += 1
+            self._records[connection] = _ConnectionRecord()
+            self.created += 1
+        return connection
+
+    def _validate(self, connection):
+        """Comprueba una conexión libre antes de entregarla; None si hay que descartarla."""
+        record = self._records[connection]
+        now = time.monotonic()
+        expired = now - record.created_at >= self.recycle
+        usable = not expired and (now - record.last_used < self.pre_ping or self._ping(connection))
+        with self._cond:
+            if usable:
+                self.reused += 1
+                return connection
+            if expired:
+                self.recycled += 1
+            self._records.pop(connection, None)
+        self._close_physical(connection)
+        return None
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            connection.ping()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_physical(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _check_fork(self):
+        """
+        Tras un fork (gunicorn --preload, multiprocessing) las conexiones heredadas
+        comparten socket con el padre: se olvidan sin cerrarlas y el hijo empieza de cero.
+        """
+        if self._pid == os.getpid():
+            return False
+        with self._cond:
+            if self._pid != os.getpid():
+                self._idle.clear()
+                self._records.clear()
+                self._checked_out = 0
+                self._pending = 0
+                self._pid = os.getpid()
+        return True
+
+
+# =========================================================================
+# REGISTRO DE POOLS POR ALIAS
+# =========================================================================
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, connect=None, options=None, timeout_error=PoolTimeout):
+    """
+    Pool compartido del alias. Se crea en la primera llamada que aporta `connect` (la
+    función que abre una conexión física) con las opciones de POOL.
+    """
+    pool = _pools.get(alias)
+    if pool is None:
+        if connect is None:
+            raise LookupError(f"El pool '{alias}' aún no tiene conexiones")
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                config = {**DEFAULT_POOL_OPTIONS, **(options or {})}
+                pool = ConnectionPool(
+                    connect,
+                    size=int(config['SIZE']),
+                    max_overflow=int(config['MAX_OVERFLOW']),
+                    timeout=float(config['TIMEOUT']),
+                    recycle=float(config['RECYCLE']),
+                    pre_ping=float(config['PRE_PING']),
+                    name=alias,
+                    timeout_error=timeout_error,
+                )
+                _pools[alias] = pool
+    return pool
+
+
+def pool_stats():
+    """Estadísticas de todos los pools del proceso, por alias."""
+    return {alias: pool.stats() for alias, pool in list(_pools.items())}
@@ -0,0 +1,252 @@
+# chaoscompany/db_router.py
+"""
+Enrutado de lecturas a réplicas MySQL (settings.REPLICA_DATABASES).
+
+Las lecturas solo van a una réplica dentro de código marcado explícitamente como de solo
+lectura: vistas decoradas con @use_replicas (perfil, confirmación de pago, páginas del
+catálogo) y los listados del admin (ReplicaChangeListMixin). Todo lo demás, y cualquier
+escritura, usa `default`.
+
+Se vuelve al primario aunque el código esté marcado cuando:
+- el usuario escribió hace menos de REPLICA_PIN_SECONDS (cookie puesta por
+  ReplicaPinningMiddleware tras cualquier escritura), para que vea sus propios cambios
+  (p. ej. la orden recién creada por process_payment);
+- la petición actual ya escribió, o hay un atomic() abierto en `default`;
+- la réplica va más de REPLICA_MAX_LAG segundos por detrás del primario o la
+  replicación está parada (se consulta SHOW REPLICA STATUS como mucho cada
+  REPLICA_LAG_CHECK_INTERVAL segundos por proceso).
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Configuración de logger
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE_NAME = 'db_pin'
+
+# Apps cuyas tablas siempre se leen del primario: una sesión recién guardada o los
+# content types no pueden depender del retraso de la réplica
+PRIMARY_ONLY_APPS = {'sessions', 'contenttypes'}
+
+
+class ReadState:
+    """Estado de enrutado de la petición (o tarea) actual."""
+
+    __slots__ = ('use_replicas', 'pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.use_replicas = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+_read_state = contextvars.ContextVar('db_read_state', default=None)
+
+
+# =========================================================================
+# MARCADO DE CÓDIGO DE SOLO LECTURA
+# =========================================================================
+
+@contextmanager
+def replica_reads():
+    """Dentro del bloque, las lecturas pueden ir a una réplica."""
+    state = _read_state.get()
+    token = None
+    if state is None:
+        state = ReadState()
+        token = _read_state.set(state)
+    previous = state.use_replicas
+    state.use_replicas = True
+    try:
+        yield state
+    finally:
+        state.use_replicas = previous
+        if token is not None:
+            _read_state.reset(token)
+
+
+def use_replicas(view_func):
+    """Decorador para vistas de solo lectura (síncronas o asíncronas)."""
+    if iscoroutinefunction(view_func):
+        async def _view_wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return await view_func(request, *args, **kwargs)
+    else:
+        def _view_wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return view_func(request, *args, **kwargs)
+    return wraps(view_func)(_view_wrapper)
+
+
+class ReplicaChangeListMixin:
+    """Para ModelAdmin: los listados (GET) leen de réplica, las acciones (POST) del primario."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method not in ('GET', 'HEAD'):
+            return super().changelist_view(request, extra_context)
+        with replica_reads():
+            return super().changelist_view(request, extra_context)
+
+
+# =========================================================================
+# RETRASO DE LAS RÉPLICAS
+# =========================================================================
+
+_lag_cache = {}
+_lag_lock = threading.Lock()
+
+
+def measure_replica_lag(alias):
+    """
+    Segundos de retraso de la réplica, 0 si el backend no es MySQL (réplicas de prueba)
+    o None si la replicación no está corriendo o no se pudo consultar.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'mysql':
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute('SHOW REPLICA STATUS')
+                column = 'Seconds_Behind_Source'
+            except DatabaseError:
+                # MySQL < 8.0.22 / MariaDB < 10.5.1
+                cursor.execute('SHOW SLAVE STATUS')
+                column = 'Seconds_Behind_Master'
+            row = cursor.fetchone()
+            if row is None:
+                # No es una réplica (p. ej. apunta al mismo servidor): sin retraso
+                return 0
+            columns = [col[0] for col in cursor.description]
+            return row[columns.index(column)]
+    except DatabaseError as e:
+        logger.warning("⚠️ No se pudo consultar el retraso de la réplica %s: %s", alias, e)
+        return None
+
+
+def replica_lag(alias):
+    """measure_replica_lag() cacheado REPLICA_LAG_CHECK_INTERVAL segundos por proceso."""
+    interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached is not None and now - cached[0] < interval:
+        return cached[1]
+    with _lag_lock:
+        cached = _lag_cache.get(alias)
+        if cached is not None and now - cached[0] < interval:
+            return cached[1]
+        # Se guarda antes de medir para que el resto de hilos no repitan la consulta
+        _lag_cache[alias] = (now, cached[1] if cached else None)
+    lag = measure_replica_lag(alias)
+    _lag_cache[alias] = (time.monotonic(), lag)
+    return lag
+
+
+def healthy_replicas():
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG', 2)
+    healthy = []
+    for alias in getattr(settings, 'REPLICA_DATABASES', []):
+        lag = replica_lag(alias)
+        if lag is not None and lag <= max_lag:
+            healthy.append(alias)
+    return healthy
+
+
+# =========================================================================
+# ROUTER
+# =========================================================================
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _read_state.get()
+        if state is None or not state.use_replicas or state.pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = healthy_replicas()
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _read_state.get()
+        if state is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, 'REPLICA_DATABASES', [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+# =========================================================================
+# MIDDLEWARE DE LECTURA DE LAS PROPIAS ESCRITURAS
+# =========================================================================
+
+class ReplicaPinningMiddleware:
+    """
+    Fija las lecturas al primario durante REPLICA_PIN_SECONDS después de que una
+    petición del mismo navegador escribiera en la base de datos.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _read_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _read_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_state.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE_NAME, 0))
+        except ValueError:
+            pinned_until = 0
+        return ReadState(pinned=pinned_until > time.time())
+
+    def finish(self, state, response):
+        if state.wrote and self.pin_seconds:
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                '%.3f' % (time.time() + self.pin_seconds),
+                max_age=self.pin_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
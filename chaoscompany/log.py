@@ -0,0 +1,149 @@
+# chaoscompany/log.py
+"""
+Logging estructurado que no bloquea el hilo de la petición.
+
+- QueueLogHandler: el único handler que ven los loggers. emit() solo mete el LogRecord
+  en una cola acotada (put_nowait); un hilo QueueListener por proceso lo formatea como
+  JSON y lo escribe en stderr y/o en un archivo. Si la cola se llena (disco o pipe
+  atascados) el registro se descarta y se cuenta, en lugar de frenar la petición.
+- A diferencia de logging.handlers.QueueHandler, prepare() no formatea el mensaje: el
+  "%s" % args se resuelve en el hilo del listener. Por eso los argumentos deben ser
+  valores simples (str, números, ids): un modelo pasado como argumento se convertiría a
+  texto en otro hilo, y su __str__ podría consultar la base de datos.
+- SamplingFilter: deja pasar solo una fracción de los registros DEBUG/INFO de los
+  loggers configurados (p. ej. las trazas "Vista X llamada" de accounts.views); los
+  WARNING y superiores nunca se muestrean.
+- JsonFormatter: una línea JSON por registro (ts, level, logger, msg, módulo, línea,
+  proceso, hilo, excepción y cualquier `extra=`).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Atributos estándar de LogRecord; el resto se considera `extra=` y va al JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    rates: {'nombre.de.logger': fracción}. Se aplica la entrada más específica cuyo
+    nombre sea prefijo del logger del registro; los loggers sin entrada no se muestrean.
+    """
+
+    def __init__(self, rates=None, max_level=logging.INFO):
+        super().__init__()
+        # Más específicos primero para que 'accounts.views' gane a 'accounts'
+        self.rates = sorted((rates or {}).items(), key=lambda item: -len(item[0]))
+        self.max_level = max_level
+        self._cache = {}
+
+    def rate_for(self, name):
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix, value in self.rates:
+                if name == prefix or name.startswith(prefix + '.'):
+                    rate = float(value)
+                    break
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    Handler de cola con su propio listener. Los destinos se construyen aquí (stderr y,
+    opcionalmente, un archivo vigilado para logrotate) porque dictConfig en Python < 3.12
+    no permite pasar otros handlers a un QueueHandler.
+    """
+
+    def __init__(self, stream='stderr', filename=None, maxsize=10000, level=logging.NOTSET):
+        super().__init__(queue.Queue(maxsize))
+        self.setLevel(level)
+        formatter = JsonFormatter()
+        self.targets = []
+        if stream:
+            target = logging.StreamHandler(sys.stdout if stream == 'stdout' else sys.stderr)
+            target.setFormatter(formatter)
+            self.targets.append(target)
+        if filename:
+            target = logging.handlers.WatchedFileHandler(filename, encoding='utf-8')
+            target.setFormatter(formatter)
+            self.targets.append(target)
+        self.dropped = 0
+        self._listener = None
+        self._listener_pid = None
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Sin formatear: el mensaje, los args y la excepción viajan tal cual al listener
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        if self._listener_pid != os.getpid():
+            self._start_listener()
+        super().emit(record)
+
+    def _start_listener(self):
+        with self._start_lock:
+            if self._listener_pid == os.getpid():
+                return
+            # Tras un fork el hilo del listener del padre no existe en el hijo
+            self._listener = logging.handlers.QueueListener(self.queue, *self.targets, respect_handler_level=True)
+            self._listener.start()
+            self._listener_pid = os.getpid()
+            atexit.register(self._stop_listener)
+
+    def _stop_listener(self):
+        listener = self._listener
+        if listener is not None and self._listener_pid == os.getpid():
+            self._listener = None
+            self._listener_pid = None
+            listener.stop()  # Vacía la cola antes de terminar
+
+    def close(self):
+        self._stop_listener()
+        for target in self.targets:
+            target.close()
+        super().close()
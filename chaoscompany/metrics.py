@@ -0,0 +1,397 @@
+# chaoscompany/metrics.py
+"""
+Instrumentación por petición: Server-Timing para staff e histogramas Prometheus en /metrics.
+
+Por cada petición MetricsMiddleware mide la latencia total y recoge lo que anotan:
+- el wrapper de ejecución SQL que se instala en cada conexión (número y tiempo de consultas),
+- TimedDjangoTemplates, el backend de plantillas (tiempo de render, incluidos los context
+  processors y las consultas perezosas que se lancen desde la plantilla),
+- chaoscompany.sessions.SessionStore (carga y guardado de la sesión).
+
+Todo se acumula en un objeto por petición guardado en un ContextVar, así que funciona
+igual bajo WSGI y ASGI (sync_to_async copia el contexto al hilo del ORM). El coste por
+petición son unas cuantas llamadas a perf_counter() y una actualización de histograma
+bajo un lock; no se guarda el SQL ni ningún dato por consulta.
+
+Las series se etiquetan con el nombre de la URL (login, cart, process_payment...). Con
+varios procesos (gunicorn -w N) cada uno vuelca sus series en METRICS_MULTIPROCESS_DIR
+cada pocos segundos y /metrics suma todos los archivos.
+"""
+import contextvars
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.utils.functional import SimpleLazyObject, empty
+from django.views.decorators.http import require_safe
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Django acepta cualquier token como método: el resto se agrupa en "other" para que un
+# cliente no pueda crear series nuevas inventando verbos
+HTTP_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'})
+
+
+class RequestMetrics:
+    """Lo medido durante una petición."""
+
+    __slots__ = ('started', 'db_queries', 'db_time', 'template_time', 'template_depth',
+                 'session_load', 'session_save')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.session_load = 0.0
+        self.session_save = 0.0
+
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def current_metrics():
+    """RequestMetrics de la petición en curso, o None fuera de una petición."""
+    return _current.get()
+
+
+# =========================================================================
+# HISTOGRAMAS
+# =========================================================================
+
+class Histogram:
+    """Histograma con etiquetas, thread-safe, con exposición en formato Prometheus."""
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # etiquetas -> [cuenta por bucket (no acumulada)..., +Inf, suma]
+        self._series = {}
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: list(series) for labels, series in self._series.items()}
+
+    def expose(self, series_by_labels):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels in sorted(series_by_labels):
+            series = series_by_labels[labels]
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labels))
+            sep = ',' if base else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {series[-1]!r}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram(
+    'chaos_http_request_duration_seconds', 'Latencia total de la petición.',
+    ('view', 'method', 'status'), LATENCY_BUCKETS)
+DB_DURATION = Histogram(
+    'chaos_db_query_duration_seconds', 'Tiempo total en consultas SQL por petición.',
+    ('view',), LATENCY_BUCKETS)
+DB_QUERIES = Histogram(
+    'chaos_db_queries_per_request', 'Número de consultas SQL por petición.',
+    ('view',), QUERY_COUNT_BUCKETS)
+TEMPLATE_DURATION = Histogram(
+    'chaos_template_render_duration_seconds', 'Tiempo de render de plantillas por petición.',
+    ('view',), LATENCY_BUCKETS)
+SESSION_DURATION = Histogram(
+    'chaos_session_duration_seconds', 'Tiempo de carga y guardado de la sesión por petición.',
+    ('view', 'operation'), LATENCY_BUCKETS)
+
+HISTOGRAMS = (REQUEST_DURATION, DB_DURATION, DB_QUERIES, TEMPLATE_DURATION, SESSION_DURATION)
+
+
+# =========================================================================
+# MULTIPROCESO
+# =========================================================================
+
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def flush_to_directory(force=False):
+    """Vuelca las series de este proceso a METRICS_MULTIPROCESS_DIR/<pid>.json."""
+    global _last_flush
+    directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+        return
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _last_flush = now
+        data = {
+            histogram.name: [[list(labels), series] for labels, series in histogram.snapshot().items()]
+            for histogram in HISTOGRAMS
+        }
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as fh:
+            json.dump(data, fh)
+        os.replace(f'{path}.tmp', path)
+    finally:
+        _flush_lock.release()
+
+
+def collect_series():
+    """Series de todos los procesos (o solo de este si no hay METRICS_MULTIPROCESS_DIR)."""
+    directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+    if not directory:
+        return {histogram.name: histogram.snapshot() for histogram in HISTOGRAMS}
+
+    flush_to_directory(force=True)
+    merged = {histogram.name: {} for histogram in HISTOGRAMS}
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        # Los archivos de procesos ya terminados se siguen sumando: los contadores de
+        # Prometheus no pueden retroceder
+        for name, entries in data.items():
+            target = merged.get(name)
+            if target is None:
+                continue
+            for labels, series in entries:
+                current = target.setdefault(tuple(labels), [0] * len(series))
+                for i, value in enumerate(series):
+                    current[i] += value
+    return merged
+
+
+def render_metrics():
+    series = collect_series()
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose(series.get(histogram.name, {})))
+    lines.extend(_pool_lines())
+    return '\n'.join(lines) + '\n'
+
+
+def _pool_lines():
+    """Estado del pool de conexiones (chaoscompany/db_backends/mysql_pool) de este proceso."""
+    from chaoscompany.db_backends.mysql_pool.pool import pool_stats
+
+    stats = pool_stats()
+    if not stats:
+        return []
+    lines = [
+        '# HELP chaos_db_pool_connections Conexiones del pool por estado (proceso que responde).',
+        '# TYPE chaos_db_pool_connections gauge',
+    ]
+    for alias, values in sorted(stats.items()):
+        for state in ('idle', 'checked_out'):
+            lines.append(f'chaos_db_pool_connections{{alias="{alias}",state="{state}"}} {values[state]}')
+    lines += [
+        '# HELP chaos_db_pool_wait_seconds_total Tiempo total esperando una conexión libre.',
+        '# TYPE chaos_db_pool_wait_seconds_total counter',
+    ]
+    for alias, values in sorted(stats.items()):
+        lines.append(f'chaos_db_pool_wait_seconds_total{{alias="{alias}"}} {values["wait_time"]}')
+    return lines
+
+
+# =========================================================================
+# SQL Y PLANTILLAS
+# =========================================================================
+
+def _sql_timer(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.db_queries += 1
+
+
+def install_sql_timer(sender, connection, **kwargs):
+    # connection_created se emite en cada connect() del mismo wrapper: instalar una sola vez
+    if _sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_timer)
+
+
+connection_created.connect(install_sql_timer, dispatch_uid='chaoscompany.metrics.sql_timer')
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        # Solo cuenta el render más externo (render_to_string anidados no se suman dos veces)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Backend DjangoTemplates que anota el tiempo de render en la petición en curso."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# =========================================================================
+# MIDDLEWARE
+# =========================================================================
+
+def _loaded_user(request):
+    """El usuario solo si ya se cargó: consultarlo aquí costaría una query (o fallaría en async)."""
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return user or getattr(request, '_acached_user', None)
+
+
+class MetricsMiddleware:
+    """
+    Debe ir el primero en MIDDLEWARE para que la latencia total incluya al resto de
+    middlewares (incluido el guardado de la sesión).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.static_prefix = settings.STATIC_URL if (settings.STATIC_URL or '').startswith('/') else None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def view_label(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            return match.url_name or match.view_name or 'unnamed'
+        if self.static_prefix and request.path.startswith(self.static_prefix):
+            return 'static'
+        return 'unmatched'
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        view = self.view_label(request)
+        if view == 'metrics':
+            return response
+
+        method = request.method if request.method in HTTP_METHODS else 'other'
+        REQUEST_DURATION.observe((view, method, f'{response.status_code // 100}xx'), total)
+        DB_QUERIES.observe((view,), metrics.db_queries)
+        if metrics.db_queries:
+            DB_DURATION.observe((view,), metrics.db_time)
+        if metrics.template_time:
+            TEMPLATE_DURATION.observe((view,), metrics.template_time)
+        if metrics.session_load:
+            SESSION_DURATION.observe((view, 'load'), metrics.session_load)
+        if metrics.session_save:
+            SESSION_DURATION.observe((view, 'save'), metrics.session_save)
+        flush_to_directory()
+
+        user = _loaded_user(request)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['Server-Timing'] = ', '.join([
+                f'total;dur={total * 1000:.1f}',
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"',
+                f'tpl;dur={metrics.template_time * 1000:.1f}',
+                f'session-load;dur={metrics.session_load * 1000:.1f}',
+                f'session-save;dur={metrics.session_save * 1000:.1f}',
+            ])
+        return response
+
+
+# =========================================================================
+# ENDPOINT /metrics
+# =========================================================================
+
+def _metrics_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        provided = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if provided and hmac.compare_digest(provided, token):
+            return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+
+
+@require_safe
+def metrics_view(request):
+    """Exposición en formato texto de Prometheus (solo con METRICS_TOKEN o desde METRICS_ALLOWED_IPS)."""
+    if not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
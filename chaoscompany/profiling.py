@@ -0,0 +1,194 @@
+# chaoscompany/profiling.py
+"""
+Captura de perfiles cProfile bajo demanda, pensada para quedarse instalada en producción.
+
+Una petición se perfila si:
+- trae la cabecera PROFILING_HEADER (X-Profile) y el usuario es staff, o el valor de la
+  cabecera coincide con PROFILING_TOKEN (útil desde curl o scripts de carga), o
+- cae dentro de la muestra aleatoria PROFILING_SAMPLE_RATE (0 por defecto).
+
+Cada perfil se guarda en PROFILING_DIR como <id>.prof (formato pstats) junto a <id>.json con
+la vista, método, estado y duración. Solo se conservan los PROFILING_MAX_FILES más recientes.
+`python manage.py profiles` los lista y resume por vista.
+
+Si la petición no se perfila el coste es una búsqueda en request.META (y un random() si
+hay muestreo): no se carga el usuario ni se toca el disco.
+
+Bajo ASGI el perfil cubre el hilo del bucle de eventos, así que puede incluir trabajo de
+otras peticiones concurrentes y no incluye lo que corre en hilos de sync_to_async.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+
+# =========================================================================
+# ALMACÉN EN DISCO
+# =========================================================================
+
+def profile_dir():
+    return settings.PROFILING_DIR
+
+
+def save_profile(profiler, meta):
+    """Escribe el perfil y sus metadatos; devuelve el id. Luego descarta los más antiguos."""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    view = re.sub(r'[^\w.-]', '_', meta['view'])
+    profile_id = f'{time.strftime("%Y%m%d-%H%M%S")}-{view}-{uuid.uuid4().hex[:8]}'
+    base = os.path.join(directory, profile_id)
+    profiler.dump_stats(base + '.prof')
+    # El .json se escribe al final: un perfil sin .json está a medio escribir
+    tmp = base + '.json.tmp'
+    with open(tmp, 'w', encoding='utf-8') as handle:
+        json.dump(dict(meta, id=profile_id), handle)
+    os.replace(tmp, base + '.json')
+    rotate_profiles(settings.PROFILING_MAX_FILES)
+    return profile_id
+
+
+def list_profiles():
+    """Metadatos de los perfiles guardados, del más antiguo al más reciente."""
+    directory = profile_dir()
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.json')]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        meta['path'] = os.path.join(directory, name[:-len('.json')] + '.prof')
+        profiles.append(meta)
+    return sorted(profiles, key=lambda meta: meta.get('created', 0))
+
+
+def delete_profile(meta):
+    for path in (meta['path'], meta['path'][:-len('.prof')] + '.json'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def rotate_profiles(max_files):
+    profiles = list_profiles()
+    for meta in profiles[:max(len(profiles) - max_files, 0)]:
+        delete_profile(meta)
+
+
+# =========================================================================
+# MIDDLEWARE
+# =========================================================================
+
+class ProfilingMiddleware:
+    """
+    Va después de AuthenticationMiddleware (para comprobar is_staff), así que el perfil no
+    incluye sesión ni autenticación: solo el resto de middlewares, la vista y la plantilla.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.meta_key = 'HTTP_' + settings.PROFILING_HEADER.upper().replace('-', '_')
+        self.token = settings.PROFILING_TOKEN
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        requested = self.meta_key in request.META
+        if not requested and not self.sampled():
+            return self.get_response(request)
+        if requested and not self.authorized(request, request.user):
+            return self.get_response(request)
+        return self.profile(request, 'header' if requested else 'sample')
+
+    async def __acall__(self, request):
+        requested = self.meta_key in request.META
+        if not requested and not self.sampled():
+            return await self.get_response(request)
+        if requested and not self.authorized(request, await request.auser()):
+            return await self.get_response(request)
+        return await self.aprofile(request, 'header' if requested else 'sample')
+
+    def sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def authorized(self, request, user):
+        provided = request.META[self.meta_key]
+        if self.token and provided and hmac.compare_digest(provided, self.token):
+            return True
+        return user.is_authenticated and user.is_staff
+
+    def profile(self, request, trigger):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+: ya hay otro profiler activo en este hilo
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.store(request, response, profiler, trigger, time.perf_counter() - started)
+
+    async def aprofile(self, request, trigger):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        return await sync_to_async(self.store, thread_sensitive=False)(
+            request, response, profiler, trigger, time.perf_counter() - started,
+        )
+
+    def store(self, request, response, profiler, trigger, duration):
+        match = getattr(request, 'resolver_match', None)
+        meta = {
+            'view': (match.url_name or match.view_name) if match is not None else 'unmatched',
+            'url': request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'trigger': trigger,
+            'created': time.time(),
+            'pid': os.getpid(),
+        }
+        try:
+            profile_id = save_profile(profiler, meta)
+        except OSError:
+            logger.exception("❌ No se pudo guardar el perfil de %s", request.path)
+            return response
+        if trigger == 'header':
+            response['X-Profile-Id'] = profile_id
+        return response
@@ -0,0 +1,46 @@
+# chaoscompany/sessions.py
+"""
+SESSION_ENGINE de base de datos que anota en chaoscompany.metrics cuánto tarda la
+petición en cargar y guardar su sesión.
+"""
+import time
+from contextlib import contextmanager
+
+from django.contrib.sessions.backends import db
+
+from .metrics import current_metrics
+
+
+class SessionStore(db.SessionStore):
+    _timing = False
+
+    @contextmanager
+    def _timed(self, field):
+        metrics = current_metrics()
+        # save() -> create() -> save(must_create=True): solo se mide la llamada externa
+        if metrics is None or self._timing:
+            yield
+            return
+        self._timing = True
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._timing = False
+            setattr(metrics, field, getattr(metrics, field) + time.perf_counter() - started)
+
+    def load(self):
+        with self._timed('session_load'):
+            return super().load()
+
+    async def aload(self):
+        with self._timed('session_load'):
+            return await super().aload()
+
+    def save(self, must_create=False):
+        with self._timed('session_save'):
+            return super().save(must_create)
+
+    async def asave(self, must_create=False):
+        with self._timed('session_save'):
+            return await super().asave(must_create)
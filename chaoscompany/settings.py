@@ -2,6 +2,17 @@
 from pathlib import Path
 import os
 
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    return default if value is None else value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return default if value in (None, '') else int(value)
+
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -34,20 +45,53 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
 MIDDLEWARE = [
+    'chaoscompany.metrics.MetricsMiddleware',  # Primero: mide la latencia total (Server-Timing y /metrics)
     'django.middleware.security.SecurityMiddleware',
+    'chaoscompany.staticfiles.StaticFilesMiddleware',  # Sirve STATIC_ROOT (precomprimido) sin pasar por las vistas
+    'chaoscompany.db_router.ReplicaPinningMiddleware',  # Lecturas al primario justo después de escribir
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'chaoscompany.profiling.ProfilingMiddleware',  # Perfil cProfile bajo demanda (cabecera X-Profile de staff)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'chaoscompany.urls'
 
+# Sesiones en base de datos, midiendo carga y guardado (chaoscompany/sessions.py)
+SESSION_ENGINE = 'chaoscompany.sessions'
+
+# Métricas por petición (chaoscompany/metrics.py): cabecera Server-Timing para staff (o con
+# DEBUG) e histogramas Prometheus en /metrics, accesible con "Authorization: Bearer
+# $METRICS_TOKEN" o desde las IPs de METRICS_ALLOWED_IPS (separadas por comas, vacío por
+# defecto: detrás de nginx todas las peticiones llegan desde 127.0.0.1). Con varios
+# workers, cada proceso vuelca sus series en METRICS_MULTIPROCESS_DIR y /metrics las suma.
+METRICS_ENABLED = env_bool('METRICS_ENABLED', True)
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR') or None
+METRICS_FLUSH_INTERVAL = 5  # Segundos entre volcados al directorio compartido
+
+# Perfiles bajo demanda (chaoscompany/profiling.py): una petición con la cabecera X-Profile de
+# un usuario staff (o con el valor PROFILING_TOKEN), o una fracción PROFILING_SAMPLE_RATE de
+# todas, se ejecuta bajo cProfile y se guarda en PROFILING_DIR. `manage.py profiles` los resume.
+PROFILING_ENABLED = env_bool('PROFILING_ENABLED', True)
+PROFILING_HEADER = 'X-Profile'
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_DIR = os.environ.get('PROFILING_DIR') or os.path.join(BASE_DIR, 'profiles')
+PROFILING_MAX_FILES = env_int('PROFILING_MAX_FILES', 200)  # Los más antiguos se borran
+
+# Vistas asíncronas (accounts/async_views.py, main/async_views.py) para perfil, carrito,
+# pago y páginas públicas. Solo compensan bajo un servidor ASGI: chaoscompany/asgi.py
+# activa DJANGO_ASYNC_VIEWS=1 por defecto y chaoscompany/wsgi.py lo deja desactivado.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'chaoscompany.metrics.TimedDjangoTemplates',  # DjangoTemplates + tiempo de render
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -64,20 +108,59 @@ TEMPLATES = [
 WSGI_APPLICATION = 'chaoscompany.wsgi.application'
 
 # Database - Configurado para MySQL
+# Base de datos configurable por entorno (DB_*); los valores por defecto son los de desarrollo.
+# Con el backend mysql_pool (chaoscompany/db_backends/mysql_pool) las conexiones físicas se
+# comparten entre hilos: CONN_MAX_AGE = 0 significa "devolver al pool al terminar cada
+# petición", no "cerrar". Con DB_ENGINE=django.db.backends.mysql se usan conexiones
+# persistentes por hilo (DB_CONN_MAX_AGE, 60 s por defecto).
+DB_ENGINE = os.environ.get('DB_ENGINE', 'chaoscompany.db_backends.mysql_pool')
+DB_POOLED = DB_ENGINE == 'chaoscompany.db_backends.mysql_pool'
+# Se ejecuta una sola vez por conexión física; vacío para depender del sql_mode global del servidor
+DB_INIT_COMMAND = os.environ.get('DB_INIT_COMMAND', "SET sql_mode='STRICT_TRANS_TABLES'")
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',      # Cambiado a MySQL
-        'NAME': 'chaoscompany_db',                 # Nombre de BD en HeidiSQL
-        'USER': 'root',                           # Usuario MySQL
-        'PASSWORD': 'GamesManiac4',               # Contraseña MySQL
-        'HOST': 'localhost',                      # Servidor MySQL
-        'PORT': '3306',                           # Puerto MySQL
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        }
+        'ENGINE': DB_ENGINE,                                          # MySQL (con pool por defecto)
+        'NAME': os.environ.get('DB_NAME', 'chaoscompany_db'),         # Nombre de BD en HeidiSQL
+        'USER': os.environ.get('DB_USER', 'root'),                    # Usuario MySQL
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'GamesManiac4'),    # Contraseña MySQL
+        'HOST': os.environ.get('DB_HOST', 'localhost'),               # Servidor MySQL
+        'PORT': os.environ.get('DB_PORT', '3306'),                    # Puerto MySQL
+        'CONN_MAX_AGE': env_int('DB_CONN_MAX_AGE', 0 if DB_POOLED else 60),
+        'CONN_HEALTH_CHECKS': env_bool('DB_CONN_HEALTH_CHECKS', True),
+        'OPTIONS': {'init_command': DB_INIT_COMMAND} if DB_INIT_COMMAND else {},
+        'POOL': {
+            'SIZE': env_int('DB_POOL_SIZE', 10),              # Conexiones que se mantienen abiertas
+            'MAX_OVERFLOW': env_int('DB_POOL_MAX_OVERFLOW', 10),  # Extra en picos, se cierran al devolverse
+            'TIMEOUT': env_int('DB_POOL_TIMEOUT', 10),        # Segundos esperando una conexión libre
+            'RECYCLE': env_int('DB_POOL_RECYCLE', 3600),      # Vida máxima (< wait_timeout de MySQL)
+            'PRE_PING': env_int('DB_POOL_PRE_PING', 30),      # Ping si estuvo inactiva más de N segundos
+        },
     }
 }
 
+# Réplicas de lectura (chaoscompany/db_router.py): DB_REPLICAS="host1:3306,host2:3306".
+# Solo reciben las lecturas de vistas marcadas con @use_replicas y de los listados del admin.
+# En los tests son espejos de `default` (TEST.MIRROR), salvo en chaoscompany/settings_test.py.
+REPLICA_DATABASES = []
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    replica_host, _, replica_port = replica.strip().partition(':')
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['chaoscompany.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = env_int('DB_REPLICA_PIN_SECONDS', 5)   # Lectura de las propias escrituras
+REPLICA_MAX_LAG = env_int('DB_REPLICA_MAX_LAG', 2)           # Segundos de retraso tolerados
+REPLICA_LAG_CHECK_INTERVAL = 5                               # Cada cuánto se consulta el retraso
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -97,6 +180,8 @@ AUTH_PASSWORD_VALIDATORS = [
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@chaoscompany.com'
+# URL pública del sitio para los enlaces de los correos enviados fuera de una petición
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
 
 # Gmail :
 # Configuración para enviar correos con Gmail SMTP
@@ -121,14 +206,125 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']  # Directorio para archivos estáticos
 STATIC_ROOT = BASE_DIR / 'staticfiles'    # Directorio para collectstatic
 
+# collectstatic genera nombres con hash y variantes .gz/.br de cada archivo comprimible
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'chaoscompany.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# En producción el propio servidor de aplicaciones sirve STATIC_ROOT (ver chaoscompany/staticfiles.py).
+# En desarrollo runserver sigue sirviendo directamente desde static/.
+SERVE_STATIC = not DEBUG
+STATIC_MAX_AGE = 60  # Segundos de caché para archivos sin hash en el nombre
+
 import os
 
 # Configuración de archivos multimedia
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Entrega de MEDIA_URL (accounts.views.serve_media):
+#   None    -> FileResponse con soporte de Range/ETag (sendfile si el servidor WSGI lo ofrece)
+#   'nginx' -> X-Accel-Redirect hacia MEDIA_ACCEL_REDIRECT_PREFIX (location interna de nginx)
+#   'apache'-> X-Sendfile con la ruta absoluta (mod_xsendfile)
+MEDIA_SENDFILE_BACKEND = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_PUBLIC_PREFIXES = ['profile_pictures/', 'profiles/']
+MEDIA_MAX_AGE = 3600  # Segundos de caché para archivos sin hash en el nombre
+
+# Recibos HTML/PDF de las órdenes completadas (accounts/receipts.py). Fuera de MEDIA_ROOT:
+# solo los entrega la vista, a su propietario.
+RECEIPTS_ROOT = os.environ.get('RECEIPTS_ROOT') or os.path.join(BASE_DIR, 'receipts')
+
+# Pasarela de pago (accounts/gateways.py). Sin PAYMENT_GATEWAY_URL los pagos se simulan en
+# proceso; con ella se usa HttpGateway con timeouts, keep-alive, bulkhead y circuit breaker.
+# `manage.py fake_gateway` levanta una pasarela local con latencia y errores inyectables.
+PAYMENT_GATEWAY_URL = os.environ.get('PAYMENT_GATEWAY_URL', '')
+PAYMENT_GATEWAY = {
+    'BACKEND': 'accounts.gateways.HttpGateway' if PAYMENT_GATEWAY_URL else 'accounts.gateways.SimulatedGateway',
+    'URL': PAYMENT_GATEWAY_URL,
+    'API_KEY': os.environ.get('PAYMENT_GATEWAY_API_KEY', ''),
+    'CONNECT_TIMEOUT': 1.0,    # Segundos para abrir la conexión TCP/TLS
+    'READ_TIMEOUT': 5.0,       # Segundos esperando la respuesta del cargo
+    'POOL_SIZE': 10,           # Conexiones keep-alive libres que se conservan por proceso
+    'MAX_CONCURRENT': env_int('PAYMENT_GATEWAY_MAX_CONCURRENT', 20),  # Cargos en vuelo por proceso
+    'BULKHEAD_TIMEOUT': 0.1,   # Espera máxima por un hueco antes de rechazar el pago
+    'FAILURE_THRESHOLD': 5,    # Fallos seguidos que abren el circuito
+    'RESET_TIMEOUT': 30.0,     # Segundos con el circuito abierto antes del cargo de prueba
+}
+
+# Webhooks de estado de pagos (accounts/webhooks.py): POST firmado a /accounts/payment/webhook/,
+# se guardan al instante y `manage.py process_payment_webhooks` los aplica por lotes.
+# Sin PAYMENT_WEBHOOK_SECRET el endpoint responde 404.
+PAYMENT_WEBHOOK_SECRET = os.environ.get('PAYMENT_WEBHOOK_SECRET', '')
+PAYMENT_WEBHOOK_TOLERANCE = 300     # Antigüedad máxima de la firma, en segundos
+PAYMENT_WEBHOOK_MAX_EVENTS = 1000   # Eventos por petición
+
+# Tokens de derechos para los servidores de juego (accounts/entitlements.py), firmados con
+# HMAC y verificables sin llamar a Django. ENTITLEMENT_KEYS="kid:secreto,kid2:secreto2"; se
+# firma con ENTITLEMENT_ACTIVE_KEY (por defecto la primera) y se aceptan todas, para rotar.
+# Sin claves no se emiten tokens y /accounts/entitlement/ responde 404.
+ENTITLEMENT_KEYS = dict(
+    item.split(':', 1) for item in os.environ.get('ENTITLEMENT_KEYS', '').split(',') if ':' in item
+)
+ENTITLEMENT_ACTIVE_KEY = os.environ.get('ENTITLEMENT_ACTIVE_KEY', next(iter(ENTITLEMENT_KEYS), ''))
+ENTITLEMENT_TTL = env_int('ENTITLEMENT_TTL', 300)   # Segundos de vida de cada token
+
 # Configuración de autenticación
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 # Default primary key field type
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Logging: los hilos de las peticiones solo encolan el LogRecord (chaoscompany/log.py); un
+# hilo por proceso lo formatea como JSON y lo escribe. Las trazas INFO/DEBUG de las vistas
+# más transitadas se muestrean (LOG_INFO_SAMPLE_RATE) salvo en DEBUG.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO')
+LOG_INFO_SAMPLE_RATE = float(os.environ.get('LOG_INFO_SAMPLE_RATE', '1.0' if DEBUG else '0.1'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'require_debug_false': {
+            '()': 'django.utils.log.RequireDebugFalse',
+        },
+        'sampling': {
+            '()': 'chaoscompany.log.SamplingFilter',
+            'rates': {
+                'accounts.views': LOG_INFO_SAMPLE_RATE,
+                'accounts.async_views': LOG_INFO_SAMPLE_RATE,
+                'main.views': LOG_INFO_SAMPLE_RATE,
+                'main.async_views': LOG_INFO_SAMPLE_RATE,
+            },
+        },
+    },
+    'handlers': {
+        'queue': {
+            '()': 'chaoscompany.log.QueueLogHandler',
+            'filename': os.environ.get('LOG_FILE') or None,
+            'maxsize': env_int('LOG_QUEUE_SIZE', 10000),
+            'filters': ['sampling'],
+        },
+        # El mismo aviso por correo a ADMINS de los errores 500 que trae Django por defecto
+        'mail_admins': {
+            'level': 'ERROR',
+            'filters': ['require_debug_false'],
+            'class': 'django.utils.log.AdminEmailHandler',
+        },
+    },
+    'root': {
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        # Django ya propaga a root; se quita su handler de consola para no escribir dos veces
+        # y se conserva mail_admins
+        'django': {'handlers': ['mail_admins'], 'level': 'INFO'},
+        'django.server': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+    },
+}
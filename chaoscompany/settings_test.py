@@ -0,0 +1,40 @@
+# chaoscompany/settings_test.py
+"""
+Ajustes para ejecutar los tests sin servidor MySQL:
+
+    python manage.py test --settings=chaoscompany.settings_test
+
+`default` y `replica1` son dos bases SQLite independientes (sin MIRROR), así los tests
+del router pueden comprobar de qué base sale realmente cada lectura.
+"""
+import os
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+# Fuera del árbol del proyecto, como RECEIPTS_ROOT: aquí crean los archivos SQLite los
+# comandos (check, migrate, shell...) que se lanzan con estos ajustes
+DATABASE_DIR = tempfile.mkdtemp(prefix='chaoscompany-db-')
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(DATABASE_DIR, 'default.sqlite3'),
+    },
+    'replica1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(DATABASE_DIR, 'replica1.sqlite3'),
+    },
+}
+REPLICA_DATABASES = ['replica1']
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Sin collectstatic no hay manifiesto: {% static %} usaría nombres que no existen y fallaría
+STORAGES = {**STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+
+# Los recibos generados por los tests no van al árbol del proyecto
+RECEIPTS_ROOT = tempfile.mkdtemp(prefix='chaoscompany-receipts-')
+
+# Solo avisos y errores en la salida de los tests
+LOGGING['root']['level'] = 'WARNING'
@@ -0,0 +1,402 @@
+# chaoscompany/staticfiles.py
+"""
+Servicio de archivos estáticos desde el propio servidor de aplicaciones.
+
+- CompressedManifestStaticFilesStorage: en `collectstatic` minifica CSS/JS, genera nombres
+  con hash (styles.3f2a1c.css) y precalcula variantes .gz y .br de los archivos comprimibles.
+- StaticFilesMiddleware: sirve STATIC_ROOT a partir de un índice construido al arrancar
+  (rutas, tamaños, ETags y variantes), eligiendo la mejor codificación según
+  Accept-Encoding, con `Cache-Control: immutable` para los nombres con hash y respuestas
+  304 para peticiones condicionales. El cuerpo sale con FileResponse: bajo WSGI el
+  servidor lo envía con wsgi.file_wrapper (sendfile), sin copiarlo en memoria.
+"""
+import gzip
+import json
+import mimetypes
+import os
+import posixpath
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se generan variantes gzip
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.txt', '.html', '.xml', '.map', '.ico'}
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Caracteres tras los cuales una "/" en JavaScript inicia una expresión regular y no una división
+JS_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^\n')
+JS_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw'}
+
+
+# =========================================================================
+# MINIFICACIÓN
+# =========================================================================
+
+def _scan_string(source, start):
+    """Devuelve el índice siguiente al cierre de la cadena que empieza en `start`."""
+    quote = source[start]
+    i = start + 1
+    while i < len(source) and source[i] != quote:
+        i += 2 if source[i] == '\\' else 1
+    return i + 1
+
+
+def minify_css(source):
+    """Quita comentarios y espacios innecesarios sin tocar el contenido de las cadenas."""
+    out = []
+    pending_space = False
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char.isspace():
+            pending_space = True
+            i += 1
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = len(source) if end == -1 else end + 2
+            continue
+
+        if pending_space and out and out[-1] not in '{};,>:' and char not in '{};,>':
+            out.append(' ')
+        pending_space = False
+
+        if char in '"\'':
+            end = _scan_string(source, i)
+            out.append(source[i:end])
+            i = end
+            continue
+        if char == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def minify_js(source):
+    """
+    Minificación conservadora de JavaScript: elimina comentarios, sangrías y líneas vacías.
+    Los saltos de línea se conservan para no alterar la inserción automática de punto y coma.
+    """
+    out = []
+    last_significant = ''
+    last_word = ''
+    i = 0
+    length = len(source)
+    while i < length:
+        char = source[i]
+
+        if char.isspace():
+            j = i
+            while j < length and source[j].isspace():
+                j += 1
+            if out:
+                if '\n' in source[i:j]:
+                    if out[-1] == ' ':
+                        out.pop()
+                    if out and out[-1] != '\n':
+                        out.append('\n')
+                elif out[-1] not in ' \n':
+                    out.append(' ')
+            i = j
+            continue
+
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = length if end == -1 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            comment_end = length if end == -1 else end + 2
+            # Un comentario cuenta como espacio, y si abarca varias líneas como un salto de
+            # línea para el ASI
+            if '\n' in source[i:comment_end]:
+                if out and out[-1] == ' ':
+                    out.pop()
+                if out and out[-1] != '\n':
+                    out.append('\n')
+            elif out and out[-1] not in ' \n':
+                out.append(' ')
+            i = comment_end
+            continue
+
+        if char in '"\'`':
+            end = _scan_string(source, i)
+            out.append(source[i:end])
+            last_significant, last_word = char, ''
+            i = end
+            continue
+
+        if char == '/' and (last_significant in JS_REGEX_PRECEDERS or last_significant == '' or last_word in JS_REGEX_KEYWORDS):
+            j = i + 1
+            in_class = False
+            while j < length and source[j] != '\n':
+                if source[j] == '\\':
+                    j += 2
+                    continue
+                if source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                elif source[j] == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < length and source[j].isalpha():
+                j += 1
+            out.append(source[i:j])
+            last_significant, last_word = '/', ''
+            i = j
+            continue
+
+        if char.isalnum() or char in '_$':
+            j = i
+            while j < length and (source[j].isalnum() or source[j] in '_$'):
+                j += 1
+            last_word = source[i:j]
+            out.append(last_word)
+            last_significant = last_word[-1]
+            i = j
+            continue
+
+        out.append(char)
+        last_significant, last_word = char, ''
+        i += 1
+
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+# =========================================================================
+# COLLECTSTATIC: NOMBRES CON HASH + VARIANTES COMPRIMIDAS
+# =========================================================================
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Tamaño mínimo para que valga la pena comprimir
+    min_compress_size = 256
+    # Archivos de terceros que ya vienen minificados o que no conviene tocar
+    minify_exclude_prefixes = ('admin/',)
+
+    def _save(self, name, content):
+        # collectstatic copia cada archivo con save(); se minifica antes de calcular el hash
+        minifier = MINIFIERS.get(os.path.splitext(name)[1].lower())
+        if minifier and '.min.' not in name and not name.startswith(self.minify_exclude_prefixes):
+            content.seek(0)
+            content = ContentFile(minifier(content.read().decode('utf-8')).encode('utf-8'))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        try:
+            with open(path, 'rb') as source:
+                data = source.read()
+        except FileNotFoundError:
+            return
+        if len(data) < self.min_compress_size:
+            return
+
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+
+        for suffix, compressed in variants.items():
+            # Solo se guarda la variante si realmente ahorra bytes
+            if len(compressed) < len(data) * 0.95:
+                temp_path = f'{path}{suffix}.tmp'
+                with open(temp_path, 'wb') as target:
+                    target.write(compressed)
+                os.replace(temp_path, path + suffix)
+
+
+# =========================================================================
+# ÍNDICE DE ARCHIVOS SERVIDOS
+# =========================================================================
+
+class StaticVariant:
+    """Una representación concreta (identidad, gzip o br) de un archivo estático."""
+
+    def __init__(self, path, encoding, stat):
+        self.path = path
+        self.encoding = encoding
+        self.size = stat.st_size
+        suffix = f'-{encoding}' if encoding else ''
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{suffix}"'
+
+
+class StaticAsset:
+    def __init__(self, name, path, immutable):
+        stat = os.stat(path)
+        self.name = name
+        self.immutable = immutable
+        self.last_modified = http_date(stat.st_mtime)
+        self.last_modified_timestamp = int(stat.st_mtime)
+        self.content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type in ('application/javascript', 'application/json'):
+            self.content_type += '; charset=utf-8'
+
+        self.variants = {None: StaticVariant(path, None, stat)}
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            if os.path.isfile(path + suffix):
+                self.variants[encoding] = StaticVariant(path + suffix, encoding, os.stat(path + suffix))
+
+    def choose_variant(self, accept_encoding):
+        if len(self.variants) > 1 and accept_encoding:
+            accepted = parse_accept_encoding(accept_encoding)
+            for encoding in ('br', 'gzip'):
+                if encoding in self.variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                    return self.variants[encoding]
+        return self.variants[None]
+
+
+def parse_accept_encoding(header):
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def build_static_index(root, prefix):
+    """Recorre STATIC_ROOT y devuelve {url: StaticAsset}, marcando como inmutables los nombres con hash."""
+    immutable_names = set()
+    manifest_path = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, encoding='utf-8') as manifest:
+            immutable_names.update(json.load(manifest).get('paths', {}).values())
+
+    index = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br', '.tmp')):
+                continue
+            path = os.path.join(directory, filename)
+            name = posixpath.join(*os.path.relpath(path, root).split(os.sep))
+            index[prefix + name] = StaticAsset(name, path, name in immutable_names)
+    return index
+
+
+# =========================================================================
+# MIDDLEWARE
+# =========================================================================
+
+class StaticFilesMiddleware:
+    """
+    Sirve STATIC_URL antes de que la petición llegue al resto de middlewares.
+    Funciona igual bajo WSGI y ASGI: todo lo que decide la respuesta (variante,
+    cabeceras, 304) sale del índice en memoria y solo se abre el archivo a enviar.
+    """
+
+    # Bloques de lectura cuando el servidor no ofrece wsgi.file_wrapper
+    block_size = 64 * 1024
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVE_STATIC', False) or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        prefix = settings.STATIC_URL
+        if not prefix.startswith('/'):
+            # STATIC_URL apunta a otro host (CDN): nada que servir aquí
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+        self.prefix = prefix
+        self.max_age = getattr(settings, 'STATIC_MAX_AGE', 60)
+        self.files = build_static_index(str(settings.STATIC_ROOT), prefix)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.serve(request)
+        if response is None:
+            response = self.get_response(request)
+        return response
+
+    async def __acall__(self, request):
+        response = self.serve(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        asset = self.files.get(request.path_info)
+        if asset is None:
+            return None
+
+        variant = asset.choose_variant(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        headers = {
+            'ETag': variant.etag,
+            'Last-Modified': asset.last_modified,
+            'Cache-Control': IMMUTABLE_CACHE_CONTROL if asset.immutable else f'public, max-age={self.max_age}',
+        }
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if self.is_not_modified(request, asset, variant):
+            response = HttpResponseNotModified()
+            for header, value in headers.items():
+                response[header] = value
+            return response
+
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=asset.content_type)
+        else:
+            try:
+                response = FileResponse(open(variant.path, 'rb'), content_type=asset.content_type)
+            except FileNotFoundError:
+                # Borrado después de construir el índice (collectstatic --clear en caliente)
+                return None
+            response.block_size = self.block_size
+            # FileResponse añade "inline; filename=..." con el nombre en disco (.gz/.br incluidos)
+            del response['Content-Disposition']
+        for header, value in headers.items():
+            response[header] = value
+        if variant.encoding:
+            response['Content-Encoding'] = variant.encoding
+        response['Content-Length'] = str(variant.size)
+        return response
+
+    def is_not_modified(self, request, asset, variant):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # If-None-Match tiene prioridad sobre If-Modified-Since (RFC 9110 §13.1.3)
+            candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in candidates or variant.etag in candidates
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and asset.last_modified_timestamp <= if_modified_since
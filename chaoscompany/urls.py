@@ -1,16 +1,23 @@
 from django.contrib import admin
-from django.urls import path, include
-from main import views as main_views
+from django.urls import path, re_path, include
+from main import views as main_views, async_views as main_async_views
+from accounts import views as accounts_views
 from django.conf import settings
-from django.conf.urls.static import static
+from chaoscompany.metrics import metrics_view
+
+# En modo ASGI (settings.ASYNC_VIEWS) las páginas de mayor tráfico usan su versión asíncrona
+hot_views = main_async_views if settings.ASYNC_VIEWS else main_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', main_views.index, name='index'),
-    path('gamepass/', main_views.gamepass, name='gamepass'),
-    path('membresias/', main_views.membresias, name='membresias'),
-    path('ventajas/', main_views.ventajas, name='ventajas'),
+    path('metrics', metrics_view, name='metrics'),
+    path('', hot_views.index, name='index'),
+    path('gamepass/', hot_views.gamepass, name='gamepass'),
+    path('membresias/', hot_views.membresias, name='membresias'),
+    path('ventajas/', hot_views.ventajas, name='ventajas'),
     path('game-session/', main_views.game_session, name='game_session'),
+    path('api/catalog/rows/', main_views.catalog_rows, name='catalog_rows'),
+    path('api/catalog/rows/<slug:slug>/cards/', main_views.catalog_cards, name='catalog_cards'),
     
     # URLs del carrito y pagos
     path('cart/', main_views.cart, name='cart'),
@@ -22,4 +29,7 @@ urlpatterns = [
     path('payment/cancel/', main_views.payment_cancel, name='payment_cancel'),
     
     path('accounts/', include('accounts.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+
+    # Archivos subidos por usuarios (también en producción, ver accounts.views.serve_media)
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), accounts_views.serve_media, name='media'),
+]
\ No newline at end of file
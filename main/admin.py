@@ -1,3 +1,23 @@
 from django.contrib import admin
+from chaoscompany.db_router import ReplicaChangeListMixin
+from .models import CatalogCategory, CatalogEntry, CatalogGame
 
-# Register your models here.
+class CatalogEntryInline(admin.TabularInline):
+    model = CatalogEntry
+    extra = 0
+    autocomplete_fields = ('game',)
+    ordering = ('position', 'id')
+
+class CatalogCategoryAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ('name', 'slug', 'position')
+    list_editable = ('position',)
+    prepopulated_fields = {'slug': ('name',)}
+    inlines = [CatalogEntryInline]
+
+class CatalogGameAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ('title', 'slug', 'image')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+
+admin.site.register(CatalogCategory, CatalogCategoryAdmin)
+admin.site.register(CatalogGame, CatalogGameAdmin)
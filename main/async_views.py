@@ -0,0 +1,35 @@
+# main/async_views.py
+"""
+Versiones asíncronas de las páginas públicas de main (inicio, gamepass, membresías, ventajas).
+
+Se enrutan cuando settings.ASYNC_VIEWS está activo (ver chaoscompany/asgi.py). Solo
+resuelven el usuario de forma asíncrona antes de renderizar; el resto es idéntico a
+main/views.py.
+"""
+from django.shortcuts import render
+from accounts.async_views import aget_request_user
+from chaoscompany.db_router import use_replicas
+from .catalog import arows_page
+from .views import gamepass_context
+
+@use_replicas
+async def index(request):
+    await aget_request_user(request)
+    return render(request, 'main/index.html', {'title': 'Inicio'})
+
+@use_replicas
+async def membresias(request):
+    await aget_request_user(request)
+    return render(request, 'main/membresias.html', {'title': 'Membresías'})
+
+@use_replicas
+async def gamepass(request):
+    await aget_request_user(request)
+    context = gamepass_context()
+    context['catalog'] = await arows_page()
+    return render(request, 'main/gamepass.html', context)
+
+@use_replicas
+async def ventajas(request):
+    await aget_request_user(request)
+    return render(request, 'main/ventajas.html', {'title': 'Ventajas'})
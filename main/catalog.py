@@ -0,0 +1,127 @@
+# main/catalog.py
+"""
+Catálogo de gamepass por filas (una por categoría) paginado por clave.
+
+La página solo incluye las primeras CATALOG_ROWS filas con CATALOG_CARDS tarjetas cada
+una; static/scripts.js pide el resto a la API JSON al desplazarse. Tanto las filas como
+las tarjetas de una fila se recorren por (position, id) con WHERE (position, id) > cursor
+sobre un índice: cada página cuesta lo mismo sea cual sea el tamaño del catálogo, a
+diferencia de OFFSET, que recorre todo lo anterior.
+
+El cursor es "<position>-<id>" del último elemento devuelto; `next` es None al final.
+"""
+from django.db.models import Q
+from django.templatetags.static import static
+from django.urls import reverse
+
+from .models import CatalogCategory, CatalogEntry
+
+CATALOG_ROWS = 3        # Filas por página
+CATALOG_CARDS = 8       # Tarjetas por fila y página
+MAX_PAGE_SIZE = 50
+CACHE_SECONDS = 300     # Las respuestas de la API no dependen del usuario
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        position, pk = (int(part) for part in cursor.split('-'))
+    except ValueError:
+        raise InvalidCursor(f'Cursor no válido: {cursor!r}')
+    return position, pk
+
+
+def page_size(value, default):
+    """Tamaño de página pedido en la query string, entre 1 y MAX_PAGE_SIZE."""
+    if value in (None, ''):
+        return default
+    try:
+        size = int(value)
+    except ValueError:
+        raise ValueError(f'Tamaño de página no válido: {value!r}')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _after(queryset, cursor):
+    after = parse_cursor(cursor)
+    if after is None:
+        return queryset
+    position, pk = after
+    return queryset.filter(Q(position__gt=position) | Q(position=position, pk__gt=pk))
+
+
+def row_queryset(after=None):
+    return _after(CatalogCategory.objects.order_by('position', 'id'), after)
+
+
+def card_queryset(category_id, after=None):
+    return _after(
+        CatalogEntry.objects.filter(category_id=category_id)
+        .select_related('game').only('position', 'game__title', 'game__slug', 'game__description', 'game__image')
+        .order_by('position', 'id'),
+        after,
+    )
+
+
+def _page(items, limit):
+    """Recorta a `limit` los `limit + 1` elementos leídos y calcula el cursor siguiente."""
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, f'{items[-1].position}-{items[-1].pk}'
+
+
+def card_payload(entry):
+    game = entry.game
+    return {
+        'title': game.title,
+        'slug': game.slug,
+        'description': game.description,
+        'image': static(game.image),
+    }
+
+
+def cards_payload(entries, limit):
+    entries, next_cursor = _page(entries, limit)
+    return {'cards': [card_payload(entry) for entry in entries], 'next': next_cursor}
+
+
+def row_payload(category, entries, cards):
+    return {
+        'slug': category.slug,
+        'name': category.name,
+        'cards_url': reverse('catalog_cards', args=[category.slug]),
+        **cards_payload(entries, cards),
+    }
+
+
+def rows_page(after=None, rows=CATALOG_ROWS, cards=CATALOG_CARDS):
+    """Página de filas con la primera página de tarjetas de cada una: {'rows': [...], 'next': cursor}."""
+    categories, next_cursor = _page(list(row_queryset(after)[:rows + 1]), rows)
+    return {
+        'rows': [
+            row_payload(category, list(card_queryset(category.pk)[:cards + 1]), cards)
+            for category in categories
+        ],
+        'next': next_cursor,
+    }
+
+
+async def arows_page(after=None, rows=CATALOG_ROWS, cards=CATALOG_CARDS):
+    categories, next_cursor = _page([category async for category in row_queryset(after)[:rows + 1]], rows)
+    return {
+        'rows': [
+            row_payload(category, [entry async for entry in card_queryset(category.pk)[:cards + 1]], cards)
+            for category in categories
+        ],
+        'next': next_cursor,
+    }
+
+
+def cards_page(category_id, after=None, cards=CATALOG_CARDS):
+    return cards_payload(list(card_queryset(category_id, after)[:cards + 1]), cards)
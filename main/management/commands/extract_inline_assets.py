@@ -0,0 +1,129 @@
+# main/management/commands/extract_inline_assets.py
+import os
+import re
+import textwrap
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+INLINE_BLOCK_RE = re.compile(
+    r'^[ \t]*<(?P<tag>style|script)(?P<attrs>\s[^>]*)?>(?P<body>.*?)</(?P=tag)>[ \t]*\n?',
+    re.IGNORECASE | re.DOTALL | re.MULTILINE,
+)
+TEMPLATE_SYNTAX_RE = re.compile(r'{%|{{')
+JS_TYPES = ('', 'text/javascript', 'application/javascript', 'module')
+
+EXTENSIONS = {'style': 'css', 'script': 'js'}
+TEMPLATE_BLOCKS = {'css': 'extra_css', 'js': 'extra_js'}
+REFERENCES = {
+    'css': '<link rel="stylesheet" href="{%% static \'%s\' %%}">',
+    'js': '<script src="{%% static \'%s\' %%}" defer></script>',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Extrae los bloques <style> y <script> en línea de las plantillas a archivos en '
+        'static/bundles/ y los reemplaza por referencias {% static %}. collectstatic se encarga '
+        'después de minificarlos y nombrarlos por hash (ver chaoscompany/staticfiles.py).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'templates', nargs='*',
+            help='Plantillas a procesar, relativas a TEMPLATES DIRS (default: todas).',
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='No modifica nada; termina con error si alguna plantilla tiene bloques extraíbles.',
+        )
+
+    def handle(self, *args, **options):
+        self.template_dirs = [str(directory) for engine in settings.TEMPLATES for directory in engine.get('DIRS', [])]
+        self.bundles_dir = os.path.join(str(settings.STATICFILES_DIRS[0]), 'bundles')
+
+        pending = []
+        for template_name, template_path in self.find_templates(options['templates']):
+            with open(template_path, encoding='utf-8') as template_file:
+                source = template_file.read()
+
+            bundles, remaining = self.split_inline_blocks(source)
+            if not bundles:
+                continue
+            pending.append(template_name)
+            if options['check']:
+                continue
+
+            remaining = self.add_references(template_name, remaining, bundles)
+            with open(template_path, 'w', encoding='utf-8') as template_file:
+                template_file.write(remaining)
+            self.stdout.write(self.style.SUCCESS(
+                f"{template_name}: {', '.join(f'{len(body)} bytes de {kind}' for kind, body in bundles.items())}"
+            ))
+
+        if options['check'] and pending:
+            raise CommandError('Plantillas con CSS/JS en línea: ' + ', '.join(pending))
+        if not pending:
+            self.stdout.write('No hay bloques en línea para extraer.')
+
+    def find_templates(self, names):
+        for directory in self.template_dirs:
+            if names:
+                candidates = [name for name in names if os.path.isfile(os.path.join(directory, name))]
+            else:
+                candidates = sorted(
+                    os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+                    for root, _, filenames in os.walk(directory)
+                    for filename in filenames if filename.endswith('.html')
+                )
+            for name in candidates:
+                yield name, os.path.join(directory, name)
+
+    def split_inline_blocks(self, source):
+        """Separa los bloques extraíbles; los que usan sintaxis de plantilla se dejan en su lugar."""
+        bundles = {}
+
+        def extract(match):
+            attrs = (match.group('attrs') or '').lower()
+            kind = EXTENSIONS[match.group('tag').lower()]
+            body = match.group('body')
+            type_match = re.search(r'type\s*=\s*["\']?([^"\'\s>]*)', attrs)
+            if (
+                'src=' in attrs
+                or TEMPLATE_SYNTAX_RE.search(body)
+                or (kind == 'js' and type_match and type_match.group(1) not in JS_TYPES)
+            ):
+                return match.group(0)
+            bundles[kind] = bundles.get(kind, '') + textwrap.dedent(body).strip('\n') + '\n'
+            return ''
+
+        remaining = INLINE_BLOCK_RE.sub(extract, source)
+        return bundles, remaining
+
+    def add_references(self, template_name, source, bundles):
+        for kind, body in bundles.items():
+            bundle_name = f"bundles/{os.path.splitext(template_name)[0]}.{kind}"
+            bundle_path = os.path.join(self.bundles_dir, *bundle_name.split('/')[1:])
+            os.makedirs(os.path.dirname(bundle_path), exist_ok=True)
+
+            # Si el bundle ya existe (extracción previa) el contenido nuevo se agrega al final
+            mode = 'a' if os.path.exists(bundle_path) else 'w'
+            with open(bundle_path, mode, encoding='utf-8') as bundle_file:
+                if mode == 'w':
+                    comment = f'/* Extraído de templates/{template_name} */\n'
+                    bundle_file.write(comment)
+                bundle_file.write(body)
+
+            reference = REFERENCES[kind] % bundle_name
+            if reference in source:
+                continue
+            block = TEMPLATE_BLOCKS[kind]
+            block_re = re.compile(r'({%%\s*block\s+%s\s*%%})(.*?)({%%\s*endblock)' % block, re.DOTALL)
+            if block_re.search(source):
+                source = block_re.sub(
+                    lambda match: f"{match.group(1)}{match.group(2).rstrip()}\n{reference}\n{match.group(3)}",
+                    source, count=1,
+                )
+            else:
+                source = source.rstrip('\n') + f'\n\n{{% block {block} %}}\n{reference}\n{{% endblock %}}\n'
+        return source
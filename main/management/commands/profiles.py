@@ -0,0 +1,97 @@
+# main/management/commands/profiles.py
+import io
+import pstats
+from collections import defaultdict
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chaoscompany.profiling import delete_profile, list_profiles, profile_dir
+
+
+class Command(BaseCommand):
+    help = (
+        'Lista y resume los perfiles cProfile guardados por chaoscompany.profiling. '
+        'Sin opciones muestra un resumen por vista; con --view agrega todos los perfiles '
+        'de esa vista y muestra las funciones más costosas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--view',
+            help='Nombre de la URL (p. ej. cart o process_payment) cuyos perfiles se agregan.',
+        )
+        parser.add_argument(
+            '--id', dest='profile_id',
+            help='Muestra un único perfil por su id (cabecera X-Profile-Id de la respuesta).',
+        )
+        parser.add_argument(
+            '--list', action='store_true',
+            help='Lista cada perfil en lugar del resumen por vista.',
+        )
+        parser.add_argument(
+            '--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'],
+            help='Orden de las funciones al mostrar estadísticas (default: cumulative).',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=25,
+            help='Número de funciones a mostrar (default: 25).',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Borra los perfiles seleccionados (todos, o los de --view).',
+        )
+
+    def handle(self, *args, **options):
+        profiles = list_profiles()
+        if options['profile_id']:
+            profiles = [meta for meta in profiles if meta['id'] == options['profile_id']]
+            if not profiles:
+                raise CommandError(f'No existe el perfil "{options["profile_id"]}" en {profile_dir()}')
+        elif options['view']:
+            profiles = [meta for meta in profiles if meta['view'] == options['view']]
+
+        if not profiles:
+            self.stdout.write(f'No hay perfiles guardados en {profile_dir()}')
+            return
+
+        if options['clear']:
+            for meta in profiles:
+                delete_profile(meta)
+            self.stdout.write(self.style.SUCCESS(f'{len(profiles)} perfiles borrados'))
+        elif options['profile_id'] or options['view']:
+            self.show_profiles(profiles)
+            self.show_stats(profiles, options['sort'], options['limit'])
+        elif options['list']:
+            self.show_profiles(profiles)
+        else:
+            self.show_summary(profiles)
+
+    def show_summary(self, profiles):
+        by_view = defaultdict(list)
+        for meta in profiles:
+            by_view[meta['view']].append(meta)
+
+        self.stdout.write(f'{"Vista":<28} {"Perfiles":>8} {"p50 ms":>9} {"Máx ms":>9}  Último')
+        rows = sorted(by_view.items(), key=lambda item: -max(meta['duration_ms'] for meta in item[1]))
+        for view, metas in rows:
+            durations = sorted(meta['duration_ms'] for meta in metas)
+            latest = max(meta['created'] for meta in metas)
+            self.stdout.write(
+                f'{view:<28} {len(metas):>8} {durations[len(durations) // 2]:>9.1f} '
+                f'{durations[-1]:>9.1f}  {datetime.fromtimestamp(latest):%Y-%m-%d %H:%M:%S}'
+            )
+        self.stdout.write('\nDetalle de una vista: python manage.py profiles --view <vista>')
+
+    def show_profiles(self, profiles):
+        for meta in profiles:
+            self.stdout.write(
+                f'{meta["id"]}  {meta["method"]} {meta["url"]} -> {meta["status"]}  '
+                f'{meta["duration_ms"]:.1f} ms  ({meta["trigger"]})'
+            )
+
+    def show_stats(self, profiles, sort, limit):
+        output = io.StringIO()
+        stats = pstats.Stats(*(meta['path'] for meta in profiles), stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        self.stdout.write(output.getvalue())
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('position', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+                'indexes': [models.Index(fields=['position', 'id'], name='catalog_category_keyset_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='main.catalogcategory')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CatalogGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=150)),
+                ('slug', models.SlugField(max_length=150, unique=True)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('image', models.CharField(max_length=255)),
+                ('categories', models.ManyToManyField(related_name='games', through='main.CatalogEntry', to='main.catalogcategory')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='catalogentry',
+            name='game',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='main.cataloggame'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogentry',
+            index=models.Index(fields=['category', 'position', 'id'], name='catalog_entry_keyset_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='catalogentry',
+            constraint=models.UniqueConstraint(fields=('category', 'game'), name='catalog_entry_unique'),
+        ),
+    ]
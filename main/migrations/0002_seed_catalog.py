@@ -0,0 +1,79 @@
+# Carga en el catálogo los juegos que antes estaban escritos a mano en gamepass.html, con
+# las rutas de imagen tal como están en static/ (mayúsculas incluidas)
+
+from django.db import migrations
+
+CATEGORIES = [
+    ('accion', 'Acción'),
+    ('aventura', 'Aventura'),
+    ('rpg', 'RPG'),
+    ('deportes', 'Deportes'),
+    ('indie', 'Indie'),
+]
+
+# (slug, título, descripción, imagen en static/, categorías)
+GAMES = [
+    ('fortnite', 'Fortnite', 'Battle Royale épico con construcción y acción multijugador.', 'Imagenes/row1/Fortnite.jpg', ['accion']),
+    ('valorant', 'Valorant', 'Shooter táctico 5v5 con agentes únicos.', 'Imagenes/row1/Valorant.jpg', ['accion']),
+    ('doom-eternal', 'DOOM Eternal', 'Shooter frenético contra demonios del infierno.', 'Imagenes/row1/Doom.jpg', ['accion']),
+    ('resident-evil-4', 'Resident Evil 4', 'Survival horror con acción intensa y combates estratégicos.', 'Imagenes/row3/Resident Evil.jpg', ['accion']),
+    ('spider-man-2', 'Spider-Man 2', 'Aventura superheroica en Nueva York abierta.', 'Imagenes/row2/Spider Man 2.jpg', ['accion']),
+    ('black-myth-wukong', 'Black Myth: Wukong', 'Acción inspirada en la mitología china.', 'Imagenes/row2/Wukong.jpg', ['accion']),
+    ('alan-wake-2', 'Alan Wake 2', 'Thriller psicológico con elementos de survival horror.', 'Imagenes/row2/AlanWake2.jpg', ['aventura']),
+    ('avatar-frontiers-of-pandora', 'Avatar: Frontiers of Pandora', "Exploración en el mundo de Pandora como Na'vi.", 'Imagenes/row2/Avatar.jpg', ['aventura']),
+    ('hogwarts-legacy', 'Hogwarts Legacy', 'Aventura mágica en el mundo de Harry Potter.', 'Imagenes/row3/Hogwarts.jpg', ['aventura']),
+    ('red-dead-redemption-2', 'Red Dead Redemption 2', 'Aventura del lejano oeste con historia profunda.', 'Imagenes/row3/Red dead.jpg', ['aventura']),
+    ('cyberpunk-2077', 'Cyberpunk 2077', 'RPG de mundo abierto en una ciudad futurista distópica.', 'Imagenes/row1/Cyberpunk.jpg', ['accion', 'rpg']),
+    ('the-witcher-3', 'The Witcher 3: Wild Hunt', 'Aventura épica de fantasía con Geralt de Rivia.', 'Imagenes/row1/The Witcher3.jpg', ['aventura', 'rpg']),
+    ('god-of-war', 'God of War', 'Acción y aventura épica con Kratos en la mitología nórdica.', 'Imagenes/row3/God of war.jpg', ['accion', 'rpg']),
+    ('starfield', 'Starfield', 'Exploración espacial y RPG en un vasto universo.', 'Imagenes/row2/Starfield.jpg', ['rpg']),
+    ('elden-ring', 'Elden Ring', 'RPG de mundo abierto con combates desafiantes.', 'Imagenes/row2/Elden Ring.jpg', ['rpg']),
+    ('fifa-24', 'FIFA 24', 'Simulación de fútbol con equipos y ligas reales.', 'Imagenes/row3/Fifa 24.jpeg', ['deportes']),
+    ('nba-2k24', 'NBA 2K24', 'Simulación de baloncesto con jugadores reales.', 'Imagenes/row3/nba.jpg', ['deportes']),
+    ('madden-nfl-24', 'Madden NFL 24', 'Simulación de fútbol americano profesional.', 'Imagenes/deportes/madden.jpg', ['deportes']),
+    ('f1-2023', 'F1 2023', 'Carreras de Fórmula 1 con equipos oficiales.', 'Imagenes/deportes/f1.jpeg', ['deportes']),
+    ('tony-hawks-pro-skater', "Tony Hawk's Pro Skater", 'Skateboarding extremo con trucos y combos.', 'Imagenes/deportes/tonyhawk.jpg', ['deportes']),
+    ('rocket-league', 'Rocket League', 'Fútbol con coches rocket, deporte y acción.', 'Imagenes/deportes/rocketleague.jpg', ['deportes']),
+    ('among-us', 'Among Us', 'Juego social de deducción y traición en la tripulación.', 'Imagenes/row1/among-us.jpg', ['indie']),
+    ('hades', 'Hades', 'Roguelike de acción en el inframundo griego.', 'Imagenes/indie/hades.png', ['indie']),
+    ('stardew-valley', 'Stardew Valley', 'Simulación de granja y vida rural.', 'Imagenes/indie/stardew.jpg', ['indie']),
+    ('celeste', 'Celeste', 'Plataformas desafiantes con historia conmovedora.', 'Imagenes/indie/celeste.jpg', ['indie']),
+    ('hollow-knight', 'Hollow Knight', 'Aventura de acción en un mundo de insectos.', 'Imagenes/indie/hollow.jpg', ['indie']),
+    ('fall-guys', 'Fall Guys', 'Battle royale divertido con obstáculos y minijuegos.', 'Imagenes/indie/fallguys.jpg', ['indie']),
+]
+
+
+def seed_catalog(apps, schema_editor):
+    CatalogCategory = apps.get_model('main', 'CatalogCategory')
+    CatalogGame = apps.get_model('main', 'CatalogGame')
+    CatalogEntry = apps.get_model('main', 'CatalogEntry')
+
+    categories = {}
+    for position, (slug, name) in enumerate(CATEGORIES):
+        categories[slug], _ = CatalogCategory.objects.get_or_create(slug=slug, defaults={'name': name, 'position': position})
+    positions = dict.fromkeys(categories, 0)
+    for slug, title, description, image, game_categories in GAMES:
+        game, _ = CatalogGame.objects.get_or_create(
+            slug=slug, defaults={'title': title, 'description': description, 'image': image},
+        )
+        for category in game_categories:
+            CatalogEntry.objects.get_or_create(
+                category=categories[category], game=game, defaults={'position': positions[category]},
+            )
+            positions[category] += 1
+
+
+def unseed_catalog(apps, schema_editor):
+    apps.get_model('main', 'CatalogGame').objects.filter(slug__in=[game[0] for game in GAMES]).delete()
+    apps.get_model('main', 'CatalogCategory').objects.filter(slug__in=[slug for slug, _ in CATEGORIES]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_catalog, unseed_catalog),
+    ]
@@ -1,3 +1,49 @@
 from django.db import models
 
-# Create your models here.
+
+class CatalogCategory(models.Model):
+    """Fila del catálogo de gamepass (Acción, Indie...)."""
+    slug = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position', 'id']
+        indexes = [
+            # Paginación por clave (position, id) de /api/catalog/rows/
+            models.Index(fields=['position', 'id'], name='catalog_category_keyset_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class CatalogGame(models.Model):
+    title = models.CharField(max_length=150)
+    slug = models.SlugField(max_length=150, unique=True)
+    description = models.CharField(max_length=255, blank=True)
+    # Ruta dentro de static/ (p. ej. 'Imagenes/row1/doom.jpg')
+    image = models.CharField(max_length=255)
+    categories = models.ManyToManyField(CatalogCategory, through='CatalogEntry', related_name='games')
+
+    def __str__(self):
+        return self.title
+
+
+class CatalogEntry(models.Model):
+    """Tarjeta de un juego dentro de una fila; un juego puede estar en varias filas."""
+    category = models.ForeignKey(CatalogCategory, on_delete=models.CASCADE, related_name='entries')
+    game = models.ForeignKey(CatalogGame, on_delete=models.CASCADE, related_name='entries')
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'game'], name='catalog_entry_unique'),
+        ]
+        indexes = [
+            # Tarjetas de una fila en orden, paginadas por clave (position, id)
+            models.Index(fields=['category', 'position', 'id'], name='catalog_entry_keyset_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.category} · {self.game}'
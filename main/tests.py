@@ -1,3 +1,439 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from benchmarks.funnel import ENDPOINTS, FunnelRun
+from chaoscompany.db_backends.mysql_pool.pool import ConnectionPool, PoolTimeout
+from chaoscompany.log import JsonFormatter, QueueLogHandler, SamplingFilter
+from chaoscompany.profiling import list_profiles
+from chaoscompany.staticfiles import IMMUTABLE_CACHE_CONTROL, StaticFilesMiddleware, minify_css, minify_js
+from .catalog import CATALOG_ROWS, rows_page
+from .models import CatalogEntry, CatalogGame
+
+# =========================================================================
+# ESTÁTICOS SERVIDOS POR LA APLICACIÓN (chaoscompany/staticfiles.py)
+# =========================================================================
+
+class StaticFilesMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        self.css = b'body{color:red}' * 100
+        for name, content in [
+            ('styles.abc123.css', self.css),
+            ('styles.abc123.css.gz', gzip.compress(self.css)),
+            ('staticfiles.json', json.dumps({'paths': {'styles.css': 'styles.abc123.css'}}).encode()),
+        ]:
+            with open(os.path.join(static_root.name, name), 'wb') as static_file:
+                static_file.write(content)
+        with override_settings(SERVE_STATIC=True, STATIC_ROOT=static_root.name, STATIC_URL='/static/'):
+            self.middleware = StaticFilesMiddleware(lambda request: HttpResponse('vista'))
+
+    def get(self, path, **headers):
+        return self.middleware(RequestFactory().get(path, headers=headers))
+
+    def test_hashed_file_is_streamed_with_best_encoding(self):
+        response = self.get('/static/styles.abc123.css', accept_encoding='gzip, deflate')
+        self.assertTrue(response.streaming)
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.css)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertNotIn('Content-Disposition', response)
+        response.close()
+
+        response = self.get('/static/styles.abc123.css', if_none_match=response['ETag'], accept_encoding='gzip')
+        self.assertEqual(response.status_code, 304)
+        # Sin Accept-Encoding se sirve el original
+        response = self.get('/static/styles.abc123.css')
+        self.assertEqual(b''.join(response.streaming_content), self.css)
+        response.close()
+
+    def test_unknown_paths_reach_the_view(self):
+        self.assertEqual(self.get('/static/no-existe.css').content, b'vista')
+
+
+# =========================================================================
+# MINIFICACIÓN EN COLLECTSTATIC (chaoscompany/staticfiles.py)
+# =========================================================================
+
+class MinifierTests(SimpleTestCase):
+
+    def test_js_comment_markers_inside_strings_are_kept(self):
+        self.assertEqual(
+            minify_js("var url = 'http://example.com/a'; // comentario\nvar c = \"/* no */\";\n"),
+            "var url = 'http://example.com/a';\nvar c = \"/* no */\";\n",
+        )
+        self.assertEqual(minify_js("var s = 'it\\'s // dentro';"), "var s = 'it\\'s // dentro';\n")
+        self.assertEqual(minify_js('var t = `a ${b} // c`;'), 'var t = `a ${b} // c`;\n')
+
+    def test_js_regex_literals_are_kept(self):
+        for source in (
+            'var r = /a\\/*b/g;',
+            'x.split(/[/*]/);',
+            'var u = /\\/\\//g.test(s);',
+            'if (!/^\\d+$/.test(v)) return;',
+            'return /x/.test(y);',
+        ):
+            self.assertEqual(minify_js(source + ' // fin'), source + '\n', source)
+        # Tras un identificador o un número, "/" es una división
+        self.assertEqual(minify_js('var a = b / c /* c */ / 2;'), 'var a = b / c / 2;\n')
+
+    def test_js_newlines_are_kept_for_asi(self):
+        source = 'var a = b\n(c)\nx = y\n++z\nreturn\n/x/.test(s)'
+        self.assertEqual(minify_js(source), source + '\n')
+        # Un comentario multilínea equivale a un salto de línea
+        self.assertEqual(minify_js('a = 1 /*\n*/ b = 2'), 'a = 1\nb = 2\n')
+        self.assertEqual(minify_js('  let a = 1;   \n\n\n   let b = 2;  '), 'let a = 1;\nlet b = 2;\n')
+
+    def test_css(self):
+        self.assertEqual(
+            minify_css("/* c */ .a  .b > .c { margin : 0 -1px ; }\n@media (max-width: 600px) { .d { color: red; } }"),
+            '.a .b>.c{margin :0 -1px}@media (max-width:600px){.d{color:red}}',
+        )
+        self.assertEqual(minify_css("a::after { content: '/* no */  a'; }"), "a::after{content:'/* no */  a'}")
+        # El espacio antes de ":" distingue descendiente de pseudoclase y no se toca
+        self.assertEqual(minify_css('.a :hover { x: 1 }'), '.a :hover{x:1}')
+        self.assertEqual(minify_css('div { width: calc(100% - 10px); }'), 'div{width:calc(100% - 10px)}')
+
+
+# =========================================================================
+# POOL DE CONEXIONES (chaoscompany/db_backends/mysql_pool/pool.py)
+# =========================================================================
+
+class FakeConnection:
+    """Lo que el pool usa de una conexión del driver: ping() y close()."""
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def ping(self):
+        if not self.alive:
+            raise OSError('El servidor cerró la conexión')
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def make_pool(self, **options):
+        self.opened = []
+
+        def connect():
+            connection = FakeConnection()
+            self.opened.append(connection)
+            return connection
+        return ConnectionPool(connect, **{'size': 2, 'max_overflow': 1, 'timeout': 0.05, **options})
+
+    def test_checkin_returns_connection_for_reuse(self):
+        pool = self.make_pool()
+        connection = pool.checkout()
+        pool.checkin(connection)
+        self.assertIs(pool.checkout(), connection)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['reused'], stats['checked_out'], stats['idle']), (1, 1, 1, 0))
+
+    def test_overflow_is_closed_on_checkin_and_limit_times_out(self):
+        pool = self.make_pool()
+        connections = [pool.checkout() for _ in range(3)]
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+        for connection in connections:
+            pool.checkin(connection)
+        # Solo se conservan SIZE conexiones libres; la de desbordamiento se cierra
+        self.assertEqual([connection.closed for connection in connections], [False, False, True])
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_waiter_gets_connection_returned_by_other_thread(self):
+        pool = self.make_pool(size=1, max_overflow=0, timeout=5)
+        connection = pool.checkout()
+        threading.Timer(0.05, pool.checkin, [connection]).start()
+        self.assertIs(pool.checkout(), connection)
+
+    def test_custom_timeout_error(self):
+        class DriverPoolTimeout(PoolTimeout, ConnectionError):
+            pass
+        pool = self.make_pool(size=0, max_overflow=0, timeout_error=DriverPoolTimeout)
+        with self.assertRaises(ConnectionError):
+            pool.checkout()
+
+    def test_failed_connect_releases_its_slot(self):
+        pool = ConnectionPool(mock.Mock(side_effect=OSError('sin servidor')), size=1, max_overflow=0, timeout=0.05)
+        for _ in range(2):
+            # Si el hueco quedara reservado, el segundo intento sería PoolTimeout
+            with self.assertRaises(OSError):
+                pool.checkout()
+
+    def test_expired_connections_are_recycled(self):
+        pool = self.make_pool(recycle=60)
+        connection = pool.checkout()
+        pool.record(connection).created_at -= 61
+        pool.checkin(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['recycled'], 1)
+
+        # También al sacarla del pool si caducó mientras estaba libre
+        connection = pool.checkout()
+        pool.checkin(connection)
+        pool.record(connection).created_at -= 61
+        self.assertIsNot(pool.checkout(), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['recycled'], 2)
+
+    def test_idle_connections_are_pinged_before_reuse(self):
+        pool = self.make_pool(pre_ping=30)
+        connection = pool.checkout()
+        pool.checkin(connection)
+        pool.record(connection).last_used -= 31
+        self.assertIs(pool.checkout(), connection)
+
+        pool.checkin(connection)
+        pool.record(connection).last_used -= 31
+        connection.alive = False
+        replacement = pool.checkout()
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['checked_out'], 1)
+
+    def test_connections_inherited_across_fork_are_forgotten(self):
+        pool = self.make_pool()
+        borrowed, idle = pool.checkout(), pool.checkout()
+        pool.checkin(idle)
+        # Como si este proceso fuera el hijo de un fork
+        pool._pid = -1
+
+        pool.checkin(borrowed)
+        fresh = pool.checkout()
+        self.assertNotIn(fresh, (borrowed, idle))
+        # Los sockets heredados no se cierran: siguen siendo del proceso padre
+        self.assertFalse(borrowed.closed or idle.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['checked_out'], stats['idle']), (1, 0))
+
+
+# =========================================================================
+# EMBUDO REGISTRO → PAGO (benchmarks/funnel.py)
+# =========================================================================
+
+class FunnelSmokeTests(LiveServerTestCase):
+    """
+    Recorre una vez el embudo de la prueba de carga contra el servidor de tests: si
+    algún paso cambia de comportamiento, el harness dejaría de medir lo que debe.
+    """
+
+    def test_funnel_completes(self):
+        host, port = self.live_server_url.rsplit('//', 1)[1].rsplit(':', 1)
+        funnel = asyncio.run(FunnelRun('smoke').run(host, int(port), users=1, iterations=1))
+        report = funnel.report()
+
+        self.assertEqual(report['funnels_completed'], 1, report)
+        for name in ENDPOINTS:
+            self.assertEqual(report['endpoints'][name]['requests'], 1, name)
+            self.assertEqual(report['endpoints'][name]['errors'], 0, name)
+
+
+# =========================================================================
+# MÉTRICAS POR PETICIÓN (chaoscompany/metrics.py)
+# =========================================================================
+
+@override_settings(METRICS_TOKEN='token-metricas', METRICS_ALLOWED_IPS=[])
+class MetricsTests(TestCase):
+
+    def scrape(self, **extra):
+        return self.client.get(reverse('metrics'), **extra)
+
+    def test_endpoint_requires_token_or_allowlisted_ip(self):
+        # El cliente de tests llega desde 127.0.0.1, como todo lo que pasa por nginx
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.scrape().status_code, 404)
+            self.assertEqual(self.scrape(headers={'Authorization': 'Bearer otro'}).status_code, 404)
+        self.assertEqual(self.scrape(headers={'Authorization': 'Bearer token-metricas'}).status_code, 200)
+        with override_settings(METRICS_ALLOWED_IPS=['10.0.0.5']):
+            self.assertEqual(self.scrape(REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+    def test_unknown_methods_share_one_series(self):
+        for method in ('BREW', 'PROPFIND', 'X-RANDOM'):
+            self.client.generic(method, reverse('index'))
+        self.client.get(reverse('index'))
+        body = self.scrape(headers={'Authorization': 'Bearer token-metricas'}).content.decode()
+        self.assertIn('view="index",method="other"', body)
+        self.assertIn('view="index",method="GET"', body)
+        self.assertNotIn('BREW', body)
+
+
+# =========================================================================
+# LOGGING EN COLA (chaoscompany/log.py)
+# =========================================================================
+
+def make_record(name='accounts.views', level=logging.INFO, msg='Vista %s llamada', args=('perfil',), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class LoggingTests(SimpleTestCase):
+
+    def test_json_formatter(self):
+        try:
+            raise ValueError('fallo')
+        except ValueError:
+            record = make_record(level=logging.ERROR, order_id=7)
+            record.exc_info = sys.exc_info()
+        payload = json.loads(JsonFormatter().format(record))
+        self.assertEqual((payload['level'], payload['logger'], payload['msg']), ('ERROR', 'accounts.views', 'Vista perfil llamada'))
+        self.assertEqual(payload['order_id'], 7)
+        self.assertIn('ValueError: fallo', payload['exc_info'])
+
+    def test_sampling_filter(self):
+        sampling = SamplingFilter({'accounts': 1.0, 'accounts.views': 0.0, 'main.views': 0.5})
+        self.assertFalse(sampling.filter(make_record('accounts.views')))
+        self.assertFalse(sampling.filter(make_record('accounts.views.detalle')))
+        self.assertTrue(sampling.filter(make_record('accounts.viewsets')))
+        self.assertTrue(sampling.filter(make_record('accounts.forms')))
+        # WARNING y superiores nunca se muestrean
+        self.assertTrue(sampling.filter(make_record('accounts.views', logging.WARNING)))
+        with mock.patch('chaoscompany.log.random.random', side_effect=[0.2, 0.7]):
+            self.assertEqual([sampling.filter(make_record('main.views')) for _ in range(2)], [True, False])
+
+    def test_queue_handler_writes_json_lines_from_listener(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'app.log')
+            handler = QueueLogHandler(stream=None, filename=path)
+            handler.handle(make_record())
+            handler.handle(make_record(level=logging.WARNING, msg='sin args', args=()))
+            # close() para el listener después de vaciar la cola
+            handler.close()
+            with open(path, encoding='utf-8') as log_file:
+                lines = [json.loads(line) for line in log_file]
+        self.assertEqual([line['msg'] for line in lines], ['Vista perfil llamada', 'sin args'])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = QueueLogHandler(stream=None, maxsize=1)
+        self.addCleanup(handler.close)
+        # Sin listener nadie vacía la cola
+        for _ in range(3):
+            handler.enqueue(make_record())
+        self.assertEqual(handler.dropped, 2)
+
+    @override_settings(ADMINS=[('Admin', 'admin@example.com')], DEBUG=False)
+    def test_request_errors_still_mail_admins(self):
+        with mock.patch.object(logging.getLogger(), 'handlers', []):
+            logging.getLogger('django.request').error('Internal Server Error: /pago/')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Internal Server Error: /pago/', mail.outbox[0].subject)
+
+
+# =========================================================================
+# PERFILES BAJO DEMANDA (chaoscompany/profiling.py)
+# =========================================================================
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        settings_override = override_settings(PROFILING_DIR=profile_dir.name, PROFILING_TOKEN='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.staff = get_user_model().objects.create_user('perfilador', 'staff@example.com', 'x', is_staff=True)
+
+    def test_requests_without_header_are_not_profiled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list_profiles(), [])
+
+    def test_header_is_ignored_for_non_staff(self):
+        response = self.client.get('/', headers={'X-Profile': '1'})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list_profiles(), [])
+
+    def test_staff_header_stores_profile_listed_by_view(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/', headers={'X-Profile': '1'})
+
+        [profile] = list_profiles()
+        self.assertEqual(response['X-Profile-Id'], profile['id'])
+        self.assertEqual((profile['view'], profile['status']), ('index', 200))
+
+        output = StringIO()
+        call_command('profiles', stdout=output)
+        self.assertIn('index', output.getvalue())
+
+    @override_settings(PROFILING_MAX_FILES=2)
+    def test_oldest_profiles_are_rotated_out(self):
+        self.client.force_login(self.staff)
+        ids = [self.client.get('/', headers={'X-Profile': '1'})['X-Profile-Id'] for _ in range(3)]
+        self.assertEqual([profile['id'] for profile in list_profiles()], ids[1:])
+
+
+# =========================================================================
+# CATÁLOGO POR FILAS (main/catalog.py)
+# =========================================================================
+
+class CatalogApiTests(TestCase):
+    """Usa el catálogo que carga la migración 0002_seed_catalog."""
+
+    def follow(self, url, key, **params):
+        items, cursor = [], None
+        while True:
+            page = self.client.get(url, dict(params, **({'after': cursor} if cursor else {}))).json()
+            items += page[key]
+            cursor = page['next']
+            if not cursor:
+                return items
+
+    def test_rows_and_cards_are_paginated_by_cursor(self):
+        response = self.client.get(reverse('catalog_rows'), {'rows': 2, 'cards': 3})
+        self.assertIn('public', response['Cache-Control'])
+        self.assertNotIn('Vary', response)
+        first = response.json()
+        self.assertEqual([row['slug'] for row in first['rows']], ['accion', 'aventura'])
+        self.assertEqual(len(first['rows'][0]['cards']), 3)
+        self.assertIsNotNone(first['rows'][0]['next'])
+
+        rows = self.follow(reverse('catalog_rows'), 'rows', rows=2, cards=1)
+        self.assertEqual([row['slug'] for row in rows], ['accion', 'aventura', 'rpg', 'deportes', 'indie'])
+        cards = self.follow(rows[0]['cards_url'], 'cards', cards=3)
+        expected = list(CatalogEntry.objects.filter(category__slug='accion').order_by('position', 'id').values_list('game__slug', flat=True))
+        self.assertEqual([card['slug'] for card in cards], expected)
+        self.assertEqual(len(expected), 8)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(reverse('catalog_rows'), {'after': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('catalog_rows'), {'rows': 'muchas'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('catalog_cards', args=['no-existe'])).status_code, 404)
+
+    def test_first_page_cost_does_not_grow_with_catalog(self):
+        games = CatalogGame.objects.bulk_create(
+            CatalogGame(title=f'Juego {index}', slug=f'juego-{index}', image='Imagenes/logo.png') for index in range(300)
+        )
+        CatalogEntry.objects.bulk_create(
+            CatalogEntry(category_id=CatalogEntry.objects.values_list('category_id', flat=True).first(), game=game, position=1000 + index)
+            for index, game in enumerate(games)
+        )
+        # Una consulta para las filas y una por fila, sin importar cuántos juegos haya
+        with self.assertNumQueries(1 + CATALOG_ROWS):
+            rows_page()
+        response = self.client.get(reverse('gamepass'))
+        self.assertContains(response, 'class="catalog-row"', count=CATALOG_ROWS)
+        self.assertNotContains(response, 'Juego 299')
@@ -1,18 +1,29 @@
 # main/views.py
-from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-import uuid
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_safe
+from accounts.entitlements import issue_for_user
+from accounts.checkout import charge_order, checkout_not_completed, fail_order, finish_order, start_order
+from accounts.gateways import PaymentError
 from accounts.models import PaymentOrder
+from accounts.receipts import receipt_response
+from chaoscompany.db_router import use_replicas
+from .catalog import CACHE_SECONDS, CATALOG_CARDS, CATALOG_ROWS, cards_page, page_size, rows_page
+from .models import CatalogCategory
 
+@use_replicas
 def index(request):
     return render(request, 'main/index.html', {'title': 'Inicio'})
 
+@use_replicas
 def membresias(request):
     return render(request, 'main/membresias.html', {'title': 'Membresías'})
 
-def gamepass(request):
+def gamepass_context():
     juegos_destacados = [
         {
             'nombre': 'Grand Theft Auto V',
@@ -39,13 +50,51 @@ def gamepass(request):
         'Deportes': ['FIFA 24', 'NBA 2K24', 'Rocket League'],
         'Estrategia': ['Age of Empires', 'Civilization VI', 'StarCraft II']
     }
-    context = {
+    return {
         'juegos_destacados': juegos_destacados,
         'categorias': categorias,
         'title': 'Gamepass'
     }
+
+@use_replicas
+def gamepass(request):
+    # Solo la primera página del catálogo; el resto lo pide scripts.js al desplazarse
+    context = gamepass_context()
+    context['catalog'] = rows_page()
     return render(request, 'main/gamepass.html', context)
 
+# =========================================================================
+# API DEL CATÁLOGO (paginación por clave, ver main/catalog.py)
+# =========================================================================
+
+@use_replicas
+@require_safe
+@cache_control(public=True, max_age=CACHE_SECONDS)
+def catalog_rows(request):
+    """Filas siguientes a ?after=, cada una con su primera página de tarjetas."""
+    try:
+        page = rows_page(
+            request.GET.get('after'),
+            page_size(request.GET.get('rows'), CATALOG_ROWS),
+            page_size(request.GET.get('cards'), CATALOG_CARDS),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(page)
+
+@use_replicas
+@require_safe
+@cache_control(public=True, max_age=CACHE_SECONDS)
+def catalog_cards(request, slug):
+    """Tarjetas de la fila `slug` siguientes a ?after=."""
+    category = get_object_or_404(CatalogCategory.objects.only('pk'), slug=slug)
+    try:
+        page = cards_page(category.pk, request.GET.get('after'), page_size(request.GET.get('cards'), CATALOG_CARDS))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(page)
+
+@use_replicas
 def ventajas(request):
     return render(request, 'main/ventajas.html', {'title': 'Ventajas'})
 
@@ -55,8 +104,11 @@ def game_session(request):
     if request.user.membership_type == 'free':
         messages.warning(request, 'Necesitas una membresía premium para jugar este juego.')
         return render(request, 'main/membresias.html', {'title': 'Membresías'})
+    # El servidor de juego recibe el nivel firmado y no necesita consultar a Django
+    issued = issue_for_user(request.user)
     context = {
         'game_name': game_name,
+        'entitlement_token': issued[1] if issued else '',
         'title': f'Jugando {game_name}'
     }
     return render(request, 'main/game_session.html', context)
@@ -188,27 +240,11 @@ def process_payment(request):
                 messages.error(request, 'Formato de fecha inválido (MM/AA)')
                 return redirect('payment_page')
             
-            # SIMULAR PROCESAMIENTO DE PAGO EXITOSO
-            transaction_id = str(uuid.uuid4())[:8].upper()
-            
-            # Crear orden de compra
-            order = PaymentOrder.objects.create(
-                user=request.user,
-                plan_type=plan_type,
-                amount=amount,
-                status='completed',
-                payment_method='credit_card',
-                transaction_id=transaction_id,
-                card_last_four=card_number[-4:],
-                customer_email=email
-            )
-            
-            # Actualizar membresía del usuario
-            request.user.membership_type = plan_type
-            request.user.membership_start = timezone.now()
-            request.user.membership_expiry = timezone.now() + timezone.timedelta(days=30)
-            request.user.is_active_member = True
-            request.user.save()
+            # Orden pendiente, cobro y membresía (accounts/checkout.py)
+            order = start_order(request.user, plan_type, amount, card_number[-4:], email)
+            order = finish_order(order, charge_order(order), request.user)
+            if order.status != 'completed':
+                return checkout_not_completed(request, order)
             
             # Limpiar carrito
             if 'cart' in request.session:
@@ -217,6 +253,10 @@ def process_payment(request):
             messages.success(request, f'¡Pago exitoso! Tu suscripción {plan_type} ha sido activada.')
             return redirect('payment_success', order_id=order.id)
             
+        except PaymentError as e:
+            fail_order(order, e)
+            messages.error(request, str(e))
+            return redirect('payment_page')
         except Exception as e:
             messages.error(request, f'Error procesando el pago: {str(e)}')
             return redirect('payment_page')
@@ -225,12 +265,13 @@ def process_payment(request):
 
 @login_required
 def payment_success(request, order_id):
-    """Página de confirmación de pago exitoso"""
-    order = get_object_or_404(PaymentOrder, id=order_id, user=request.user)
-    return render(request, 'main/payment_success.html', {
-        'order': order,
-        'title': 'Pago Exitoso'
-    })
+    """Página de confirmación de pago exitoso (recibo guardado, ver accounts/receipts.py)"""
+    orders = PaymentOrder.objects.filter(id=order_id, user=request.user, status='completed')
+    transaction_id = orders.values_list('transaction_id', flat=True).first()
+    if transaction_id is None:
+        raise Http404('Orden no encontrada')
+    messages.get_messages(request).used = True
+    return receipt_response(request, request.user.pk, transaction_id, 'html', orders.first)
 
 @login_required
 def payment_cancel(request):
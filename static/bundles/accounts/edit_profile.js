@@ -0,0 +1,236 @@
+/* Extraído de templates/accounts/edit_profile.html */
+document.addEventListener('DOMContentLoaded', function() {
+    // URLs generadas por la plantilla (ver atributos data-* del formulario)
+    const profileForm = document.querySelector('.profile-edit-form');
+    const defaultAvatarUrl = profileForm.dataset.defaultAvatarUrl;
+
+    // La plantilla ya marca la opción y el campo oculto del avatar actual;
+    // vacío si el usuario subió su propia imagen
+    let selectedAvatar = profileForm.dataset.currentAvatar;
+
+    // Sistema de tabs
+    const tabButtons = document.querySelectorAll('.tab-button');
+    const tabPanels = document.querySelectorAll('.tab-panel');
+
+    tabButtons.forEach(button => {
+        button.addEventListener('click', function() {
+            const tabId = this.getAttribute('data-tab');
+
+            tabButtons.forEach(btn => btn.classList.remove('active'));
+            tabPanels.forEach(panel => panel.classList.remove('active'));
+
+            this.classList.add('active');
+            document.getElementById(`${tabId}-panel`).classList.add('active');
+
+            if (tabId === 'custom') {
+                // Al cambiar a custom, mantener el avatar actual en la preview
+                clearAvatarSelections();
+            } else {
+                // Al volver a default, restaurar la selección predeterminada
+                restoreDefaultSelection();
+            }
+        });
+    });
+
+    // Selección de avatares predeterminados
+    const avatarOptions = document.querySelectorAll('.avatar-option');
+
+    avatarOptions.forEach(option => {
+        option.addEventListener('click', function() {
+            const avatarFile = this.getAttribute('data-avatar');
+            const avatarUrl = this.getAttribute('data-avatar-url');
+
+            clearAvatarSelections();
+            this.classList.add('selected');
+            updateAvatarPreview(avatarUrl);
+
+            selectedAvatar = avatarFile;
+            document.getElementById('selected-avatar').value = avatarFile;
+            resetCustomUpload();
+
+            // Actualizar indicador de predeterminado
+            updateDefaultIndicator(avatarFile === 'avatar_default.jpg');
+        });
+    });
+
+    // Carga de avatar personalizado
+    const fileInput = document.getElementById('id_profile_picture');
+    const uploadArea = document.getElementById('upload-area');
+    const uploadPreview = document.getElementById('upload-preview');
+    const customPreviewImage = document.getElementById('custom-preview-image');
+
+    // Click en área de upload
+    uploadArea.addEventListener('click', function() {
+        fileInput.click();
+    });
+
+    // Drag and drop
+    uploadArea.addEventListener('dragover', function(e) {
+        e.preventDefault();
+        this.classList.add('dragover');
+    });
+
+    uploadArea.addEventListener('dragleave', function() {
+        this.classList.remove('dragover');
+    });
+
+    uploadArea.addEventListener('drop', function(e) {
+        e.preventDefault();
+        this.classList.remove('dragover');
+
+        const files = e.dataTransfer.files;
+        if (files.length > 0) {
+            handleFileSelection(files[0]);
+        }
+    });
+
+    // Cambio de archivo
+    fileInput.addEventListener('change', function(e) {
+        if (this.files.length > 0) {
+            handleFileSelection(this.files[0]);
+        }
+    });
+
+    // Acciones de preview
+    document.getElementById('change-image').addEventListener('click', function() {
+        fileInput.click();
+    });
+
+    document.getElementById('remove-image').addEventListener('click', function() {
+        resetCustomUpload();
+        // Restaurar avatar predeterminado al eliminar imagen personalizada
+        restoreDefaultSelection();
+    });
+
+    // Funciones auxiliares
+    function handleFileSelection(file) {
+        // Validaciones
+        const validTypes = ['image/jpeg', 'image/png', 'image/gif', 'image/webp'];
+        if (!validTypes.includes(file.type)) {
+            alert('Por favor, selecciona una imagen válida (JPG, PNG, GIF, WebP).');
+            return;
+        }
+
+        if (file.size > 5 * 1024 * 1024) {
+            alert('La imagen debe ser menor a 5MB.');
+            return;
+        }
+
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            // Mostrar preview
+            customPreviewImage.src = e.target.result;
+            uploadPreview.classList.add('active');
+
+            // Actualizar vista previa principal
+            updateAvatarPreview(e.target.result);
+
+            // Limpiar selección de avatares predeterminados
+            clearAvatarSelections();
+            document.getElementById('selected-avatar').value = '';
+            selectedAvatar = '';
+            updateDefaultIndicator(false);
+        }
+        reader.readAsDataURL(file);
+    }
+
+    function resetCustomUpload() {
+        fileInput.value = '';
+        uploadPreview.classList.remove('active');
+        customPreviewImage.src = '';
+    }
+
+    function clearAvatarSelections() {
+        avatarOptions.forEach(option => {
+            option.classList.remove('selected');
+        });
+    }
+
+    function restoreDefaultSelection() {
+        clearAvatarSelections();
+        const defaultOption = document.querySelector('[data-avatar="avatar_default.jpg"]');
+        if (defaultOption) {
+            defaultOption.classList.add('selected');
+            updateAvatarPreview(defaultAvatarUrl);
+            selectedAvatar = 'avatar_default.jpg';
+            document.getElementById('selected-avatar').value = 'avatar_default.jpg';
+            updateDefaultIndicator(true);
+        }
+    }
+
+    function updateAvatarPreview(src) {
+        const avatarPreview = document.getElementById('avatar-preview');
+        avatarPreview.src = src;
+
+        // Forzar la actualización de la imagen
+        avatarPreview.onload = function() {
+            console.log('✅ Vista previa actualizada:', src);
+        };
+        avatarPreview.onerror = function() {
+            console.log('❌ Error cargando vista previa:', src);
+            this.src = defaultAvatarUrl;
+        };
+    }
+
+    function updateDefaultIndicator(isDefault) {
+        const avatarPreview = document.querySelector('.avatar-preview');
+        if (isDefault) {
+            avatarPreview.classList.add('has-default');
+        } else {
+            avatarPreview.classList.remove('has-default');
+        }
+    }
+
+    // INICIALIZACIÓN MEJORADA - Detectar el avatar actual del usuario
+    function initializeWithCurrentAvatar() {
+        const currentAvatarUrl = profileForm.dataset.currentAvatarUrl;
+        // Nombre del avatar del sistema en uso; vacío si el usuario subió su propia imagen
+        const currentAvatar = profileForm.dataset.currentAvatar;
+        console.log('🖼️ Avatar actual del usuario:', currentAvatarUrl);
+
+        // Verificar si es un avatar del sistema
+        const isSystemAvatar = currentAvatar !== '';
+        const isUploadedAvatar = !isSystemAvatar;
+        const isDefaultAvatar = currentAvatar === 'avatar_default.jpg';
+
+        if (isSystemAvatar && !isDefaultAvatar) {
+            // Es un avatar del sistema
+            const avatarFileName = currentAvatar;
+            console.log('🎯 Avatar del sistema detectado:', avatarFileName);
+
+            const matchingOption = document.querySelector(`[data-avatar="${avatarFileName}"]`);
+            if (matchingOption) {
+                clearAvatarSelections();
+                matchingOption.classList.add('selected');
+                selectedAvatar = avatarFileName;
+                document.getElementById('selected-avatar').value = avatarFileName;
+                updateDefaultIndicator(avatarFileName === 'avatar_default.jpg');
+                updateAvatarPreview(currentAvatarUrl);
+            } else {
+                // Si no encuentra coincidencia, usar predeterminado
+                restoreDefaultSelection();
+            }
+        } else if (isUploadedAvatar) {
+            // Es una imagen subida - mostrar en custom tab
+            console.log('📸 Avatar personalizado detectado');
+            updateDefaultIndicator(false);
+            // Cambiar a pestaña custom
+            document.querySelector('[data-tab="custom"]').click();
+            // Mostrar la imagen actual en la preview
+            updateAvatarPreview(currentAvatarUrl);
+        } else {
+            // Es el avatar predeterminado o no se pudo determinar
+            console.log('🔹 Usando avatar predeterminado');
+            restoreDefaultSelection();
+        }
+    }
+
+    // Inicializar cuando el DOM esté listo
+    initializeWithCurrentAvatar();
+
+    // DEBUG: Mostrar información del estado actual
+    console.log('🔧 Estado inicial del editor de avatar:');
+    console.log(' - selectedAvatar:', selectedAvatar);
+    console.log(' - fileInput files:', fileInput.files.length);
+    console.log(' - uploadPreview activo:', uploadPreview.classList.contains('active'));
+});
@@ -0,0 +1,71 @@
+/* Extraído de templates/main/payment.html */
+document.addEventListener('DOMContentLoaded', function() {
+    // Formatear número de tarjeta automáticamente
+    const cardNumber = document.getElementById('card_number');
+    cardNumber.addEventListener('input', function(e) {
+        let value = e.target.value.replace(/\s+/g, '').replace(/[^0-9]/gi, '');
+        let formattedValue = value.match(/.{1,4}/g)?.join(' ');
+        if (formattedValue) {
+            e.target.value = formattedValue;
+        }
+    });
+
+    // Formatear fecha de expiración automáticamente
+    const expiryDate = document.getElementById('expiry_date');
+    expiryDate.addEventListener('input', function(e) {
+        let value = e.target.value.replace(/\D/g, '');
+        if (value.length >= 2) {
+            e.target.value = value.substring(0, 2) + '/' + value.substring(2, 4);
+        } else {
+            e.target.value = value;
+        }
+    });
+
+    // Validar y limitar CVV a 3 dígitos
+    const cvv = document.getElementById('cvv');
+    cvv.addEventListener('input', function(e) {
+        e.target.value = e.target.value.replace(/\D/g, '').substring(0, 3);
+    });
+
+    // Formatear nombre en mayúsculas
+    const cardHolder = document.getElementById('card_holder');
+    cardHolder.addEventListener('input', function(e) {
+        e.target.value = e.target.value.toUpperCase();
+    });
+
+    // Simular procesamiento de pago
+    const paymentForm = document.querySelector('.payment-form');
+    const payButton = document.getElementById('pay-button');
+
+    if (paymentForm && payButton) {
+        paymentForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+
+            payButton.disabled = true;
+            payButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i> PROCESANDO...';
+
+            // Simular delay de procesamiento
+            setTimeout(() => {
+                this.submit();
+            }, 2000);
+        });
+    }
+
+    // Placeholder dinámico para el monto
+    const amountDisplay = document.querySelector('.amount-display');
+    if (amountDisplay) {
+        const amount = parseFloat(document.querySelector('.payment-form input[name="amount"]').value);
+        amountDisplay.textContent = amount.toLocaleString('es-MX', {
+            style: 'currency',
+            currency: 'MXN'
+        });
+    }
+
+    // Simular botones de e-wallet
+    document.querySelectorAll('.payment-option-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const method = this.getAttribute('name');
+            alert(`Método de pago seleccionado: ${method.toUpperCase()}\n\nEsta funcionalidad estaría integrada con la pasarela de pago correspondiente en producción.`);
+        });
+    });
+});
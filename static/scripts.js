@@ -4,6 +4,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeGameCarousels();
     initializeModals();
     initializeUXImprovements();
+    initializeCatalog();
     fixHeaderOverlap();
 });
 
@@ -297,15 +298,7 @@ function initializeUXImprovements() {
     });
     
     // Efectos hover para tarjetas
-    document.querySelectorAll('.feature, .plan, .category-card, .game-card').forEach(card => {
-        card.addEventListener('mouseenter', function() {
-            this.style.transform = 'translateY(-5px)';
-        });
-        
-        card.addEventListener('mouseleave', function() {
-            this.style.transform = 'translateY(0)';
-        });
-    });
+    document.querySelectorAll('.feature, .plan, .category-card, .game-card').forEach(addHoverLift);
     
     // Botones "Ver Más" para categorías
     document.querySelectorAll('.btn-ver-mas').forEach(btn => {
@@ -316,12 +309,7 @@ function initializeUXImprovements() {
     });
     
     // Interactividad para tarjetas de juego
-    document.querySelectorAll('.game-card').forEach(card => {
-        card.addEventListener('click', function() {
-            const gameName = this.querySelector('h3').textContent;
-            showGameDetails(gameName);
-        });
-    });
+    document.querySelectorAll('.game-card').forEach(addGameDetails);
     
     // Navegación activa
     highlightActiveNav();
@@ -330,6 +318,153 @@ function initializeUXImprovements() {
     initializeFormEnhancements();
 }
 
+function addHoverLift(card) {
+    card.addEventListener('mouseenter', function() {
+        this.style.transform = 'translateY(-5px)';
+    });
+    
+    card.addEventListener('mouseleave', function() {
+        this.style.transform = 'translateY(0)';
+    });
+}
+
+function addGameDetails(card) {
+    card.addEventListener('click', function() {
+        const gameName = this.querySelector('h3').textContent;
+        showGameDetails(gameName);
+    });
+}
+
+// ===== CATÁLOGO POR FILAS (gamepass) =====
+// La página trae solo las primeras filas (main/catalog.py). Cuando el final del catálogo
+// o de una fila se acerca a la pantalla se pide la página siguiente a la API con el
+// cursor guardado en data-next; sin cursor ya no queda nada que cargar.
+function initializeCatalog() {
+    const catalog = document.getElementById('catalog');
+    if (!catalog || !('IntersectionObserver' in window)) return;
+    
+    catalog.querySelectorAll('.catalog-track').forEach(observeCatalogTrack);
+    
+    const more = catalog.querySelector('.catalog-more');
+    const rowsObserver = new IntersectionObserver(entries => {
+        if (entries[0].isIntersecting) loadMoreRows(catalog, more, rowsObserver);
+    }, { rootMargin: '600px 0px' });
+    rowsObserver.observe(more);
+}
+
+function fetchCatalogPage(url, cursor) {
+    return fetch(`${url}?after=${encodeURIComponent(cursor)}`, {
+        headers: { 'Accept': 'application/json' }
+    }).then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+    });
+}
+
+function loadMoreRows(catalog, more, observer) {
+    const cursor = catalog.dataset.next;
+    if (!cursor) {
+        observer.disconnect();
+        return;
+    }
+    if (catalog.dataset.loading) return;
+    catalog.dataset.loading = '1';
+    
+    fetchCatalogPage(catalog.dataset.rowsUrl, cursor).then(page => {
+        page.rows.forEach(row => {
+            const section = buildCatalogRow(row);
+            catalog.insertBefore(section, more);
+            observeCatalogTrack(section.querySelector('.catalog-track'));
+        });
+        catalog.dataset.next = page.next || '';
+    }).catch(error => {
+        console.error('Error cargando filas del catálogo:', error);
+    }).finally(() => {
+        delete catalog.dataset.loading;
+        // Volver a observar comprueba de nuevo si el centinela sigue en pantalla
+        observer.unobserve(more);
+        if (catalog.dataset.next) observer.observe(more);
+    });
+}
+
+function observeCatalogTrack(track) {
+    const end = track.querySelector('.catalog-track-end');
+    if (!end || !track.dataset.next) return;
+    
+    const observer = new IntersectionObserver(entries => {
+        if (entries[0].isIntersecting) loadMoreCards(track, end, observer);
+    }, { root: track, rootMargin: '0px 400px 0px 0px' });
+    observer.observe(end);
+}
+
+function loadMoreCards(track, end, observer) {
+    const cursor = track.dataset.next;
+    if (!cursor) {
+        observer.disconnect();
+        return;
+    }
+    if (track.dataset.loading) return;
+    track.dataset.loading = '1';
+    
+    fetchCatalogPage(track.dataset.cardsUrl, cursor).then(page => {
+        page.cards.forEach(card => track.insertBefore(buildGameCard(card), end));
+        track.dataset.next = page.next || '';
+    }).catch(error => {
+        console.error('Error cargando juegos del catálogo:', error);
+    }).finally(() => {
+        delete track.dataset.loading;
+        observer.unobserve(end);
+        if (track.dataset.next) observer.observe(end);
+    });
+}
+
+function buildCatalogRow(row) {
+    const section = document.createElement('section');
+    section.className = 'catalog-row';
+    section.dataset.category = row.slug;
+    
+    const title = document.createElement('h3');
+    title.className = 'catalog-row-title';
+    title.textContent = row.name;
+    
+    const track = document.createElement('div');
+    track.className = 'catalog-track';
+    track.dataset.cardsUrl = row.cards_url;
+    track.dataset.next = row.next || '';
+    row.cards.forEach(card => track.appendChild(buildGameCard(card)));
+    const end = document.createElement('div');
+    end.className = 'catalog-track-end';
+    track.appendChild(end);
+    
+    section.append(title, track);
+    return section;
+}
+
+function buildGameCard(card) {
+    // Mismo marcado que templates/main/gamepass.html
+    const element = document.createElement('div');
+    element.className = 'game-card';
+    element.dataset.game = card.slug;
+    
+    const img = document.createElement('img');
+    img.src = card.image;
+    img.alt = card.title;
+    img.loading = 'lazy';
+    
+    const info = document.createElement('div');
+    info.className = 'game-info';
+    const title = document.createElement('h3');
+    title.textContent = card.title;
+    const description = document.createElement('p');
+    description.textContent = card.description;
+    info.append(title, description);
+    
+    element.append(img, info);
+    addHoverLift(element);
+    addGameDetails(element);
+    return element;
+}
+
 function showCategoryAlert(categoria) {
     const alertBox = document.createElement('div');
     alertBox.style.cssText = `
@@ -707,6 +842,7 @@ window.ChaosCompany = {
     initializeModals,
     showCategoryAlert,
     fixHeaderOverlap,
+    initializeCatalog,
     initializeUXImprovements
 };
 